@@ -0,0 +1,99 @@
+"""Benchmark of MetricTable.aggregate against per-item accumulation into nested dicts.
+
+Run from the repository root:
+
+    python sql_metrics_evaluator/benchmarks/aggregation.py --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+# Add the repository root to the path to import the package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sql_metrics_evaluator.src.aggregation import DEFAULT_METRICS, MetricTable
+
+COMPLEXITIES = ["simple", "medium", "complex"]
+
+
+def build_records(rows: int, models: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build flat per-item results like those written by sql-metrics-eval.
+
+    Args:
+        rows: Number of records
+        models: Number of distinct models
+        seed: Random seed
+
+    Returns:
+        Records with a model, a complexity and every default metric
+    """
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        record: Dict[str, Any] = {
+            "model": f"model-{rng.randrange(models)}",
+            "complexity": rng.choice(COMPLEXITIES),
+        }
+        for name in DEFAULT_METRICS:
+            record[name] = rng.random()
+        records.append(record)
+    return records
+
+
+def accumulate_means(records: List[Dict[str, Any]]) -> Dict[Any, Dict[str, float]]:
+    """Average every metric per model and complexity one item at a time.
+
+    Args:
+        records: Flat per-item results
+
+    Returns:
+        Mean of each metric per (model, complexity)
+    """
+    sums: Dict[Any, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    counts: Dict[Any, int] = defaultdict(int)
+    for record in records:
+        key = (record["model"], record["complexity"])
+        counts[key] += 1
+        for name in DEFAULT_METRICS:
+            sums[key][name] += record[name]
+    return {
+        key: {name: total / counts[key] for name, total in totals.items()}
+        for key, totals in sums.items()
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print the timings of both implementations."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of evaluations")
+    parser.add_argument("--models", type=int, default=10, help="Number of distinct models")
+    args = parser.parse_args()
+
+    records = build_records(args.rows, args.models)
+
+    start = time.perf_counter()
+    table = MetricTable(capacity=args.rows)
+    table.extend(records)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    accumulate_means(records)
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = table.aggregate(by=("model", "complexity"))
+    aggregate = time.perf_counter() - start
+
+    print(f"rows:                        {args.rows:10d}")
+    print(f"MetricTable.extend:          {load:10.3f} s")
+    print(f"per-item means (dicts):      {baseline:10.3f} s")
+    print(f"MetricTable.aggregate:       {aggregate:10.3f} s ({len(rows)} groups x metrics)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Synthetic corpus of generated and reference SQL query pairs for the benchmark suite.
+
+Queries target a small shop schema (customers, orders, products and order items) and are
+valid SQLite, so the same corpus drives the static and the execution benchmarks.
+"""
+
+import random
+import sqlite3
+from typing import Callable, Dict, List
+
+# Tables of the synthetic schema
+SCHEMA_DDL = """
+CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT, city TEXT, signup_date TEXT);
+CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, category TEXT, price REAL);
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER REFERENCES customers (id),
+    total_amount REAL,
+    order_date TEXT,
+    status TEXT
+);
+CREATE TABLE order_items (
+    id INTEGER PRIMARY KEY,
+    order_id INTEGER REFERENCES orders (id),
+    product_id INTEGER REFERENCES products (id),
+    quantity INTEGER
+);
+"""
+
+CITIES = ["Berlin", "Lisbon", "Oslo", "Quito", "Seoul", "Tunis"]
+CATEGORIES = ["books", "games", "garden", "kitchen", "music", "toys"]
+STATUSES = ["new", "paid", "shipped", "returned"]
+
+# Share of generated queries per outcome: an exact copy, an equivalent rewrite or a
+# query that differs from the reference
+VARIANT_WEIGHTS = {"exact": 0.2, "equivalent": 0.4, "incorrect": 0.4}
+
+
+def _date(rng: random.Random) -> str:
+    """Draw a date in 2023 or 2024."""
+    return f"{rng.choice([2023, 2024])}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def _simple(rng: random.Random) -> Dict[str, str]:
+    """Build a single-table query with an equivalent rewrite and an incorrect variant."""
+    if rng.random() < 0.5:
+        city = rng.choice(CITIES)
+        return {
+            "reference": f"SELECT name, signup_date FROM customers WHERE city = '{city}'",
+            "equivalent": (
+                f"SELECT c.name, c.signup_date FROM customers AS c WHERE '{city}' = c.city"
+            ),
+            "incorrect": f"SELECT name FROM customers WHERE city <> '{city}'",
+        }
+
+    threshold = rng.randint(10, 500)
+    status = rng.choice(STATUSES)
+    return {
+        "reference": (
+            "SELECT id, total_amount FROM orders "
+            f"WHERE total_amount > {threshold} AND status = '{status}'"
+        ),
+        "equivalent": (
+            "SELECT o.id, o.total_amount FROM orders o "
+            f"WHERE o.status = '{status}' AND {threshold} < o.total_amount"
+        ),
+        "incorrect": (
+            "SELECT id, total_amount FROM orders "
+            f"WHERE total_amount >= {threshold + 5} AND status = '{status}'"
+        ),
+    }
+
+
+def _medium(rng: random.Random) -> Dict[str, str]:
+    """Build a join with grouping and aggregation, with its variants."""
+    since = _date(rng)
+    limit = rng.randint(3, 20)
+    reference = (
+        "SELECT c.name, COUNT(o.id) AS order_count, SUM(o.total_amount) AS revenue "
+        "FROM customers c JOIN orders o ON c.id = o.customer_id "
+        f"WHERE o.order_date >= '{since}' GROUP BY c.id, c.name "
+        f"ORDER BY revenue DESC, c.name LIMIT {limit}"
+    )
+    equivalent = (
+        "SELECT customers.name, COUNT(orders.id), SUM(orders.total_amount) "
+        "FROM customers JOIN orders ON orders.customer_id = customers.id "
+        f"WHERE '{since}' <= orders.order_date GROUP BY customers.id, customers.name "
+        f"ORDER BY SUM(orders.total_amount) DESC, customers.name LIMIT {limit}"
+    )
+    incorrect = (
+        "SELECT c.name, COUNT(o.id) AS order_count, AVG(o.total_amount) AS revenue "
+        "FROM customers c LEFT JOIN orders o ON c.id = o.customer_id "
+        f"WHERE o.order_date >= '{since}' GROUP BY c.id, c.name "
+        f"ORDER BY revenue DESC, c.name LIMIT {limit}"
+    )
+    return {"reference": reference, "equivalent": equivalent, "incorrect": incorrect}
+
+
+def _complex(rng: random.Random) -> Dict[str, str]:
+    """Build a query with a CTE, a subquery, HAVING and a window function, with variants."""
+    category = rng.choice(CATEGORIES)
+    minimum = rng.randint(1, 5)
+    reference = (
+        "WITH category_sales AS ("
+        "SELECT oi.order_id, SUM(oi.quantity * p.price) AS amount "
+        "FROM order_items oi JOIN products p ON p.id = oi.product_id "
+        f"WHERE p.category = '{category}' GROUP BY oi.order_id) "
+        "SELECT o.customer_id, SUM(cs.amount) AS spent, "
+        "RANK() OVER (ORDER BY SUM(cs.amount) DESC) AS spend_rank "
+        "FROM orders o JOIN category_sales cs ON cs.order_id = o.id "
+        "WHERE o.customer_id IN (SELECT id FROM customers WHERE city <> 'Oslo') "
+        f"GROUP BY o.customer_id HAVING COUNT(*) >= {minimum}"
+    )
+    equivalent = (
+        "WITH category_sales AS ("
+        "SELECT order_items.order_id, SUM(order_items.quantity * products.price) AS amount "
+        "FROM order_items JOIN products ON order_items.product_id = products.id "
+        f"WHERE '{category}' = products.category GROUP BY order_items.order_id) "
+        "SELECT orders.customer_id, SUM(category_sales.amount) AS spent, "
+        "RANK() OVER (ORDER BY SUM(category_sales.amount) DESC) AS spend_rank "
+        "FROM orders JOIN category_sales ON orders.id = category_sales.order_id "
+        "WHERE orders.customer_id IN (SELECT id FROM customers WHERE city <> 'Oslo') "
+        f"GROUP BY orders.customer_id HAVING COUNT(*) >= {minimum}"
+    )
+    incorrect = reference.replace(f">= {minimum}", f"> {minimum}").replace(
+        "<> 'Oslo'", "= 'Oslo'"
+    )
+    return {"reference": reference, "equivalent": equivalent, "incorrect": incorrect}
+
+
+TEMPLATES: Dict[str, Callable[[random.Random], Dict[str, str]]] = {
+    "simple": _simple,
+    "medium": _medium,
+    "complex": _complex,
+}
+
+
+def build_corpus(size: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Build a reproducible corpus of query pairs, evenly spread over the complexity levels.
+
+    Args:
+        size: Number of query pairs
+        seed: Random seed
+
+    Returns:
+        List of dictionaries with generated_query, reference_query, query_complexity and
+        database_schema keys, in the format of an evaluation request
+    """
+    rng = random.Random(seed)
+    levels = list(TEMPLATES)
+    variants = list(VARIANT_WEIGHTS)
+    weights = list(VARIANT_WEIGHTS.values())
+
+    corpus = []
+    for index in range(size):
+        level = levels[index % len(levels)]
+        queries = TEMPLATES[level](rng)
+        variant = rng.choices(variants, weights)[0]
+        generated = queries["reference"] if variant == "exact" else queries[variant]
+        corpus.append(
+            {
+                "generated_query": generated,
+                "reference_query": queries["reference"],
+                "query_complexity": level,
+                "database_schema": SCHEMA_DDL,
+            }
+        )
+    return corpus
+
+
+def create_sqlite_database(path: str, rows: int = 1000, seed: int = 0) -> None:
+    """Create a SQLite database with the synthetic schema and random data.
+
+    Args:
+        path: Path of the database file
+        rows: Number of orders, with a proportional number of customers, products and
+            order items
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    customers = max(rows // 10, 1)
+    products = max(rows // 20, 1)
+
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA_DDL)
+        connection.executemany(
+            "INSERT INTO customers VALUES (?, ?, ?, ?)",
+            [
+                (i, f"customer {i}", rng.choice(CITIES), _date(rng))
+                for i in range(1, customers + 1)
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO products VALUES (?, ?, ?, ?)",
+            [
+                (i, f"product {i}", rng.choice(CATEGORIES), round(rng.uniform(1, 100), 2))
+                for i in range(1, products + 1)
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO orders VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    i,
+                    rng.randint(1, customers),
+                    round(rng.uniform(5, 800), 2),
+                    _date(rng),
+                    rng.choice(STATUSES),
+                )
+                for i in range(1, rows + 1)
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO order_items VALUES (?, ?, ?, ?)",
+            [
+                (i, rng.randint(1, rows), rng.randint(1, products), rng.randint(1, 5))
+                for i in range(1, rows * 3 + 1)
+            ],
+        )
+        connection.commit()
+    finally:
+        connection.close()
@@ -0,0 +1,103 @@
+"""Micro-benchmark of SQLParser.normalize_query against the sqlparse.format pipeline.
+
+Run from the repository root:
+
+    python sql_metrics_evaluator/benchmarks/normalize.py --iterations 2000
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+from typing import Callable, List
+
+import sqlparse
+
+# Add the repository root to the path to import the package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sql_metrics_evaluator.src.parser import SQLParser
+
+QUERIES = [
+    "SELECT name FROM users WHERE age > 18",
+    "select name, email from users -- adults only\nwhere age>18 order by name",
+    """
+    SELECT c.name AS customer_name, SUM(o.total_amount) AS total_spent
+    FROM customers c
+    JOIN orders o ON c.id = o.customer_id
+    WHERE o.order_date >= CURRENT_DATE - INTERVAL '1 year' /* last year */
+    GROUP BY c.id, c.name
+    HAVING SUM(o.total_amount) > 1000
+    ORDER BY total_spent DESC
+    LIMIT 10
+    """,
+    """
+    WITH recent AS (SELECT id, customer_id FROM orders WHERE order_date > '2024-01-01')
+    SELECT p.name, COUNT(*) FROM products p
+    WHERE EXISTS(SELECT 1 FROM recent r JOIN order_items oi ON oi.order_id = r.id
+                 WHERE oi.product_id = p.id)
+    GROUP BY p.name
+    """,
+]
+
+
+def sqlparse_normalize(query: str) -> str:
+    """Normalize a query with the sqlparse.format pipeline used before the tokenizer pass.
+
+    Args:
+        query: SQL query to normalize
+
+    Returns:
+        Normalized SQL query
+    """
+    query = sqlparse.format(
+        query,
+        strip_comments=True,
+        reindent=True,
+        keyword_case="upper",
+        identifier_case="lower",
+        strip_whitespace=True,
+    )
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def measure(normalize: Callable[[str], str], queries: List[str], iterations: int) -> float:
+    """Measure the mean time to normalize a query.
+
+    Args:
+        normalize: Normalization function
+        queries: Queries normalized in turn
+        iterations: Number of passes over the queries
+
+    Returns:
+        Mean time per query in microseconds
+    """
+    seconds = timeit.timeit(
+        lambda: [normalize(query) for query in queries], number=iterations
+    )
+    return seconds / (iterations * len(queries)) * 1e6
+
+
+def main() -> None:
+    """Run the benchmark and print the timings of both implementations."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500, help="Passes over the queries")
+    args = parser.parse_args()
+
+    # The uncached path is measured, as evaluations mostly see distinct queries
+    sql_parser = SQLParser()
+    for query in QUERIES:
+        if sql_parser.normalize_query(query) != sqlparse_normalize(query):
+            raise SystemExit(f"Normalized forms differ for query: {query!r}")
+
+    baseline = measure(sqlparse_normalize, QUERIES, args.iterations)
+    tokenizer = measure(sql_parser.normalize_query, QUERIES, args.iterations)
+
+    print(f"sqlparse.format pipeline: {baseline:10.1f} us/query")
+    print(f"tokenizer pass:           {tokenizer:10.1f} us/query")
+    print(f"speedup:                  {baseline / tokenizer:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Memory footprint of ParsedQuery against the former parse result dictionary.
+
+Run from the repository root:
+
+    python sql_metrics_evaluator/benchmarks/parsed_memory.py --copies 200
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from typing import Any, Callable, List
+
+# Add the repository root to the path to import the package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sql_metrics_evaluator.src.parsed_query import ParsedQuery
+from sql_metrics_evaluator.src.parser import SQLParser
+
+QUERIES = [
+    "SELECT name FROM users WHERE age > 18",
+    "SELECT name, email FROM users WHERE age > 18 ORDER BY name",
+    """
+    SELECT c.name AS customer_name, SUM(o.total_amount) AS total_spent
+    FROM customers c
+    JOIN orders o ON c.id = o.customer_id
+    WHERE o.order_date >= CURRENT_DATE - INTERVAL '1 year'
+    GROUP BY c.id, c.name
+    HAVING SUM(o.total_amount) > 1000
+    ORDER BY total_spent DESC
+    LIMIT 10
+    """,
+    """
+    WITH recent AS (SELECT id, customer_id FROM orders WHERE order_date > '2024-01-01')
+    SELECT p.name, COUNT(*) FROM products p
+    WHERE EXISTS(SELECT 1 FROM recent r JOIN order_items oi ON oi.order_id = r.id
+                 WHERE oi.product_id = p.id)
+    GROUP BY p.name
+    """,
+]
+
+
+def retained_bytes(build: Callable[[str], Any], queries: List[str]) -> int:
+    """Measure the memory retained by parse results.
+
+    Args:
+        build: Function parsing a query into the representation to measure
+        queries: Queries parsed in turn
+
+    Returns:
+        Bytes still allocated while the parse results are alive
+    """
+    gc.collect()
+    tracemalloc.start()
+    results = [build(query) for query in queries]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return size
+
+
+def main() -> None:
+    """Run the benchmark and print the footprint of both representations."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100, help="Parses of each query")
+    args = parser.parse_args()
+
+    # Distinct strings per copy, as evaluations mostly see distinct queries
+    queries = [f"{query} -- {copy}" for copy in range(args.copies) for query in QUERIES]
+    sql_parser = SQLParser()
+
+    def parse_dict(query: str) -> Any:
+        return sql_parser._parse_uncached(query, sql_parser.normalize_query(query))
+
+    def parse_compact(query: str) -> Any:
+        return ParsedQuery(parse_dict(query))
+
+    # Warm up the module-level caches of sqlglot before measuring
+    for query in QUERIES:
+        parse_compact(query)
+
+    former = retained_bytes(parse_dict, queries)
+    compact = retained_bytes(parse_compact, queries)
+
+    print(f"dictionary with parsed tree: {former / len(queries):10.0f} bytes/query")
+    print(f"ParsedQuery:                 {compact / len(queries):10.0f} bytes/query")
+    print(f"reduction:                   {former / compact:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""End-to-end benchmark suite of the parser and the evaluator on a synthetic corpus.
+
+Each stage (normalize_query, parse_query, compare_queries, evaluate and evaluate_batch)
+is measured separately and reported as operations per second, p50/p99 latency and peak
+traced memory. With --execution the evaluations also run both queries against a SQLite
+database filled with synthetic data.
+
+Run from the repository root:
+
+    python sql_metrics_evaluator/benchmarks/suite.py --output results.json
+    python sql_metrics_evaluator/benchmarks/suite.py --baseline results.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Add the repository root to the path to import the package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import sqlglot
+
+from corpus import build_corpus, create_sqlite_database
+from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
+from sql_metrics_evaluator.src.models import EvaluationRequest
+from sql_metrics_evaluator.src.parser import SQLParser
+
+# Version of the result format, checked before comparing against a baseline
+RESULT_FORMAT_VERSION = 1
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Get a percentile of sorted values by the nearest-rank method.
+
+    Args:
+        sorted_values: Values in ascending order
+        fraction: Percentile as a fraction between 0 and 1
+
+    Returns:
+        Percentile value
+    """
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def measure(
+    operation: Callable[[Any], Any], inputs: List[Any], repeat: int, ops_per_call: int = 1
+) -> Dict[str, float]:
+    """Measure the latency, throughput and peak memory of an operation.
+
+    Latencies are measured without tracing, then peak memory is measured over one more
+    pass with tracemalloc, which would otherwise slow down the timed passes.
+
+    Args:
+        operation: Operation called with each input
+        inputs: Inputs of the operation
+        repeat: Number of timed passes over the inputs
+        ops_per_call: Number of operations performed by a single call, e.g. the batch size
+
+    Returns:
+        Dictionary with operations, ops_per_sec, p50_ms, p99_ms and peak_memory_bytes
+    """
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            operation(item)
+            latencies.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    for item in inputs:
+        operation(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    operations = len(latencies) * ops_per_call
+    return {
+        "operations": operations,
+        "ops_per_sec": operations / sum(latencies),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_suite(
+    corpus: List[Dict[str, str]],
+    repeat: int,
+    batch_size: int,
+    db_connection_string: Optional[str] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark of the suite.
+
+    Caches are disabled, so that each pass measures the work done for unseen queries.
+
+    Args:
+        corpus: Query pairs built by build_corpus
+        repeat: Number of timed passes over the corpus
+        batch_size: Number of requests per evaluate_batch call
+        db_connection_string: Database the evaluations execute queries against, or None
+            for static evaluation only
+
+    Returns:
+        Measurements keyed by benchmark name
+    """
+    parser = SQLParser()
+    queries = [item[key] for item in corpus for key in ("generated_query", "reference_query")]
+    pairs = [(item["generated_query"], item["reference_query"]) for item in corpus]
+    requests = [EvaluationRequest(**item) for item in corpus]
+    batches = [requests[i : i + batch_size] for i in range(0, len(requests), batch_size)]
+
+    evaluator = SQLMetricsEvaluator(db_connection_string=db_connection_string)
+    try:
+        return {
+            "normalize_query": measure(parser.normalize_query, queries, repeat),
+            "parse_query": measure(parser.parse_query, queries, repeat),
+            "compare_queries": measure(lambda pair: parser.compare_queries(*pair), pairs, repeat),
+            "evaluate": measure(
+                lambda request: evaluator.evaluate(
+                    request.generated_query,
+                    request.reference_query,
+                    query_complexity=request.query_complexity,
+                    database_schema=request.database_schema,
+                ),
+                requests,
+                repeat,
+            ),
+            "evaluate_batch": measure(
+                evaluator.evaluate_batch, batches, repeat, ops_per_call=batch_size
+            ),
+        }
+    finally:
+        if evaluator.db_executor is not None:
+            evaluator.db_executor.close()
+
+
+def compare_with_baseline(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Compare results with a baseline and print the relative change of each benchmark.
+
+    Args:
+        results: Results of the current run
+        baseline: Results of the baseline run
+        tolerance: Relative throughput loss above which a benchmark counts as regressed
+
+    Returns:
+        Names of the regressed benchmarks
+    """
+    if baseline.get("format_version") != RESULT_FORMAT_VERSION:
+        raise SystemExit("Baseline was written by an incompatible version of the suite")
+    for key in ("corpus_size", "seed", "execution"):
+        if baseline["config"].get(key) != results["config"].get(key):
+            print(f"warning: baseline {key} differs ({baseline['config'].get(key)!r})")
+
+    regressions = []
+    print(f"{'benchmark':<18}{'ops/sec':>14}{'change':>10}{'p99 change':>12}{'memory change':>15}")
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            print(f"{name:<18}{current['ops_per_sec']:>14.1f}{'new':>10}")
+            continue
+        throughput = current["ops_per_sec"] / previous["ops_per_sec"] - 1
+        p99 = current["p99_ms"] / previous["p99_ms"] - 1
+        memory = current["peak_memory_bytes"] / max(previous["peak_memory_bytes"], 1) - 1
+        print(
+            f"{name:<18}{current['ops_per_sec']:>14.1f}{throughput:>+10.1%}"
+            f"{p99:>+12.1%}{memory:>+15.1%}"
+        )
+        if throughput < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    """Print the measurements of a run as a table.
+
+    Args:
+        results: Results of the run
+    """
+    print(f"{'benchmark':<18}{'ops/sec':>14}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>12}")
+    for name, measurement in results["benchmarks"].items():
+        print(
+            f"{name:<18}{measurement['ops_per_sec']:>14.1f}{measurement['p50_ms']:>10.3f}"
+            f"{measurement['p99_ms']:>10.3f}{measurement['peak_memory_bytes'] / 1024:>12.1f}"
+        )
+
+
+def main() -> None:
+    """Run the suite, store the results and compare them with a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus-size", type=int, default=300, help="Number of query pairs")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the corpus")
+    parser.add_argument("--batch-size", type=int, default=50, help="Requests per batch")
+    parser.add_argument(
+        "--execution", action="store_true", help="Execute queries against a SQLite database"
+    )
+    parser.add_argument("--rows", type=int, default=2000, help="Orders in the SQLite database")
+    parser.add_argument("--output", help="Path of the JSON file the results are written to")
+    parser.add_argument("--baseline", help="Path of a JSON results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative throughput loss tolerated before a benchmark counts as regressed",
+    )
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.corpus_size, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_connection_string = None
+        if args.execution:
+            path = os.path.join(directory, "benchmark.db")
+            create_sqlite_database(path, rows=args.rows, seed=args.seed)
+            db_connection_string = f"sqlite:///{path}"
+
+        benchmarks = run_suite(corpus, args.repeat, args.batch_size, db_connection_string)
+
+    results = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlglot": sqlglot.__version__,
+        },
+        "config": {
+            "corpus_size": args.corpus_size,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "batch_size": args.batch_size,
+            "execution": args.execution,
+            "rows": args.rows if args.execution else None,
+        },
+        "benchmarks": benchmarks,
+    }
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            raise SystemExit(f"Throughput regressed for: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
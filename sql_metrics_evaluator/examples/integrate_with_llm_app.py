@@ -9,6 +9,7 @@ from typing import Dict, Any, List
 # Add parent directory to path to import the package
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sql_metrics_evaluator.src.aggregation import MetricTable
 from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
 from sql_metrics_evaluator.src.models import QueryComplexity
 
@@ -28,8 +29,9 @@ def evaluate_model_responses(
     # Initialize evaluator (without database connection for this example)
     evaluator = SQLMetricsEvaluator()
     
-    # Initialize results dictionary
+    # Initialize results dictionary and the table of per-query metrics
     results = {}
+    table = MetricTable()
     
     # Evaluate each model's responses
     for model_name, responses in model_responses.items():
@@ -49,11 +51,6 @@ def evaluate_model_responses(
             "queries": []
         }
         
-        total_exact_match = 0
-        total_logical_form = 0
-        total_complexity_handling = 0
-        total_inference_latency = 0
-        
         # Evaluate each query
         for query in sample_queries:
             query_id = query["id"]
@@ -78,17 +75,9 @@ def evaluate_model_responses(
                 inference_latency=inference_latency
             )
             
-            # Update totals
-            total_exact_match += metrics.exact_match_accuracy
-            total_logical_form += metrics.logical_form_accuracy
-            total_complexity_handling += metrics.complexity_handling
-            total_inference_latency += inference_latency
-            
-            # Update complexity-specific results
+            # Collect the metrics for aggregation
             complexity_key = complexity.lower() if isinstance(complexity, str) else complexity.value
-            model_results["by_complexity"][complexity_key]["count"] += 1
-            model_results["by_complexity"][complexity_key]["exact_match"] += metrics.exact_match_accuracy
-            model_results["by_complexity"][complexity_key]["logical_form"] += metrics.logical_form_accuracy
+            table.add(metrics, model=model_name, complexity=complexity_key)
             
             # Add query-specific results
             model_results["queries"].append({
@@ -104,24 +93,24 @@ def evaluate_model_responses(
                 }
             })
         
-        # Calculate averages for overall results
-        query_count = len(model_results["queries"])
-        if query_count > 0:
-            model_results["overall"]["exact_match_accuracy"] = total_exact_match / query_count
-            model_results["overall"]["logical_form_accuracy"] = total_logical_form / query_count
-            model_results["overall"]["complexity_handling"] = total_complexity_handling / query_count
-            model_results["overall"]["inference_latency"] = total_inference_latency / query_count
-        
-        # Calculate averages for complexity-specific results
-        for complexity in model_results["by_complexity"]:
-            count = model_results["by_complexity"][complexity]["count"]
-            if count > 0:
-                model_results["by_complexity"][complexity]["exact_match"] /= count
-                model_results["by_complexity"][complexity]["logical_form"] /= count
-        
         # Add to results
         results[model_name] = model_results
     
+    # Calculate averages for overall results of every model at once
+    for row in table.aggregate(by=("model",)):
+        if row["metric"] in results[row["model"]]["overall"]:
+            results[row["model"]]["overall"][row["metric"]] = row["mean"]
+    
+    # Calculate averages for complexity-specific results
+    complexity_fields = {
+        "exact_match_accuracy": "exact_match",
+        "logical_form_accuracy": "logical_form",
+    }
+    for row in table.aggregate(by=("model", "complexity"), metrics=list(complexity_fields)):
+        complexity_results = results[row["model"]]["by_complexity"][row["complexity"]]
+        complexity_results["count"] = row["count"]
+        complexity_results[complexity_fields[row["metric"]]] = row["mean"]
+    
     return results
 
 
@@ -0,0 +1,319 @@
+"""Vectorized aggregation of evaluation metrics by model, complexity or any other tag."""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from sql_metrics_evaluator.src.models import SQLMetrics
+
+# Metrics collected from each evaluation by default
+DEFAULT_METRICS = (
+    "exact_match_accuracy",
+    "logical_form_accuracy",
+    "execution_accuracy",
+    "complexity_handling",
+    "zero_shot_performance",
+    "inference_latency",
+    "evaluation_time",
+)
+
+# Tags each evaluation is labeled with by default
+DEFAULT_TAGS = ("model", "complexity")
+
+# Percentiles reported next to the median by default
+DEFAULT_PERCENTILES = (25, 75, 90, 99)
+
+# Number of records converted into arrays at once by MetricTable.extend
+EXTEND_CHUNK_SIZE = 8192
+
+# Largest number of possible tag combinations counted with a dense array when grouping
+DENSE_KEY_SPACE = 1 << 22
+
+# Largest number of groups whose values are sorted one group at a time
+SEGMENT_SORT_MAX_GROUPS = 10000
+
+
+class MetricTable:
+    """Columnar store of per-evaluation metrics with grouped statistics computed in bulk.
+
+    Metric values are kept in a float array with NaN for missing values, and tags as
+    integer codes, so aggregating millions of evaluations takes a few sorts and
+    bincounts instead of a Python loop per item.
+    """
+
+    def __init__(
+        self,
+        metrics: Sequence[str] = DEFAULT_METRICS,
+        tags: Sequence[str] = DEFAULT_TAGS,
+        capacity: int = 1024,
+    ) -> None:
+        """Initialize an empty table.
+
+        Args:
+            metrics: Names of the metrics collected from each evaluation
+            tags: Names of the tags each evaluation can be grouped by
+            capacity: Number of rows allocated up front, doubled whenever it runs out
+        """
+        self.metrics = tuple(metrics)
+        self.tags = tuple(tags)
+        # One contiguous row of values per metric, so each metric is sorted in place
+        self._values = np.full((len(self.metrics), max(capacity, 1)), np.nan)
+        self._codes = np.zeros((max(capacity, 1), len(self.tags)), dtype=np.int64)
+        # Per tag, the code of each label and the label of each code
+        self._label_codes: List[Dict[Any, int]] = [{} for _ in self.tags]
+        self._labels: List[List[Any]] = [[] for _ in self.tags]
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Get the number of collected evaluations."""
+        return self._size
+
+    def add(self, metrics: Union[SQLMetrics, Mapping[str, Any]], **tags: Any) -> None:
+        """Add the metrics of one evaluation.
+
+        Args:
+            metrics: Evaluation metrics, or a mapping of metric names to values
+            tags: Tag values of the evaluation, e.g. model="tuned", complexity="simple"
+        """
+        self._reserve(1)
+        row = self._size
+        for column, name in enumerate(self.metrics):
+            if isinstance(metrics, SQLMetrics):
+                value = getattr(metrics, name, None)
+            else:
+                value = metrics.get(name)
+            self._values[column, row] = np.nan if value is None else value
+        for column, tag in enumerate(self.tags):
+            self._codes[row, column] = self._code(column, tags.get(tag))
+        self._size += 1
+
+    def extend(self, records: Iterable[Mapping[str, Any]]) -> None:
+        """Add many evaluations, each a flat record with its metrics and tags.
+
+        Records are converted into arrays a chunk at a time, e.g. the per-item results
+        written by the sql-metrics-eval command line interface.
+
+        Args:
+            records: Records with metric and tag fields
+        """
+        chunk: List[Mapping[str, Any]] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= EXTEND_CHUNK_SIZE:
+                self._extend_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._extend_chunk(chunk)
+
+    def _extend_chunk(self, records: List[Mapping[str, Any]]) -> None:
+        """Add a chunk of flat records.
+
+        Args:
+            records: Records with metric and tag fields
+        """
+        self._reserve(len(records))
+        rows = slice(self._size, self._size + len(records))
+        # None becomes NaN when converted to a float array
+        self._values[:, rows] = np.array(
+            [[record.get(name) for name in self.metrics] for record in records], dtype=float
+        ).reshape(len(records), len(self.metrics)).T
+        for column, tag in enumerate(self.tags):
+            self._codes[rows, column] = [self._code(column, record.get(tag)) for record in records]
+        self._size += len(records)
+
+    def _reserve(self, count: int) -> None:
+        """Make room for more rows, doubling the capacity as needed.
+
+        Args:
+            count: Number of rows about to be added
+        """
+        capacity = self._values.shape[1]
+        if self._size + count <= capacity:
+            return
+        while capacity < self._size + count:
+            capacity *= 2
+        values = np.full((len(self.metrics), capacity), np.nan)
+        values[:, : self._size] = self._values[:, : self._size]
+        codes = np.zeros((capacity, len(self.tags)), dtype=np.int64)
+        codes[: self._size] = self._codes[: self._size]
+        self._values, self._codes = values, codes
+
+    def _code(self, column: int, label: Any) -> int:
+        """Get the integer code of a tag label, assigning the next code to new labels.
+
+        Args:
+            column: Tag column
+            label: Tag label
+
+        Returns:
+            Label code
+        """
+        codes = self._label_codes[column]
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(codes)
+            self._labels[column].append(label)
+        return code
+
+    def aggregate(
+        self,
+        by: Sequence[str] = ("model",),
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        metrics: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Compute grouped statistics of every metric.
+
+        Missing values are left out of the statistics of their metric, and statistics of
+        a group without values are None.
+
+        Args:
+            by: Tags to group by (empty for a single group of every evaluation)
+            percentiles: Percentiles between 0 and 100 reported as p<percentile>
+            metrics: Metrics to aggregate (defaults to every collected metric)
+
+        Returns:
+            Tidy table with one row per group and metric, holding the tag values, the
+            metric name, count, mean, std (population), min, median, percentiles and max
+
+        Raises:
+            ValueError: If a tag or metric was not collected
+        """
+        for tag in by:
+            if tag not in self.tags:
+                raise ValueError(f"Unknown tag: {tag}")
+        metrics = self.metrics if metrics is None else tuple(metrics)
+        for name in metrics:
+            if name not in self.metrics:
+                raise ValueError(f"Unknown metric: {name}")
+        if self._size == 0:
+            return []
+
+        group_labels, inverse = self._groups(by)
+        group_count = len(group_labels)
+        group_sizes = np.bincount(inverse, minlength=group_count)
+        group_ends = np.cumsum(group_sizes)
+        group_starts = group_ends - group_sizes
+        order = self._group_order(inverse, group_count)
+        quantiles = [("min", 0.0), ("median", 0.5)]
+        quantiles += [(f"p{percentile:g}", percentile / 100) for percentile in percentiles]
+        quantiles.append(("max", 1.0))
+
+        rows: List[Dict[str, Any]] = [
+            {**labels, "metric": name} for name in metrics for labels in group_labels
+        ]
+        for index, name in enumerate(metrics):
+            values = self._values[self.metrics.index(name), : self._size]
+            valid = ~np.isnan(values)
+            counts = np.bincount(inverse, weights=valid, minlength=group_count)
+            sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=group_count)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = sums / counts
+                deviations = np.where(valid, values - means[inverse], 0.0)
+                stds = np.sqrt(
+                    np.bincount(inverse, weights=deviations**2, minlength=group_count) / counts
+                )
+
+            # Sort by group, then by value, with missing values last within each group
+            if order is None:
+                sorted_values = values[np.lexsort((values, inverse))]
+            else:
+                sorted_values = values[order]
+                for start, end in zip(group_starts.tolist(), group_ends.tolist()):
+                    sorted_values[start:end].sort()
+            statistics = {"count": counts, "mean": means, "std": stds}
+            for key, fraction in quantiles:
+                statistics[key] = self._quantile(sorted_values, group_starts, counts, fraction)
+
+            group_rows = rows[index * group_count : (index + 1) * group_count]
+            for key, column in statistics.items():
+                if key == "count":
+                    column_values = [int(value) for value in column.tolist()]
+                else:
+                    # NaN is the only value not equal to itself
+                    column_values = [
+                        None if value != value else value for value in column.tolist()
+                    ]
+                for row, value in zip(group_rows, column_values):
+                    row[key] = value
+        return rows
+
+    def _groups(self, by: Sequence[str]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Assign each collected evaluation to the group of its tag values.
+
+        Args:
+            by: Tags to group by
+
+        Returns:
+            Tuple of the tag values of each group, sorted by label code, and the group
+            index of each evaluation
+        """
+        if not by:
+            return [{}], np.zeros(self._size, dtype=np.int64)
+
+        # Combine the label codes into a single integer key per evaluation
+        columns = [self.tags.index(tag) for tag in by]
+        keys = np.zeros(self._size, dtype=np.int64)
+        for column in columns:
+            keys = keys * len(self._labels[column]) + self._codes[: self._size, column]
+        key_space = int(np.prod([len(self._labels[column]) for column in columns]))
+        if key_space <= max(self._size, DENSE_KEY_SPACE):
+            # Counting the keys is much faster than sorting them for a few groups
+            present = np.bincount(keys, minlength=key_space) > 0
+            unique_keys = np.flatnonzero(present)
+            inverse = (np.cumsum(present) - 1)[keys]
+        else:
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+        group_labels: List[Dict[str, Any]] = [{} for _ in unique_keys]
+        remaining = unique_keys
+        for tag, column in reversed(list(zip(by, columns))):
+            remaining, codes = np.divmod(remaining, len(self._labels[column]))
+            labels = self._labels[column]
+            for group, code in enumerate(codes):
+                group_labels[group][tag] = labels[code]
+        # Restore the order of the grouping tags in each row
+        group_labels = [{tag: labels[tag] for tag in by} for labels in group_labels]
+        return group_labels, inverse.reshape(-1)
+
+    @staticmethod
+    def _group_order(inverse: np.ndarray, group_count: int) -> Optional[np.ndarray]:
+        """Order the evaluations by group, keeping their order within each group.
+
+        Args:
+            inverse: Group index of each evaluation
+            group_count: Number of groups
+
+        Returns:
+            Indices of the evaluations ordered by group, or None when there are too many
+            groups to sort the values of each group separately
+        """
+        if group_count == 1:
+            return np.arange(len(inverse))
+        if group_count > SEGMENT_SORT_MAX_GROUPS:
+            return None
+        # A stable sort of small integers is a radix sort
+        return np.argsort(inverse.astype(np.uint16), kind="stable")
+
+    @staticmethod
+    def _quantile(
+        sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, fraction: float
+    ) -> np.ndarray:
+        """Interpolate a quantile of every group at once.
+
+        Args:
+            sorted_values: Values sorted by group, then by value with NaN last
+            starts: Offset of each group in the sorted values
+            counts: Number of non-missing values of each group
+            fraction: Quantile between 0 and 1
+
+        Returns:
+            Quantile of each group, NaN for groups without values
+        """
+        empty = counts == 0
+        positions = starts + fraction * np.maximum(counts - 1, 0)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.ceil(positions).astype(np.int64)
+        lower_values = sorted_values[lower]
+        result = lower_values + (sorted_values[upper] - lower_values) * (positions - lower)
+        result[empty] = np.nan
+        return result
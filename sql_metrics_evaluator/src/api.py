@@ -1,22 +1,29 @@
 """REST API for SQL metrics evaluation."""
 
+import asyncio
 import logging
 import os
 import time
-from typing import Dict, List, Optional, Union
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.types import Receive, Scope, Send
 
 from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
+from sql_metrics_evaluator.src.instrumentation import PROMETHEUS_CONTENT_TYPE, render_metrics
 from sql_metrics_evaluator.src.models import (
     EvaluationRequest,
     EvaluationResponse,
     QueryComplexity,
     SQLMetrics,
 )
+from sql_metrics_evaluator.src.schema import DatabaseSchema
 
 # Load environment variables
 load_dotenv()
@@ -28,11 +35,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Evaluator created on application startup
+evaluator: SQLMetricsEvaluator
+
+
+def create_evaluator() -> SQLMetricsEvaluator:
+    """Create the evaluator configured by the environment.
+
+    Returns:
+        SQL metrics evaluator
+    """
+    return SQLMetricsEvaluator(
+        db_connection_string=os.getenv("DATABASE_URL"),
+        execution_timeout=int(os.getenv("EXECUTION_TIMEOUT", "5000")),
+        parser_cache_size=int(os.getenv("PARSER_CACHE_SIZE", "10000")),
+        reference_cache_size=int(os.getenv("REFERENCE_CACHE_SIZE", "1000")),
+        database_version=os.getenv("DATABASE_VERSION"),
+        database_version_ttl=float(os.getenv("DATABASE_VERSION_TTL", "1")),
+        cancel_on_failure=os.getenv("CANCEL_ON_FAILURE", "true").lower() == "true",
+        ordered_comparison=os.getenv("ORDERED_COMPARISON", "false").lower() == "true",
+        fetch_chunk_size=int(os.getenv("FETCH_CHUNK_SIZE", "1000")),
+        memory_budget_bytes=int(os.getenv("RESULT_MEMORY_BUDGET_MB", "64")) * 1024 * 1024,
+        in_database_comparison=os.getenv("IN_DATABASE_COMPARISON", "false").lower() == "true",
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        schema_ttl=float(os.getenv("SCHEMA_TTL", "300")),
+        profiling=os.getenv("PROFILING_ENABLED", "false").lower() == "true",
+        profile_sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+        profile_top_n=int(os.getenv("PROFILE_TOP_N", "20")),
+        profile_dir=os.getenv("PROFILE_DIR"),
+        memo_size=int(os.getenv("MEMO_SIZE", "0")),
+        memo_path=os.getenv("MEMO_PATH"),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the evaluator on startup and release its database resources on shutdown.
+
+    Creating the evaluator loads the SQL parsers and the database engine, so importing
+    this module stays fast and the work is done once the server starts.
+
+    Args:
+        app: FastAPI application
+    """
+    global evaluator
+    evaluator = create_evaluator()
+    try:
+        yield
+    finally:
+        await evaluator.aclose()
+        if evaluator.db_executor is not None:
+            evaluator.db_executor.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="SQL Metrics Evaluator API",
     description="API for evaluating SQL generation models with real-time metrics",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -44,12 +107,13 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Initialize evaluator
-db_connection_string = os.getenv("DATABASE_URL")
-evaluator = SQLMetricsEvaluator(
-    db_connection_string=db_connection_string,
-    execution_timeout=int(os.getenv("EXECUTION_TIMEOUT", "5000")),
-)
+# Batch evaluation pool sizes
+batch_workers = int(os.getenv("BATCH_WORKERS", "1"))
+batch_io_workers = int(os.getenv("BATCH_IO_WORKERS", "4"))
+batch_concurrency = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+# Header requesting a profile of the evaluation, as an alternative to profile=true
+PROFILE_HEADER = "X-Profile"
 
 
 class HealthResponse(BaseModel):
@@ -58,6 +122,9 @@ class HealthResponse(BaseModel):
     status: str = Field(..., description="Service status")
     database_connected: bool = Field(..., description="Database connection status")
     version: str = Field(..., description="API version")
+    pool: Dict[str, Dict[str, float]] = Field(
+        default_factory=dict, description="Connection pool statistics keyed by engine"
+    )
 
 
 class BatchEvaluationRequest(BaseModel):
@@ -71,42 +138,92 @@ class BatchEvaluationResponse(BaseModel):
 
     responses: List[EvaluationResponse] = Field(..., description="List of evaluation responses")
     total_time: float = Field(..., description="Total time taken for batch evaluation in milliseconds")
+    profile: Optional[Dict[str, Any]] = Field(
+        default=None, description="Hot functions of a profiled batch evaluation"
+    )
+
+
+class BatchStreamSummary(BaseModel):
+    """Summary emitted as the last line of a streamed batch evaluation."""
+
+    total: int = Field(..., description="Number of evaluated requests")
+    failed: int = Field(..., description="Number of requests whose evaluation reported errors")
+    invalid: int = Field(..., description="Number of input lines that were not valid requests")
+    total_time: float = Field(..., description="Total time taken for batch evaluation in milliseconds")
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Newline-delimited JSON response streamed while the request body is still being read.
+
+    StreamingResponse normally listens for client disconnects while streaming, which
+    consumes the request body messages that the streaming endpoint still needs to read.
+    Disconnects are detected instead when sending to or receiving from the client fails.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Stream the response without listening for disconnects."""
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        
+        if self.background is not None:
+            await self.background()
 
 
 @app.get("/health", response_model=HealthResponse)
-async def health_check() -> Dict[str, Union[str, bool]]:
+async def health_check() -> Dict[str, Any]:
     """Health check endpoint.
 
     Returns:
-        Health status information
+        Health status information, including connection pool statistics
     """
     return {
         "status": "ok",
         "database_connected": evaluator.db_executor is not None,
         "version": "0.1.0",
+        "pool": evaluator.pool_stats(),
     }
 
 
 @app.post("/evaluate", response_model=EvaluationResponse)
-async def evaluate(request: EvaluationRequest) -> Dict[str, Union[SQLMetrics, str, float]]:
+async def evaluate(
+    request: EvaluationRequest,
+    http_request: Request,
+    timings: bool = False,
+    profile: bool = False,
+) -> Dict[str, Union[SQLMetrics, str, float]]:
     """Evaluate a SQL query.
 
     Args:
         request: Evaluation request
+        http_request: HTTP request, whose X-Profile header may request a profile
+        timings: Whether to include the per-stage timings in the metrics
+        profile: Whether to profile the evaluation and include its hot functions in the
+            metrics (requires PROFILING_ENABLED)
 
     Returns:
         Evaluation response
     """
     start_time = time.time()
+    profile = _profile_requested(http_request, profile)
     
     try:
-        metrics = evaluator.evaluate(
+        metrics = await evaluator.aevaluate(
             generated_query=request.generated_query,
             reference_query=request.reference_query,
             query_complexity=request.query_complexity,
             database_schema=request.database_schema,
             execution_timeout=request.execution_timeout,
+            profile=profile,
         )
+        if not timings:
+            metrics.stage_timings = None
+        if not profile:
+            # Sampled profiles are only logged or saved to PROFILE_DIR
+            metrics.profile = None
         
         evaluation_time = (time.time() - start_time) * 1000
         
@@ -123,30 +240,202 @@ async def evaluate(request: EvaluationRequest) -> Dict[str, Union[SQLMetrics, st
 
 
 @app.post("/evaluate/batch", response_model=BatchEvaluationResponse)
-async def evaluate_batch(request: BatchEvaluationRequest) -> Dict[str, Union[List[EvaluationResponse], float]]:
+async def evaluate_batch(
+    request: BatchEvaluationRequest,
+    http_request: Request,
+    timings: bool = False,
+    profile: bool = False,
+) -> Dict[str, Any]:
     """Evaluate a batch of SQL queries.
 
     Args:
         request: Batch evaluation request
+        http_request: HTTP request, whose X-Profile header may request a profile
+        timings: Whether to include the per-stage timings in the metrics
+        profile: Whether to profile the whole batch and include its hot functions in the
+            response (requires PROFILING_ENABLED)
 
     Returns:
         Batch evaluation response
     """
     start_time = time.time()
+    profile = _profile_requested(http_request, profile)
+    report = None
     
     try:
-        responses = evaluator.evaluate_batch(request.requests)
+        if profile and evaluator.profiler is not None:
+            # cProfile neither follows worker processes nor other threads, so a profiled
+            # batch is evaluated sequentially in a single worker thread
+            responses, report = await asyncio.to_thread(
+                evaluator.profiler.run, evaluator.evaluate_batch, request.requests
+            )
+        elif batch_workers > 1:
+            # Spread CPU-bound static analysis across processes without blocking the loop
+            responses = await asyncio.to_thread(
+                evaluator.evaluate_batch,
+                request.requests,
+                max_workers=batch_workers,
+                io_workers=batch_io_workers,
+            )
+        else:
+            responses = await evaluator.aevaluate_batch(
+                request.requests, max_concurrency=batch_concurrency
+            )
+        for response in responses:
+            if not timings:
+                response.metrics.stage_timings = None
+            response.metrics.profile = None
         total_time = (time.time() - start_time) * 1000
         
         return {
             "responses": responses,
             "total_time": total_time,
+            "profile": report,
         }
     except Exception as e:
         logger.error(f"Error evaluating batch: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error evaluating batch: {str(e)}")
 
 
+@app.post("/evaluate/batch/stream")
+async def evaluate_batch_stream(
+    request: Request, ordered: bool = True, timings: bool = False
+) -> NDJSONStreamingResponse:
+    """Evaluate a batch of SQL queries, streaming one response per line as each completes.
+
+    The request body is newline-delimited JSON with one evaluation request per line. The
+    response is newline-delimited JSON with one evaluation response per line, followed by
+    a final {"summary": ...} line. Both are processed incrementally, so server memory does
+    not depend on the size of the batch.
+
+    Args:
+        request: HTTP request with a newline-delimited JSON body
+        ordered: Whether to emit responses in request order (True) or in completion
+            order (False)
+        timings: Whether to include the per-stage timings in the metrics
+
+    Returns:
+        Streaming newline-delimited JSON response
+    """
+    counters = {"total": 0, "failed": 0, "invalid": 0}
+    
+    async def read_requests() -> AsyncIterator[EvaluationRequest]:
+        buffer = b""
+        line_number = 0
+        async for chunk in request.stream():
+            lines = (buffer + chunk).split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                line_number += 1
+                evaluation_request = _parse_request_line(line, line_number, counters)
+                if evaluation_request is not None:
+                    yield evaluation_request
+        
+        evaluation_request = _parse_request_line(buffer, line_number + 1, counters)
+        if evaluation_request is not None:
+            yield evaluation_request
+    
+    async def stream_responses() -> AsyncIterator[str]:
+        start_time = time.time()
+        
+        async for response in evaluator.aevaluate_stream(
+            read_requests(), max_concurrency=batch_concurrency, ordered=ordered
+        ):
+            counters["total"] += 1
+            if response.metrics.error_messages:
+                counters["failed"] += 1
+            if not timings:
+                response.metrics.stage_timings = None
+            response.metrics.profile = None
+            yield response.model_dump_json() + "\n"
+        
+        summary = BatchStreamSummary(total_time=(time.time() - start_time) * 1000, **counters)
+        yield f'{{"summary": {summary.model_dump_json()}}}\n'
+    
+    return NDJSONStreamingResponse(stream_responses())
+
+
+def _profile_requested(http_request: Request, profile: bool) -> bool:
+    """Check whether a request asks for a profile.
+
+    Args:
+        http_request: HTTP request
+        profile: Value of the profile query parameter
+
+    Returns:
+        True if the query parameter or the X-Profile header requests a profile
+    """
+    header = http_request.headers.get(PROFILE_HEADER, "")
+    return profile or header.lower() in ("1", "true", "yes")
+
+
+def _parse_request_line(
+    line: bytes, line_number: int, counters: Dict[str, int]
+) -> Optional[EvaluationRequest]:
+    """Parse one line of a newline-delimited JSON batch.
+
+    Args:
+        line: Raw line
+        line_number: 1-based line number, used for logging
+        counters: Batch counters, whose invalid count is incremented for invalid lines
+
+    Returns:
+        Evaluation request, or None for blank or invalid lines
+    """
+    if not line.strip():
+        return None
+    
+    try:
+        return EvaluationRequest.model_validate_json(line)
+    except ValidationError as e:
+        logger.warning(f"Skipping invalid batch line {line_number}: {str(e)}")
+        counters["invalid"] += 1
+        return None
+
+
+@app.get("/cache-stats", response_model=Dict[str, Dict[str, float]])
+async def get_cache_stats() -> Dict[str, Dict[str, Union[int, float]]]:
+    """Get cache statistics.
+
+    Returns:
+        Hit, miss and eviction counters for each evaluator cache
+    """
+    return evaluator.cache_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Get evaluation metrics in the Prometheus text format.
+
+    Returns:
+        Stage and evaluation duration histograms, parse failure, fallback parser and
+        database timeout counters, and the counters of each evaluator cache
+    """
+    return PlainTextResponse(
+        render_metrics(evaluator.cache_stats()), media_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+@app.get("/schema", response_model=DatabaseSchema)
+async def get_schema(refresh: bool = False) -> DatabaseSchema:
+    """Get the introspected database schema.
+
+    Args:
+        refresh: Whether to introspect the schema again instead of using the cache
+
+    Returns:
+        Tables and views with their columns
+    """
+    if evaluator.db_executor is None:
+        raise HTTPException(status_code=503, detail="Database executor not available")
+    
+    try:
+        return await asyncio.to_thread(evaluator.db_executor.get_schema, refresh)
+    except Exception as e:
+        logger.error(f"Error introspecting schema: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error introspecting schema: {str(e)}")
+
+
 @app.get("/complexity-levels", response_model=List[str])
 async def get_complexity_levels() -> List[str]:
     """Get available complexity levels.
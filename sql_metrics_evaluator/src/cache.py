@@ -0,0 +1,306 @@
+"""Caching utilities for SQL metrics evaluation."""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, Optional, Union
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used cache with usage counters."""
+
+    def __init__(self, max_size: int = 1024) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept before the least recently used
+                entry is evicted
+
+        Raises:
+            ValueError: If max_size is not positive
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value and mark it as most recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned when the key is not cached
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Remove a single entry, or every entry when no key is given.
+
+        Args:
+            key: Cache key to remove
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Get cache usage statistics.
+
+        Returns:
+            Dictionary with hit, miss and eviction counters, current size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        """Get the number of cached entries."""
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check whether a key is cached without updating usage counters."""
+        return key in self._entries
+
+
+class SQLiteCache:
+    """Disk-backed, size-bounded least-recently-used cache of string values in a SQLite file.
+
+    Entries are shared by every thread and process opening the same file, so they survive
+    restarts. Each thread uses its own connection, and the database runs in write-ahead
+    logging mode so readers never wait for a writer. The number of entries is kept in a
+    counter row maintained by triggers, and the least recently used entries are deleted
+    once it exceeds max_size.
+    """
+
+    def __init__(self, path: str, max_size: int = 100_000, timeout: float = 30.0) -> None:
+        """Initialize the cache, creating the database file if needed.
+
+        Args:
+            path: Path of the SQLite database file
+            max_size: Maximum number of entries kept before the least recently used
+                entries are evicted
+            timeout: Time in seconds to wait for a lock held by another connection
+
+        Raises:
+            ValueError: If max_size is not positive
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+            )
+            
+            # The entries are only counted once, when the counter is created
+            connection.execute("CREATE TABLE IF NOT EXISTS entry_count (size INTEGER NOT NULL)")
+            connection.execute(
+                "INSERT INTO entry_count (size) SELECT COUNT(*) FROM entries "
+                "WHERE NOT EXISTS (SELECT 1 FROM entry_count)"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_inserted AFTER INSERT ON entries "
+                "BEGIN UPDATE entry_count SET size = size + 1; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_deleted AFTER DELETE ON entries "
+                "BEGIN UPDATE entry_count SET size = size - 1; END"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread, opening it on first use.
+
+        Connections are not shared with forked processes, which open their own.
+
+        Returns:
+            SQLite connection in autocommit mode
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a single write transaction, rolled back on error.
+
+        Yields:
+            SQLite connection of the current thread
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a cached value and mark it as most recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned when the key is not cached
+
+        Returns:
+            Cached value or default
+        """
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            connection.execute(
+                "UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store a value, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            updated = connection.execute(
+                "UPDATE entries SET value = ?, last_used = ? WHERE key = ?", (value, now, key)
+            ).rowcount
+            if updated:
+                return
+            
+            connection.execute(
+                "INSERT INTO entries (key, value, last_used) VALUES (?, ?, ?)", (key, value, now)
+            )
+            excess = self._size(connection) - self.max_size
+            if excess <= 0:
+                return
+            
+            evicted = connection.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+        
+        with self._lock:
+            self.evictions += evicted
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Remove a single entry, or every entry when no key is given.
+
+        Args:
+            key: Cache key to remove
+        """
+        if key is None:
+            self._connection().execute("DELETE FROM entries")
+        else:
+            self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    @staticmethod
+    def _size(connection: sqlite3.Connection) -> int:
+        """Get the number of cached entries from the counter row.
+
+        Args:
+            connection: SQLite connection
+
+        Returns:
+            Number of cached entries
+        """
+        return connection.execute("SELECT size FROM entry_count").fetchone()[0]
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Get cache usage statistics.
+
+        Hit, miss and eviction counters only cover the current process.
+
+        Returns:
+            Dictionary with hit, miss and eviction counters, current size and hit rate
+        """
+        size = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": size,
+                "max_size": self.max_size,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        """Get the number of cached entries."""
+        return self._size(self._connection())
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether a key is cached without updating usage counters."""
+        row = self._connection().execute(
+            "SELECT 1 FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None
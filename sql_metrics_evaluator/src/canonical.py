@@ -0,0 +1,178 @@
+"""Canonical forms of SQL queries for static equivalence checks."""
+
+import hashlib
+import logging
+from typing import Dict, Optional
+
+from sqlglot import exp
+from sqlglot.optimizer.normalize import normalize
+from sqlglot.optimizer.qualify import qualify
+from sqlglot.optimizer.simplify import simplify
+
+logger = logging.getLogger(__name__)
+
+# Comparisons whose operands may be swapped by mirroring the operator
+MIRRORED_COMPARISONS = {
+    exp.EQ: exp.EQ,
+    exp.NEQ: exp.NEQ,
+    exp.GT: exp.LT,
+    exp.GTE: exp.LTE,
+    exp.LT: exp.GT,
+    exp.LTE: exp.GTE,
+}
+
+
+def canonicalize(expression: exp.Expression, dialect: Optional[str] = None) -> exp.Expression:
+    """Rewrite a query into a canonical form shared by equivalent spellings of it.
+
+    The query is qualified with sqlglot's optimizer, table aliases are renamed after the
+    tables they refer to, ORDER BY references to select aliases are expanded, predicates
+    are normalized and simplified, the operands of commutative operators are sorted and
+    the aliases of the final select list are dropped, since result sets are compared by
+    position.
+
+    Args:
+        expression: sqlglot parsed expression, which is left unchanged
+        dialect: sqlglot dialect of the query
+
+    Returns:
+        Canonical expression
+    """
+    expression = qualify(
+        expression.copy(),
+        dialect=dialect,
+        validate_qualify_columns=False,
+        quote_identifiers=False,
+        identify=False,
+    )
+    _rename_table_aliases(expression)
+    _expand_order_by_aliases(expression)
+    expression = simplify(normalize(expression))
+    expression = _sort_operands(expression)
+    _remove_output_aliases(expression)
+    return expression
+
+
+def fingerprint(expression: exp.Expression, dialect: Optional[str] = None) -> Optional[str]:
+    """Compute a fingerprint equal for queries with the same canonical form.
+
+    Args:
+        expression: sqlglot parsed expression
+        dialect: sqlglot dialect of the query
+
+    Returns:
+        Hex digest of the canonical SQL, or None if the query could not be canonicalized
+    """
+    try:
+        canonical_sql = canonicalize(expression, dialect).sql(dialect=dialect)
+    except Exception as e:
+        logger.debug(f"Failed to canonicalize query: {str(e)}")
+        return None
+
+    return hashlib.sha256(canonical_sql.encode()).hexdigest()
+
+
+def _rename_table_aliases(expression: exp.Expression) -> None:
+    """Rename every table alias after its table, numbering repeated tables.
+
+    Aliases are only renamed when each of them is unique within the query, so that
+    column references can be rewritten without resolving scopes.
+
+    Args:
+        expression: Qualified expression, modified in place
+    """
+    tables = [table for table in expression.find_all(exp.Table) if table.name]
+    aliases = [table.alias_or_name for table in tables]
+    if len(set(aliases)) != len(aliases):
+        return
+
+    mapping: Dict[str, str] = {}
+    occurrences: Dict[str, int] = {}
+    for table, alias in zip(tables, aliases):
+        name = table.name.lower()
+        occurrences[name] = occurrences.get(name, 0) + 1
+        mapping[alias] = name if occurrences[name] == 1 else f"{name}_{occurrences[name]}"
+
+    # Subquery aliases must neither be renamed nor be shadowed by a new alias
+    derived = {subquery.alias for subquery in expression.find_all(exp.Subquery) if subquery.alias}
+    if derived & (set(mapping) | set(mapping.values())):
+        return
+
+    for table, alias in zip(tables, aliases):
+        table.set("alias", exp.TableAlias(this=exp.to_identifier(mapping[alias])))
+    for column in expression.find_all(exp.Column):
+        if column.table in mapping:
+            column.set("table", exp.to_identifier(mapping[column.table]))
+
+
+def _expand_order_by_aliases(expression: exp.Expression) -> None:
+    """Replace ORDER BY references to select aliases with the aliased expressions.
+
+    Args:
+        expression: Qualified expression, modified in place
+    """
+    for select in expression.find_all(exp.Select):
+        order = select.args.get("order")
+        if order is None:
+            continue
+        aliases = {
+            projection.alias: projection.this
+            for projection in select.expressions
+            if isinstance(projection, exp.Alias)
+        }
+        for ordered in order.expressions:
+            column = ordered.this
+            if isinstance(column, exp.Column) and not column.table and column.name in aliases:
+                column.replace(aliases[column.name].copy())
+
+
+def _sort_operands(expression: exp.Expression) -> exp.Expression:
+    """Sort the operands of AND, OR and comparison operators by their SQL.
+
+    Args:
+        expression: Expression to rewrite
+
+    Returns:
+        Rewritten expression
+    """
+
+    def sort(node: exp.Expression) -> exp.Expression:
+        if isinstance(node, exp.Connector) and type(node.parent) is not type(node):
+            operands = sorted({operand.sql(): operand for operand in node.flatten()}.items())
+            combine = exp.and_ if isinstance(node, exp.And) else exp.or_
+            return combine(*(operand for _, operand in operands), copy=False)
+
+        mirrored = MIRRORED_COMPARISONS.get(type(node))
+        if mirrored is not None and node.left.sql() > node.right.sql():
+            return mirrored(this=node.right, expression=node.left)
+
+        return node
+
+    # Rewrite operands before the operators containing them
+    for node, _, _ in reversed(list(expression.walk(bfs=False))):
+        if isinstance(node, (exp.Connector, *MIRRORED_COMPARISONS)):
+            replacement = sort(node)
+            if replacement is not node:
+                if node is expression:
+                    expression = replacement
+                else:
+                    node.replace(replacement)
+    return expression
+
+
+def _remove_output_aliases(expression: exp.Expression) -> None:
+    """Drop the aliases of the final select list.
+
+    Args:
+        expression: Canonical expression, modified in place
+    """
+    if not isinstance(expression, exp.Select):
+        return
+
+    expression.set(
+        "expressions",
+        [
+            projection.this if isinstance(projection, exp.Alias) else projection
+            for projection in expression.expressions
+        ],
+    )
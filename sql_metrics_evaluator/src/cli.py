@@ -0,0 +1,486 @@
+"""Command line interface for offline bulk evaluation of SQL corpora.
+
+Records are streamed from a JSONL or Parquet file, evaluated in chunks by a bounded
+number of in-flight worker tasks and written out as soon as each chunk completes. Only
+the metric values of each record are kept, in a MetricTable, for the aggregates.
+
+    sql-metrics-eval responses.jsonl --output results.jsonl --aggregates models.jsonl \\
+        --workers 8
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import IO, Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from sql_metrics_evaluator.src.aggregation import MetricTable
+from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
+
+logger = logging.getLogger(__name__)
+
+# Metrics of an evaluation written per item and averaged per model
+METRIC_FIELDS = (
+    "exact_match_accuracy",
+    "logical_form_accuracy",
+    "execution_accuracy",
+    "complexity_handling",
+    "zero_shot_performance",
+    "inference_latency",
+    "evaluation_time",
+)
+
+# Columns of the per-item results, with their Parquet types
+RESULT_COLUMNS = {
+    "model": "string",
+    "query_id": "string",
+    "complexity": "string",
+    **{field: "float64" for field in METRIC_FIELDS},
+    "error": "string",
+}
+
+# Columns of the per-model aggregates, with their Parquet types
+AGGREGATE_COLUMNS = {
+    "model": "string",
+    "complexity": "string",
+    "count": "int64",
+    "errors": "int64",
+    **{f"{field}_mean": "float64" for field in METRIC_FIELDS},
+}
+
+# Complexity label of the aggregate over every complexity level of a model
+ALL_COMPLEXITIES = "all"
+
+# Metric of the aggregated results that is 1.0 for failed evaluations and 0.0 otherwise
+FAILED_METRIC = "failed"
+
+# Evaluator of a process pool worker
+_worker_evaluator: Optional[SQLMetricsEvaluator] = None
+
+
+def _detect_format(path: str, format_name: Optional[str]) -> str:
+    """Get the file format of a path.
+
+    Args:
+        path: File path
+        format_name: Explicit format, or None to use the file extension
+
+    Returns:
+        "parquet" or "jsonl"
+    """
+    if format_name:
+        return format_name
+    return "parquet" if path.endswith((".parquet", ".pq")) else "jsonl"
+
+
+def _import_pyarrow() -> Tuple[Any, Any]:
+    """Import pyarrow, which is only needed for Parquet files.
+
+    Returns:
+        Tuple of the pyarrow and pyarrow.parquet modules
+
+    Raises:
+        SystemExit: If pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet files require pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def read_records(
+    path: str, format_name: str, counters: Dict[str, int], batch_size: int = 1024
+) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a JSONL or Parquet file.
+
+    Args:
+        path: Input path ("-" reads JSONL from standard input)
+        format_name: "jsonl" or "parquet"
+        counters: Run counters, whose invalid count is incremented for invalid lines
+        batch_size: Number of rows read at once from a Parquet file
+
+    Yields:
+        Input records
+    """
+    if format_name == "parquet":
+        _, parquet = _import_pyarrow()
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+        return
+
+    file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping invalid line {line_number}: {str(e)}")
+                counters["invalid"] += 1
+                continue
+            if not isinstance(record, dict):
+                logger.warning(f"Skipping line {line_number}: not a JSON object")
+                counters["invalid"] += 1
+                continue
+            yield record
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+class RecordWriter:
+    """Writes records to a JSONL or Parquet file as they are produced."""
+
+    def __init__(self, path: str, format_name: str, columns: Dict[str, str]) -> None:
+        """Open the output file.
+
+        Args:
+            path: Output path ("-" writes JSONL to standard output)
+            format_name: "jsonl" or "parquet"
+            columns: Column names and Parquet types of the records
+        """
+        self.columns = columns
+        self._file: Optional[IO[str]] = None
+        self._parquet_writer = None
+        self._schema = None
+
+        if format_name == "parquet":
+            pyarrow, parquet = _import_pyarrow()
+            self._pyarrow = pyarrow
+            self._schema = pyarrow.schema(
+                [(name, getattr(pyarrow, type_name)()) for name, type_name in columns.items()]
+            )
+            self._parquet_writer = parquet.ParquetWriter(path, self._schema)
+        else:
+            self._file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        """Write records, as one Parquet row group or as JSONL lines.
+
+        Args:
+            records: Records with the writer columns
+        """
+        if not records:
+            return
+        if self._parquet_writer is not None:
+            table = self._pyarrow.Table.from_pylist(records, schema=self._schema)
+            self._parquet_writer.write_table(table)
+        else:
+            self._file.writelines(json.dumps(record) + "\n" for record in records)
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the output file."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        elif self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+
+
+def aggregate_results(table: MetricTable) -> List[Dict[str, Any]]:
+    """Get the per-model and per-complexity means of the collected results.
+
+    Args:
+        table: Metric table of the per-item results, with a failed flag per result
+
+    Returns:
+        One record per model and complexity level, sorted by model, with the mean of
+        every metric over the results that have it
+    """
+    groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for by in (("model",), ("model", "complexity")):
+        # The failed flag comes first, so count and errors precede the means
+        for row in table.aggregate(by=by, percentiles=()):
+            key = (row["model"], row.get("complexity", ALL_COMPLEXITIES))
+            group = groups.setdefault(key, {"model": key[0], "complexity": key[1]})
+            if row["metric"] == FAILED_METRIC:
+                group["count"] = row["count"]
+                group["errors"] = round(row["mean"] * row["count"])
+            else:
+                group[f"{row['metric']}_mean"] = row["mean"]
+    return [groups[key] for key in sorted(groups)]
+
+
+def evaluate_record(evaluator: SQLMetricsEvaluator, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Evaluate a single input record.
+
+    Args:
+        evaluator: SQL metrics evaluator
+        record: Record with model, query_id, generated, reference and optional complexity,
+            latency and schema fields
+
+    Returns:
+        Per-item result with the metrics, or with an error message if the record could not
+        be evaluated
+    """
+    complexity = str(record.get("complexity") or "medium").lower()
+    result: Dict[str, Any] = {
+        "model": str(record.get("model", "")),
+        "query_id": None if record.get("query_id") is None else str(record["query_id"]),
+        "complexity": complexity,
+        **{field: None for field in METRIC_FIELDS},
+        "error": None,
+    }
+
+    generated = record.get("generated")
+    reference = record.get("reference")
+    if generated is None or reference is None:
+        result["error"] = "Record is missing the generated or reference query"
+        return result
+
+    try:
+        metrics = evaluator.evaluate(
+            generated_query=generated,
+            reference_query=reference,
+            query_complexity=complexity,
+            inference_latency=record.get("latency"),
+            database_schema=record.get("schema"),
+        )
+    except Exception as e:
+        result["error"] = f"Error evaluating query: {str(e)}"
+        return result
+
+    for field in METRIC_FIELDS:
+        result[field] = getattr(metrics, field)
+    if metrics.error_messages:
+        result["error"] = "; ".join(metrics.error_messages)
+    return result
+
+
+def _initialize_worker(options: Dict[str, Any]) -> None:
+    """Create the evaluator of a process pool worker.
+
+    Args:
+        options: Keyword arguments of SQLMetricsEvaluator
+    """
+    global _worker_evaluator
+    _worker_evaluator = SQLMetricsEvaluator(**options)
+
+
+def _evaluate_chunk(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Evaluate a chunk of records in a process pool worker.
+
+    Args:
+        records: Input records
+
+    Returns:
+        Per-item results, in input order
+    """
+    if _worker_evaluator is None:
+        raise RuntimeError("Worker evaluator not initialized")
+    return [evaluate_record(_worker_evaluator, record) for record in records]
+
+
+def _chunks(records: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group streamed records into lists of at most size records."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def evaluate_stream(
+    records: Iterator[Dict[str, Any]],
+    evaluator_options: Dict[str, Any],
+    workers: int = 1,
+    chunk_size: int = 256,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Evaluate streamed records, yielding the results of each chunk in input order.
+
+    With more than one worker, at most two chunks per worker are in flight at a time, so
+    reading the input never runs far ahead of writing the results.
+
+    Args:
+        records: Input records
+        evaluator_options: Keyword arguments of SQLMetricsEvaluator
+        workers: Number of evaluation processes (1 evaluates in the current process)
+        chunk_size: Number of records evaluated per task
+
+    Yields:
+        Per-item results of each chunk
+    """
+    if workers <= 1:
+        evaluator = SQLMetricsEvaluator(**evaluator_options)
+        try:
+            for chunk in _chunks(records, chunk_size):
+                yield [evaluate_record(evaluator, record) for record in chunk]
+        finally:
+            if evaluator.db_executor is not None:
+                evaluator.db_executor.close()
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_initialize_worker, initargs=(evaluator_options,)
+    ) as pool:
+        pending: Deque["Future[List[Dict[str, Any]]]"] = deque()
+        for chunk in _chunks(records, chunk_size):
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+            pending.append(pool.submit(_evaluate_chunk, chunk))
+        while pending:
+            yield pending.popleft().result()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Evaluate an input file and write its results and aggregates.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Run summary with the number of evaluated, failed and invalid records, and the
+        aggregates of each model
+    """
+    counters = {"total": 0, "failed": 0, "invalid": 0}
+    evaluator_options = {
+        "db_connection_string": args.database_url,
+        "execution_timeout": args.execution_timeout,
+        "parser_cache_size": args.parser_cache_size,
+        "memo_path": args.memo,
+    }
+    records = read_records(args.input, _detect_format(args.input, args.input_format), counters)
+    table = MetricTable(metrics=(FAILED_METRIC, *METRIC_FIELDS))
+
+    writer = None
+    if args.output:
+        writer = RecordWriter(
+            args.output, _detect_format(args.output, args.output_format), RESULT_COLUMNS
+        )
+
+    start_time = time.time()
+    try:
+        for results in evaluate_stream(records, evaluator_options, args.workers, args.chunk_size):
+            table.extend(
+                {**result, FAILED_METRIC: 1.0 if result["error"] else 0.0} for result in results
+            )
+            counters["failed"] += sum(1 for result in results if result["error"])
+            if writer is not None:
+                writer.write(results)
+
+            previous = counters["total"]
+            counters["total"] += len(results)
+            if counters["total"] // args.progress_every > previous // args.progress_every:
+                rate = counters["total"] / max(time.time() - start_time, 1e-9)
+                logger.info(f"Evaluated {counters['total']} records ({rate:.0f}/s)")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    rows = aggregate_results(table)
+    if args.aggregates:
+        aggregate_writer = RecordWriter(
+            args.aggregates,
+            _detect_format(args.aggregates, args.output_format),
+            AGGREGATE_COLUMNS,
+        )
+        try:
+            aggregate_writer.write(rows)
+        finally:
+            aggregate_writer.close()
+
+    return {**counters, "total_time": time.time() - start_time, "aggregates": rows}
+
+
+def print_summary(summary: Dict[str, Any], file: IO[str]) -> None:
+    """Print the overall aggregates of each model as a table.
+
+    Args:
+        summary: Run summary returned by run
+        file: Output stream
+    """
+    print(
+        f"Evaluated {summary['total']} records in {summary['total_time']:.1f}s "
+        f"({summary['failed']} failed, {summary['invalid']} invalid)",
+        file=file,
+    )
+    print(
+        f"{'model':<30}{'count':>8}{'exact':>8}{'logical':>9}{'complexity':>12}"
+        f"{'latency ms':>12}",
+        file=file,
+    )
+    for row in summary["aggregates"]:
+        if row["complexity"] != ALL_COMPLEXITIES:
+            continue
+        values = [
+            row[f"{field}_mean"]
+            for field in (
+                "exact_match_accuracy",
+                "logical_form_accuracy",
+                "complexity_handling",
+                "inference_latency",
+            )
+        ]
+        exact, logical, complexity, latency = [
+            float("nan") if value is None else value for value in values
+        ]
+        print(
+            f"{row['model']:<30}{row['count']:>8}{exact:>8.3f}{logical:>9.3f}"
+            f"{complexity:>12.3f}{latency:>12.1f}",
+            file=file,
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line argument parser.
+
+    Returns:
+        Argument parser
+    """
+    parser = argparse.ArgumentParser(
+        prog="sql-metrics-eval",
+        description="Evaluate a JSONL or Parquet file of generated SQL queries.",
+    )
+    parser.add_argument(
+        "input",
+        help="Input file with model, query_id, generated, reference, complexity and latency "
+        "fields ('-' reads JSONL from standard input)",
+    )
+    parser.add_argument("--output", help="Path of the per-item results ('-' for stdout)")
+    parser.add_argument("--aggregates", help="Path of the per-model aggregates")
+    parser.add_argument("--input-format", choices=["jsonl", "parquet"], help="Input format")
+    parser.add_argument("--output-format", choices=["jsonl", "parquet"], help="Output format")
+    parser.add_argument("--workers", type=int, default=1, help="Evaluation processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Records per task")
+    parser.add_argument("--database-url", help="Database for execution accuracy")
+    parser.add_argument(
+        "--execution-timeout", type=int, default=5000, help="Query timeout in milliseconds"
+    )
+    parser.add_argument(
+        "--parser-cache-size", type=int, default=10000, help="Parsed queries cached per process"
+    )
+    parser.add_argument(
+        "--memo",
+        help="SQLite file memoizing evaluation results across runs and worker processes",
+    )
+    parser.add_argument(
+        "--progress-every", type=int, default=10000, help="Records between progress logs"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the command line interface.
+
+    Args:
+        argv: Command line arguments (defaults to sys.argv)
+    """
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    summary = run(args)
+    # Keep standard output for the results when they are written there
+    print_summary(summary, sys.stderr if args.output == "-" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
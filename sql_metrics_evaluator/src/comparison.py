@@ -0,0 +1,376 @@
+"""Result set comparison for execution accuracy."""
+
+import math
+import pickle
+import sys
+import tempfile
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Default in-memory budget per result set before rows are spilled to disk
+DEFAULT_MEMORY_BUDGET_BYTES = 64 * 1024 * 1024
+
+# Number of rows pickled together in a spill file record
+SPILL_CHUNK_ROWS = 1000
+
+
+class SpillFile:
+    """Append-only temporary file holding rows in pickled chunks."""
+
+    def __init__(self) -> None:
+        """Initialize the spill file."""
+        self._file = tempfile.TemporaryFile(prefix="sql-metrics-")
+        self._buffer: List[Tuple[Any, ...]] = []
+        self.row_count = 0
+
+    def append(self, row: Tuple[Any, ...]) -> None:
+        """Append a row, writing buffered rows to disk once a chunk is full.
+
+        Args:
+            row: Row tuple
+        """
+        self._buffer.append(row)
+        self.row_count += 1
+        if len(self._buffer) >= SPILL_CHUNK_ROWS:
+            self._flush()
+
+    def extend(self, rows: Iterable[Tuple[Any, ...]]) -> None:
+        """Append several rows.
+
+        Args:
+            rows: Row tuples
+        """
+        for row in rows:
+            self.append(row)
+
+    def _flush(self) -> None:
+        """Write the buffered rows to disk."""
+        if self._buffer:
+            self._file.seek(0, 2)
+            pickle.dump(self._buffer, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._buffer = []
+
+    def __iter__(self) -> Iterator[Tuple[Any, ...]]:
+        """Iterate over the rows in insertion order."""
+        self._flush()
+        position = 0
+        while True:
+            self._file.seek(position)
+            try:
+                chunk = pickle.load(self._file)
+            except EOFError:
+                return
+            position = self._file.tell()
+            yield from chunk
+
+    def close(self) -> None:
+        """Close and delete the spill file."""
+        self._buffer = []
+        self._file.close()
+
+
+class ResultSet:
+    """Column names and raw row tuples returned by a query.
+
+    Rows are kept in memory unless they were spilled to disk while fetching.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str],
+        rows: List[Sequence[Any]],
+        byte_count: int = 0,
+        spill: Optional[SpillFile] = None,
+    ) -> None:
+        """Initialize the result set.
+
+        Args:
+            columns: Column names in select order
+            rows: Raw rows, each with one value per column (empty when spilled)
+            byte_count: Estimated size of the fetched rows in bytes
+            spill: Spill file holding the rows when they exceeded the memory budget
+        """
+        self.columns = tuple(columns)
+        self.rows = rows
+        self.byte_count = byte_count
+        self.spill = spill
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows in the result set."""
+        if self.spill is not None:
+            return self.spill.row_count
+        return len(self.rows)
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the rows were spilled to disk."""
+        return self.spill is not None
+
+    def iter_rows(self) -> Iterator[Sequence[Any]]:
+        """Iterate over the rows in fetch order.
+
+        Returns:
+            Iterator over the rows
+        """
+        if self.spill is not None:
+            return iter(self.spill)
+        return iter(self.rows)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert the rows into dictionaries keyed by column name.
+
+        Returns:
+            List of row dictionaries
+        """
+        return [dict(zip(self.columns, row)) for row in self.iter_rows()]
+
+    def close(self) -> None:
+        """Release the spill file, if any."""
+        if self.spill is not None:
+            self.spill.close()
+
+
+class ResultSetBuilder:
+    """Accumulate fetched rows into a result set within a memory budget."""
+
+    def __init__(
+        self, columns: Sequence[str], memory_budget_bytes: Optional[int] = None
+    ) -> None:
+        """Initialize the builder.
+
+        Args:
+            columns: Column names in select order
+            memory_budget_bytes: Estimated row size above which rows are spilled to disk
+                (None keeps every row in memory)
+        """
+        self.columns = columns
+        self.memory_budget_bytes = memory_budget_bytes
+        self.byte_count = 0
+        self._rows: List[Tuple[Any, ...]] = []
+        self._spill: Optional[SpillFile] = None
+
+    def add_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """Add a chunk of fetched rows.
+
+        Args:
+            rows: Fetched rows
+        """
+        for row in rows:
+            row = tuple(row)
+            self.byte_count += _estimate_size(row)
+            if self._spill is not None:
+                self._spill.append(row)
+            else:
+                self._rows.append(row)
+
+        # Move every row to disk once the budget is exceeded
+        if (
+            self._spill is None
+            and self.memory_budget_bytes is not None
+            and self.byte_count > self.memory_budget_bytes
+        ):
+            self._spill = SpillFile()
+            self._spill.extend(self._rows)
+            self._rows = []
+
+    def build(self) -> ResultSet:
+        """Create the result set from the added rows.
+
+        Returns:
+            Result set
+        """
+        return ResultSet(self.columns, self._rows, self.byte_count, self._spill)
+
+
+def compare_result_sets(
+    result1: ResultSet,
+    result2: ResultSet,
+    ordered: bool = False,
+    memory_budget_bytes: Optional[int] = None,
+) -> Tuple[bool, Dict[str, Any]]:
+    """Compare two result sets by value, independently of column names.
+
+    Columns are compared by position, so aliased columns still match. If the rows do not
+    match and both results have the same distinct column names in a different order, the
+    columns of the first result are reordered by name and compared again. Unordered
+    comparison treats the rows as a multiset and runs in linear time; spilled results
+    are hash partitioned on disk so that one partition at a time is counted in memory.
+
+    Args:
+        result1: First result set
+        result2: Second result set
+        ordered: Whether the row order must match as well
+        memory_budget_bytes: Memory budget used to size the hash partitions of spilled
+            results
+
+    Returns:
+        Tuple containing:
+            - Boolean indicating if the result sets match
+            - Dictionary with comparison details
+    """
+    details: Dict[str, Any] = {"ordered": ordered}
+
+    # Exit early on shape mismatches
+    details["column_count_match"] = len(result1.columns) == len(result2.columns)
+    if not details["column_count_match"]:
+        details["column_count1"] = len(result1.columns)
+        details["column_count2"] = len(result2.columns)
+        return False, details
+
+    details["row_count_match"] = result1.row_count == result2.row_count
+    if not details["row_count_match"]:
+        details["row_count1"] = result1.row_count
+        details["row_count2"] = result2.row_count
+        return False, details
+
+    details["row_count"] = result1.row_count
+
+    match = _rows_match(result1, result2, ordered, None, memory_budget_bytes)
+
+    # Retry with the columns of the first result reordered to match the second
+    if (
+        not match
+        and result1.columns != result2.columns
+        and sorted(result1.columns) == sorted(result2.columns)
+        and len(set(result1.columns)) == len(result1.columns)
+    ):
+        positions = [result1.columns.index(column) for column in result2.columns]
+        match = _rows_match(result1, result2, ordered, positions, memory_budget_bytes)
+        details["columns_reordered"] = match
+
+    return match, details
+
+
+def _rows_match(
+    result1: ResultSet,
+    result2: ResultSet,
+    ordered: bool,
+    positions: Optional[List[int]],
+    memory_budget_bytes: Optional[int],
+) -> bool:
+    """Compare the rows of two result sets with the same row count.
+
+    Args:
+        result1: First result set
+        result2: Second result set
+        ordered: Whether the row order must match as well
+        positions: Column positions used to reorder the rows of the first result
+        memory_budget_bytes: Memory budget used to size the hash partitions
+
+    Returns:
+        Boolean indicating if the rows match
+    """
+    rows1 = result1.iter_rows()
+    if positions is not None:
+        rows1 = (tuple(row[position] for position in positions) for row in rows1)
+
+    if ordered:
+        return all(tuple(row1) == tuple(row2) for row1, row2 in zip(rows1, result2.iter_rows()))
+
+    if not result1.spilled and not result2.spilled:
+        return _row_counts(rows1) == _row_counts(result2.iter_rows())
+
+    partition_count = 2
+    if memory_budget_bytes:
+        byte_count = max(result1.byte_count, result2.byte_count)
+        partition_count = max(partition_count, 2 * math.ceil(byte_count / memory_budget_bytes))
+    return _partitions_match(rows1, result2.iter_rows(), partition_count)
+
+
+def _partitions_match(
+    rows1: Iterable[Sequence[Any]], rows2: Iterable[Sequence[Any]], partition_count: int
+) -> bool:
+    """Compare two row multisets by hash partitioning them on disk.
+
+    Equal rows always land in the same partition, so the multisets match if and only if
+    every pair of partitions does.
+
+    Args:
+        rows1: First rows
+        rows2: Second rows
+        partition_count: Number of partitions per side
+
+    Returns:
+        Boolean indicating if the rows match
+    """
+    partitions1 = [SpillFile() for _ in range(partition_count)]
+    partitions2 = [SpillFile() for _ in range(partition_count)]
+    try:
+        for rows, partitions in ((rows1, partitions1), (rows2, partitions2)):
+            for row in rows:
+                key = _row_key(row)
+                partitions[hash(key) % partition_count].append(key)
+
+        return all(
+            partition1.row_count == partition2.row_count
+            and Counter(partition1) == Counter(partition2)
+            for partition1, partition2 in zip(partitions1, partitions2)
+        )
+    finally:
+        for partition in partitions1 + partitions2:
+            partition.close()
+
+
+def _row_counts(rows: Iterable[Sequence[Any]]) -> "Counter[Hashable]":
+    """Count the occurrences of each distinct row.
+
+    Args:
+        rows: Rows to count
+
+    Returns:
+        Counter keyed by row tuples
+    """
+    rows = list(rows)
+    try:
+        return Counter(tuple(row) for row in rows)
+    except TypeError:
+        # Rows contain unhashable values such as JSON or array columns
+        return Counter(tuple(_hashable(item) for item in row) for row in rows)
+
+
+def _row_key(row: Sequence[Any]) -> Tuple[Any, ...]:
+    """Convert a row into a hashable tuple.
+
+    Args:
+        row: Row to convert
+
+    Returns:
+        Hashable row tuple
+    """
+    row = tuple(row)
+    try:
+        hash(row)
+        return row
+    except TypeError:
+        return tuple(_hashable(item) for item in row)
+
+
+def _hashable(value: Any) -> Hashable:
+    """Recursively convert a value into a hashable equivalent.
+
+    Args:
+        value: Column value
+
+    Returns:
+        Hashable representation of the value
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_hashable(item) for item in value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _estimate_size(row: Tuple[Any, ...]) -> int:
+    """Estimate the memory used by a fetched row.
+
+    Args:
+        row: Row tuple
+
+    Returns:
+        Approximate size in bytes
+    """
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
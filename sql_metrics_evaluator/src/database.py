@@ -1,49 +1,465 @@
 """Database utilities for SQL metrics evaluation."""
 
+import asyncio
 import logging
+import re
+import threading
 import time
-from contextlib import contextmanager
-from typing import Any, Dict, Generator, List, Optional, Tuple, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Tuple, Union
 
 import sqlalchemy
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
-from sqlalchemy.exc import SQLAlchemyError, TimeoutError
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError, TimeoutError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import Pool, QueuePool
+
+from sql_metrics_evaluator.src.cache import LRUCache
+from sql_metrics_evaluator.src.comparison import (
+    DEFAULT_MEMORY_BUDGET_BYTES,
+    ResultSet,
+    ResultSetBuilder,
+    compare_result_sets,
+)
+from sql_metrics_evaluator.src.instrumentation import record_event, stage
+from sql_metrics_evaluator.src.schema import (
+    FOREIGN_KEY_QUERIES,
+    INFORMATION_SCHEMA_FOREIGN_KEYS_SQL,
+    INFORMATION_SCHEMA_SQL,
+    SCHEMA_QUERIES,
+    DatabaseSchema,
+)
 
 logger = logging.getLogger(__name__)
 
+# Success flag, result set or error message, and execution time in milliseconds
+ExecutionOutcome = Tuple[bool, Union[ResultSet, str], float]
+
+# Async drivers used for the async engine, keyed by database backend
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+    "mysql": "aiomysql",
+}
+
+# Statements setting the session statement timeout in milliseconds, keyed by dialect
+STATEMENT_TIMEOUT_SQL = {
+    "postgresql": "SET statement_timeout TO {timeout_ms}",
+    "mysql": "SET SESSION max_execution_time = {timeout_ms}",
+}
+
+# Errors raised by the database when a query exceeds the session statement timeout
+STATEMENT_TIMEOUT_ERROR_PATTERN = re.compile(
+    r"statement timeout|maximum statement execution time exceeded", re.IGNORECASE
+)
+
+# Connect argument holding the connection timeout in seconds, keyed by DBAPI driver
+CONNECT_TIMEOUT_ARGS = {
+    "psycopg2": "connect_timeout",
+    "asyncpg": "timeout",
+    "mysqldb": "connect_timeout",
+    "pymysql": "connect_timeout",
+    "aiomysql": "connect_timeout",
+    "pysqlite": "timeout",
+    "aiosqlite": "timeout",
+}
+
+# Error message reported for a query cancelled because the other compared query failed
+QUERY_CANCELLED_MESSAGE = "Query cancelled after the other query failed"
+
+# Minimum server versions supporting EXCEPT ALL for in-database comparison, keyed by dialect
+IN_DATABASE_COMPARISON_DIALECTS = {
+    "postgresql": (8, 4),
+    "mysql": (8, 0, 31),
+    "mariadb": (10, 5),
+}
+
+# Probe returning the row counts of both queries and of their multiset differences
+IN_DATABASE_COMPARISON_SQL = """
+WITH _sme_query1 AS ({query1}), _sme_query2 AS ({query2})
+SELECT
+    (SELECT COUNT(*) FROM _sme_query1) AS row_count1,
+    (SELECT COUNT(*) FROM _sme_query2) AS row_count2,
+    (SELECT COUNT(*) FROM (
+        SELECT * FROM _sme_query1 EXCEPT ALL SELECT * FROM _sme_query2
+    ) AS _sme_only1) AS only_in_query1,
+    (SELECT COUNT(*) FROM (
+        SELECT * FROM _sme_query2 EXCEPT ALL SELECT * FROM _sme_query1
+    ) AS _sme_only2) AS only_in_query2
+"""
+
+# Query returning only the column names of a query
+COLUMN_NAMES_SQL = "SELECT * FROM ({query}) AS _sme_columns LIMIT 0"
+
+# Queries that can be wrapped in a common table expression
+SELECT_PATTERN = re.compile(r"^\(*\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+class QueryHandle:
+    """Handle used to cancel a query that is running on another thread."""
+
+    def __init__(self) -> None:
+        """Initialize the query handle."""
+        self.cancelled = False
+        self._dbapi_connection: Any = None
+        self._lock = threading.Lock()
+
+    def attach(self, dbapi_connection: Any) -> bool:
+        """Register the DBAPI connection the query is about to run on.
+
+        Args:
+            dbapi_connection: Raw DBAPI connection
+
+        Returns:
+            False if the query was cancelled before it started
+        """
+        with self._lock:
+            self._dbapi_connection = dbapi_connection
+            return not self.cancelled
+
+    def detach(self) -> None:
+        """Unregister the DBAPI connection once the query has finished."""
+        with self._lock:
+            self._dbapi_connection = None
+
+    def cancel(self) -> None:
+        """Cancel the query, interrupting it on the server if the driver supports it."""
+        with self._lock:
+            self.cancelled = True
+            connection = self._dbapi_connection
+            if connection is None:
+                return
+            
+            # psycopg2 exposes cancel(), sqlite3 exposes interrupt()
+            cancel = getattr(connection, "cancel", None) or getattr(connection, "interrupt", None)
+            if cancel is None:
+                return
+            
+            try:
+                cancel()
+            except Exception as e:
+                logger.warning(f"Failed to cancel query: {str(e)}")
+
+
+class PoolMetrics:
+    """Thread-safe usage counters of a connection pool."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.retries = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait_ms: float) -> None:
+        """Record a connection checkout.
+
+        Args:
+            wait_ms: Time spent waiting for the connection in milliseconds, including
+                opening a new connection when the pool had none available
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_connect(self) -> None:
+        """Record a new database connection."""
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self) -> None:
+        """Record a connection invalidated after an error."""
+        with self._lock:
+            self.invalidations += 1
+
+    def record_retry(self) -> None:
+        """Record a query retried on a new connection."""
+        with self._lock:
+            self.retries += 1
+
+    def stats(self, pool: Pool) -> Dict[str, Union[int, float]]:
+        """Get pool usage statistics.
+
+        Args:
+            pool: Connection pool whose occupancy is reported
+
+        Returns:
+            Dictionary with checkout, connect, invalidation and retry counters, wait times
+            and, for queue pools, the current occupancy
+        """
+        with self._lock:
+            stats: Dict[str, Union[int, float]] = {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "retries": self.retries,
+                "wait_ms_total": self.total_wait_ms,
+                "wait_ms_avg": self.total_wait_ms / self.checkouts if self.checkouts else 0.0,
+                "wait_ms_max": self.max_wait_ms,
+            }
+        
+        if isinstance(pool, QueuePool):
+            stats["size"] = pool.size()
+            stats["checked_out"] = pool.checkedout()
+            stats["checked_in"] = pool.checkedin()
+            stats["overflow"] = pool.overflow()
+        
+        return stats
+
 
 class DatabaseExecutor:
     """Class for executing SQL queries against a database."""
 
-    def __init__(self, connection_string: str, timeout: int = 5000) -> None:
+    def __init__(
+        self,
+        connection_string: str,
+        timeout: int = 5000,
+        reference_cache_size: int = 0,
+        database_version: Optional[str] = None,
+        database_version_ttl: float = 1.0,
+        cancel_on_failure: bool = False,
+        fetch_chunk_size: int = 1000,
+        memory_budget_bytes: Optional[int] = DEFAULT_MEMORY_BUDGET_BYTES,
+        in_database_comparison: bool = False,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle: int = 1800,
+        pool_timeout: float = 30.0,
+        schema_ttl: float = 300.0,
+    ) -> None:
         """Initialize the database executor.
 
         Args:
             connection_string: Database connection string
             timeout: Query execution timeout in milliseconds
+            reference_cache_size: Maximum number of reference query results to cache
+                (0 disables the reference cache)
+            database_version: Snapshot version of the database contents; cached reference
+                results are only reused for the same version. Detected automatically
+                when not provided and the dialect supports it, and reference results are
+                not cached while the version is unknown.
+            database_version_ttl: Time in seconds for which a detected version is reused
+                before it is detected again
+            cancel_on_failure: Whether to cancel the other query of a comparison as soon
+                as one of them fails or times out
+            fetch_chunk_size: Number of rows fetched per round trip from the server-side
+                cursor
+            memory_budget_bytes: Estimated size of a result set above which its rows are
+                spilled to disk (None keeps every row in memory)
+            in_database_comparison: Whether to compare query results inside the database
+                when the dialect supports it, transferring only row counts
+            pool_size: Number of connections kept open in the pool
+            max_overflow: Number of connections opened beyond pool_size under load
+            pool_recycle: Age in seconds after which a pooled connection is replaced
+                (-1 disables recycling)
+            pool_timeout: Time in seconds to wait for a free pooled connection
+            schema_ttl: Time in seconds for which the introspected schema is reused
         """
         self.connection_string = connection_string
         self.timeout_ms = timeout
+        self.cancel_on_failure = cancel_on_failure
+        self.fetch_chunk_size = fetch_chunk_size
+        self.memory_budget_bytes = memory_budget_bytes
+        self.in_database_comparison = in_database_comparison
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.pool_timeout = pool_timeout
+        self._pool_metrics = {"sync": PoolMetrics(), "async": PoolMetrics()}
+        self.schema_ttl = schema_ttl
+        self._schema: Optional[DatabaseSchema] = None
+        # Error of the last failed introspection, raised again until schema_ttl passes
+        self._schema_error: Optional[Exception] = None
+        self._schema_loaded_at = 0.0
+        self._schema_lock = threading.Lock()
+        self._comparison_pool: Optional[ThreadPoolExecutor] = None
+        self._comparison_pool_lock = threading.Lock()
         self.engine: Optional[Engine] = None
+        self._async_engine: Optional[AsyncEngine] = None
+        self._async_engine_unavailable = False
+        self.database_version = database_version
+        self.database_version_ttl = database_version_ttl
+        # An explicit version is kept until invalidated, a detected one for the TTL
+        self._database_version_pinned = database_version is not None
+        self._database_version_detected_at: Optional[float] = None
+        self._reference_cache: Optional[LRUCache] = None
+        
+        if reference_cache_size > 0:
+            self._reference_cache = LRUCache(max_size=reference_cache_size)
+        
         self._initialize_engine()
 
     def _initialize_engine(self) -> None:
         """Initialize the SQLAlchemy engine."""
         try:
-            # Convert timeout from ms to seconds for SQLAlchemy
-            timeout_sec = self.timeout_ms / 1000
-            self.engine = create_engine(
-                self.connection_string,
-                connect_args={"connect_timeout": int(timeout_sec)},
-                pool_pre_ping=True,
-            )
+            url = make_url(self.connection_string)
+            self.engine = create_engine(url, **self._engine_options(url))
+            self._register_pool_events(self.engine, self._pool_metrics["sync"])
             logger.info("Database engine initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database engine: {str(e)}")
             self.engine = None
             raise
 
+    def _get_async_engine(self) -> Optional[AsyncEngine]:
+        """Get the async SQLAlchemy engine, creating it on first use.
+
+        Returns:
+            Async engine, or None if no async driver is available for the database
+        """
+        if self._async_engine is not None or self._async_engine_unavailable:
+            return self._async_engine
+        
+        url = make_url(self.connection_string)
+        driver = ASYNC_DRIVERS.get(url.get_backend_name())
+        if driver is None:
+            logger.info(f"No async driver for {url.get_backend_name()}, using threads instead")
+            self._async_engine_unavailable = True
+            return None
+        
+        try:
+            url = url.set(drivername=f"{url.get_backend_name()}+{driver}")
+            self._async_engine = create_async_engine(url, **self._engine_options(url))
+            self._register_pool_events(
+                self._async_engine.sync_engine, self._pool_metrics["async"]
+            )
+            logger.info("Async database engine initialized successfully")
+        except Exception as e:
+            logger.warning(f"Failed to initialize async database engine, using threads: {str(e)}")
+            self._async_engine_unavailable = True
+        
+        return self._async_engine
+
+    def _engine_options(self, url: URL) -> Dict[str, Any]:
+        """Build the connection pool and connect options for an engine.
+
+        Connections are not pinged before each checkout; a query failing on a stale
+        connection invalidates it and is retried once on a new connection instead.
+
+        Args:
+            url: Database URL including the driver
+
+        Returns:
+            Keyword arguments for create_engine or create_async_engine
+        """
+        options: Dict[str, Any] = {"pool_pre_ping": False, "pool_recycle": self.pool_recycle}
+        
+        # Queue pools are used for every database except in-memory SQLite
+        if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+            options["pool_size"] = self.pool_size
+            options["max_overflow"] = self.max_overflow
+            options["pool_timeout"] = self.pool_timeout
+        
+        # Convert timeout from ms to seconds for the driver
+        connect_timeout_arg = CONNECT_TIMEOUT_ARGS.get(url.get_driver_name())
+        if connect_timeout_arg:
+            options["connect_args"] = {connect_timeout_arg: max(1, int(self.timeout_ms / 1000))}
+        
+        return options
+
+    def _register_pool_events(self, engine: Engine, metrics: PoolMetrics) -> None:
+        """Count pool events and configure each new connection once.
+
+        The session statement timeout is set when a connection is opened instead of
+        before every query.
+
+        Args:
+            engine: Synchronous engine, or the sync_engine of an async engine
+            metrics: Counters updated by the pool events
+        """
+        statement = STATEMENT_TIMEOUT_SQL.get(engine.dialect.name)
+        
+        def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+            metrics.record_connect()
+            if statement is None:
+                return
+            
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute(statement.format(timeout_ms=int(self.timeout_ms)))
+            finally:
+                cursor.close()
+            
+            # Commit so that the setting survives the rollback when the connection is returned
+            dbapi_connection.commit()
+            connection_record.info["statement_timeout_ms"] = self.timeout_ms
+        
+        def on_invalidate(dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+            metrics.record_invalidation()
+        
+        event.listen(engine, "connect", on_connect)
+        event.listen(engine, "invalidate", on_invalidate)
+
+    def _statement_timeout_sql(
+        self, dialect_name: str, info: Dict[str, Any], timeout_ms: int
+    ) -> Optional[str]:
+        """Get the statement needed to run a query with a different timeout.
+
+        Args:
+            dialect_name: Name of the database dialect
+            info: Info dictionary of the pooled connection
+            timeout_ms: Query execution timeout in milliseconds
+
+        Returns:
+            Statement setting the timeout, or None if the connection already uses it or
+            the dialect has no statement timeout
+        """
+        statement = STATEMENT_TIMEOUT_SQL.get(dialect_name)
+        if statement is None or info.get("statement_timeout_ms") == timeout_ms:
+            return None
+        
+        # The setting is rolled back with the transaction on some databases and kept on
+        # others, so only the executor default is known to be in effect afterwards
+        info["statement_timeout_ms"] = timeout_ms if timeout_ms == self.timeout_ms else None
+        return statement.format(timeout_ms=int(timeout_ms))
+
+    def pool_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get connection pool statistics.
+
+        Returns:
+            Dictionary with the statistics of the sync pool and, once created, the async
+            pool
+        """
+        stats = {}
+        if self.engine is not None:
+            stats["sync"] = self._pool_metrics["sync"].stats(self.engine.pool)
+        if self._async_engine is not None:
+            stats["async"] = self._pool_metrics["async"].stats(self._async_engine.sync_engine.pool)
+        return stats
+
+    def _get_comparison_pool(self) -> ThreadPoolExecutor:
+        """Get the thread pool used to run compared queries concurrently.
+
+        Returns:
+            Thread pool, created on first use
+        """
+        with self._comparison_pool_lock:
+            if self._comparison_pool is None:
+                self._comparison_pool = ThreadPoolExecutor(thread_name_prefix="sql-compare")
+            return self._comparison_pool
+
+    def close(self) -> None:
+        """Shut down the comparison thread pool and dispose of the engine."""
+        with self._comparison_pool_lock:
+            if self._comparison_pool is not None:
+                self._comparison_pool.shutdown(wait=True)
+                self._comparison_pool = None
+        
+        if self.engine is not None:
+            self.engine.dispose()
+
+    async def aclose(self) -> None:
+        """Dispose of the async engine and its pooled connections."""
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+            self._async_engine = None
+
     @contextmanager
     def get_connection(self) -> Generator[sqlalchemy.Connection, None, None]:
         """Get a database connection.
@@ -57,20 +473,51 @@ class DatabaseExecutor:
         if not self.engine:
             raise RuntimeError("Database engine not initialized")
 
+        start_time = time.time()
         connection = self.engine.connect()
+        self._pool_metrics["sync"].record_checkout((time.time() - start_time) * 1000)
         try:
             yield connection
         finally:
             connection.close()
 
+    @asynccontextmanager
+    async def aget_connection(self) -> AsyncGenerator[AsyncConnection, None]:
+        """Get a connection from the async engine.
+
+        Yields:
+            A SQLAlchemy async connection
+
+        Raises:
+            RuntimeError: If no async engine is available
+        """
+        async_engine = self._get_async_engine()
+        if async_engine is None:
+            raise RuntimeError("Async database engine not available")
+        
+        start_time = time.time()
+        connection = await async_engine.connect()
+        self._pool_metrics["async"].record_checkout((time.time() - start_time) * 1000)
+        try:
+            yield connection
+        finally:
+            await connection.close()
+
     def execute_query(
-        self, query: str, params: Optional[Dict[str, Any]] = None
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout_ms: Optional[int] = None,
+        handle: Optional[QueryHandle] = None,
     ) -> Tuple[bool, Union[List[Dict[str, Any]], str], float]:
         """Execute a SQL query and return the results.
 
         Args:
             query: SQL query to execute
             params: Query parameters
+            timeout_ms: Query execution timeout in milliseconds (defaults to the
+                executor timeout)
+            handle: Handle through which another thread may cancel the query
 
         Returns:
             Tuple containing:
@@ -78,33 +525,234 @@ class DatabaseExecutor:
                 - Results (list of dictionaries) or error message
                 - Execution time in milliseconds
         """
+        success, result, execution_time_ms = self.fetch_result_set(
+            query, params, timeout_ms, handle
+        )
+        if success:
+            return True, result.to_dicts(), execution_time_ms
+        return False, result, execution_time_ms
+
+    def fetch_result_set(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout_ms: Optional[int] = None,
+        handle: Optional[QueryHandle] = None,
+    ) -> ExecutionOutcome:
+        """Execute a SQL query and return its columns and raw row tuples.
+
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+            timeout_ms: Query execution timeout in milliseconds (defaults to the
+                executor timeout)
+            handle: Handle through which another thread may cancel the query
+
+        Returns:
+            Tuple containing:
+                - Success flag (True if query executed successfully)
+                - Result set or error message
+                - Execution time in milliseconds
+        """
         if not self.engine:
             return False, "Database engine not initialized", 0.0
 
+        timeout_ms = timeout_ms or self.timeout_ms
         start_time = time.time()
         try:
-            with self.get_connection() as conn:
-                # Set statement timeout (PostgreSQL specific)
-                conn.execute(text(f"SET statement_timeout TO {self.timeout_ms}"))
-                
-                # Execute the query
-                result = conn.execute(text(query), params or {})
+            try:
+                rows = self._run_query(query, params, timeout_ms, handle)
+            except DBAPIError as e:
+                # Stale pooled connections are detected by the failing query rather than
+                # by a ping before every checkout, so retry once on a new connection
+                if not e.connection_invalidated or (handle is not None and handle.cancelled):
+                    raise
+                logger.info("Database connection was lost, retrying query on a new connection")
+                self._pool_metrics["sync"].record_retry()
+                rows = self._run_query(query, params, timeout_ms, handle)
+            
+            execution_time_ms = (time.time() - start_time) * 1000
+            if rows is None:
+                return False, QUERY_CANCELLED_MESSAGE, execution_time_ms
+            return True, rows, execution_time_ms
+        except TimeoutError:
+            execution_time_ms = (time.time() - start_time) * 1000
+            record_event("db_timeout")
+            return False, f"Query execution timed out after {timeout_ms}ms", execution_time_ms
+        except SQLAlchemyError as e:
+            execution_time_ms = (time.time() - start_time) * 1000
+            if handle is not None and handle.cancelled:
+                return False, QUERY_CANCELLED_MESSAGE, execution_time_ms
+            if STATEMENT_TIMEOUT_ERROR_PATTERN.search(str(e)):
+                record_event("db_timeout")
+            return False, f"SQL error: {str(e)}", execution_time_ms
+        except Exception as e:
+            execution_time_ms = (time.time() - start_time) * 1000
+            return False, f"Unexpected error: {str(e)}", execution_time_ms
+
+    def _run_query(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]],
+        timeout_ms: int,
+        handle: Optional[QueryHandle],
+    ) -> Optional[ResultSet]:
+        """Run a SQL query on a pooled connection and fetch its results.
+
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+            timeout_ms: Query execution timeout in milliseconds
+            handle: Handle through which another thread may cancel the query
+
+        Returns:
+            Result set, or None if the query was cancelled before it started
+        """
+        with self.get_connection() as conn:
+            if handle is not None and not handle.attach(conn.connection.dbapi_connection):
+                return None
+            
+            try:
+                # Change the session statement timeout only if the query needs another one
+                statement = self._statement_timeout_sql(
+                    conn.dialect.name, conn.connection.info, timeout_ms
+                )
+                if statement is not None:
+                    conn.execute(text(statement))
                 
-                # Fetch all results
-                rows = [dict(row._mapping) for row in result.fetchall()]
+                # Execute the query with a server-side cursor
+                result = conn.execute(
+                    text(query), params or {}, execution_options={"stream_results": True}
+                )
                 
-                execution_time_ms = (time.time() - start_time) * 1000
-                return True, rows, execution_time_ms
+                # Fetch the results in chunks within the memory budget
+                builder = ResultSetBuilder(list(result.keys()), self.memory_budget_bytes)
+                try:
+                    while True:
+                        chunk = result.fetchmany(self.fetch_chunk_size)
+                        if not chunk:
+                            break
+                        builder.add_rows(chunk)
+                finally:
+                    result.close()
+                return builder.build()
+            finally:
+                if handle is not None:
+                    handle.detach()
+
+    async def aexecute_query(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout_ms: Optional[int] = None,
+    ) -> Tuple[bool, Union[List[Dict[str, Any]], str], float]:
+        """Execute a SQL query without blocking the event loop.
+
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+            timeout_ms: Query execution timeout in milliseconds (defaults to the
+                executor timeout)
+
+        Returns:
+            Same tuple as execute_query
+        """
+        success, result, execution_time_ms = await self.afetch_result_set(
+            query, params, timeout_ms
+        )
+        if success:
+            return True, result.to_dicts(), execution_time_ms
+        return False, result, execution_time_ms
+
+    async def afetch_result_set(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout_ms: Optional[int] = None,
+    ) -> ExecutionOutcome:
+        """Execute a SQL query without blocking the event loop and return its result set.
+
+        Uses the async engine when an async driver is available and falls back to running
+        fetch_result_set in a worker thread otherwise.
+
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+            timeout_ms: Query execution timeout in milliseconds (defaults to the
+                executor timeout)
+
+        Returns:
+            Same tuple as fetch_result_set
+        """
+        async_engine = self._get_async_engine()
+        if async_engine is None:
+            return await asyncio.to_thread(self.fetch_result_set, query, params, timeout_ms)
+        
+        timeout_ms = timeout_ms or self.timeout_ms
+        start_time = time.time()
+        try:
+            try:
+                rows = await self._arun_query(query, params, timeout_ms)
+            except DBAPIError as e:
+                # Retry once on a new connection when a stale pooled connection failed
+                if not e.connection_invalidated:
+                    raise
+                logger.info("Database connection was lost, retrying query on a new connection")
+                self._pool_metrics["async"].record_retry()
+                rows = await self._arun_query(query, params, timeout_ms)
+            
+            execution_time_ms = (time.time() - start_time) * 1000
+            return True, rows, execution_time_ms
         except TimeoutError:
             execution_time_ms = (time.time() - start_time) * 1000
-            return False, f"Query execution timed out after {self.timeout_ms}ms", execution_time_ms
+            record_event("db_timeout")
+            return False, f"Query execution timed out after {timeout_ms}ms", execution_time_ms
         except SQLAlchemyError as e:
             execution_time_ms = (time.time() - start_time) * 1000
+            if STATEMENT_TIMEOUT_ERROR_PATTERN.search(str(e)):
+                record_event("db_timeout")
             return False, f"SQL error: {str(e)}", execution_time_ms
         except Exception as e:
             execution_time_ms = (time.time() - start_time) * 1000
             return False, f"Unexpected error: {str(e)}", execution_time_ms
 
+    async def _arun_query(
+        self, query: str, params: Optional[Dict[str, Any]], timeout_ms: int
+    ) -> ResultSet:
+        """Run a SQL query on a pooled async connection and fetch its results.
+
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+            timeout_ms: Query execution timeout in milliseconds
+
+        Returns:
+            Result set
+        """
+        async with self.aget_connection() as conn:
+            # Change the session statement timeout only if the query needs another one
+            raw_connection = await conn.get_raw_connection()
+            statement = self._statement_timeout_sql(
+                conn.dialect.name, raw_connection.info, timeout_ms
+            )
+            if statement is not None:
+                await conn.execute(text(statement))
+            
+            # Execute the query with a server-side cursor
+            result = await conn.stream(text(query), params or {})
+            
+            # Fetch the results in chunks within the memory budget
+            builder = ResultSetBuilder(list(result.keys()), self.memory_budget_bytes)
+            try:
+                while True:
+                    chunk = await result.fetchmany(self.fetch_chunk_size)
+                    if not chunk:
+                        break
+                    builder.add_rows(chunk)
+            finally:
+                await result.close()
+            return builder.build()
+
     def get_schema_info(self) -> Dict[str, Any]:
         """Get database schema information.
 
@@ -114,123 +762,692 @@ class DatabaseExecutor:
         if not self.engine:
             return {"error": "Database engine not initialized"}
 
-        schema_info = {
-            "tables": [],
-            "views": [],
-            "error": None
-        }
-
         try:
-            with self.get_connection() as conn:
-                # Get tables
-                tables_query = """
-                SELECT 
-                    table_name, 
-                    table_schema
-                FROM 
-                    information_schema.tables 
-                WHERE 
-                    table_schema NOT IN ('pg_catalog', 'information_schema')
-                    AND table_type = 'BASE TABLE'
-                ORDER BY 
-                    table_schema, table_name
-                """
-                tables_result = conn.execute(text(tables_query))
-                tables = [dict(row._mapping) for row in tables_result.fetchall()]
-                
-                # Get columns for each table
-                for table in tables:
-                    columns_query = """
-                    SELECT 
-                        column_name, 
-                        data_type, 
-                        is_nullable
-                    FROM 
-                        information_schema.columns
-                    WHERE 
-                        table_schema = :schema
-                        AND table_name = :table
-                    ORDER BY 
-                        ordinal_position
-                    """
-                    columns_result = conn.execute(
-                        text(columns_query),
-                        {"schema": table["table_schema"], "table": table["table_name"]}
-                    )
-                    columns = [dict(row._mapping) for row in columns_result.fetchall()]
-                    
-                    table_info = {
-                        "name": table["table_name"],
-                        "schema": table["table_schema"],
-                        "columns": columns
-                    }
-                    schema_info["tables"].append(table_info)
-                
-                # Get views
-                views_query = """
-                SELECT 
-                    table_name, 
-                    table_schema
-                FROM 
-                    information_schema.tables 
-                WHERE 
-                    table_schema NOT IN ('pg_catalog', 'information_schema')
-                    AND table_type = 'VIEW'
-                ORDER BY 
-                    table_schema, table_name
-                """
-                views_result = conn.execute(text(views_query))
-                views = [dict(row._mapping) for row in views_result.fetchall()]
-                
-                # Get columns for each view
-                for view in views:
-                    columns_query = """
-                    SELECT 
-                        column_name, 
-                        data_type, 
-                        is_nullable
-                    FROM 
-                        information_schema.columns
-                    WHERE 
-                        table_schema = :schema
-                        AND table_name = :view
-                    ORDER BY 
-                        ordinal_position
-                    """
-                    columns_result = conn.execute(
-                        text(columns_query),
-                        {"schema": view["table_schema"], "view": view["table_name"]}
-                    )
-                    columns = [dict(row._mapping) for row in columns_result.fetchall()]
-                    
-                    view_info = {
-                        "name": view["table_name"],
-                        "schema": view["table_schema"],
-                        "columns": columns
-                    }
-                    schema_info["views"].append(view_info)
-                
-                return schema_info
+            return self.get_schema().to_info()
         except Exception as e:
             logger.error(f"Error getting schema info: {str(e)}")
             return {"error": str(e)}
 
+    def get_schema(self, refresh: bool = False) -> DatabaseSchema:
+        """Get the database schema, introspecting it at most once per schema_ttl.
+
+        A failed introspection is logged once and its error is raised again without
+        querying the database until schema_ttl passes.
+
+        Args:
+            refresh: Whether to introspect the schema even if the cached one, or the cached
+                failure, is still valid
+
+        Returns:
+            Database schema
+
+        Raises:
+            RuntimeError: If the engine is not initialized
+            SQLAlchemyError: If the introspection query fails
+        """
+        with self._schema_lock:
+            age = time.monotonic() - self._schema_loaded_at
+            expired = refresh or age >= self.schema_ttl
+            if not expired and self._schema_error is not None:
+                raise self._schema_error.with_traceback(None)
+            if expired or self._schema is None:
+                try:
+                    self._schema = self._introspect_schema()
+                    self._schema_error = None
+                except Exception as e:
+                    logger.error(f"Failed to introspect database schema: {str(e)}")
+                    self._schema = None
+                    self._schema_error = e
+                    raise
+                finally:
+                    self._schema_loaded_at = time.monotonic()
+            return self._schema
+
+    def refresh_schema(self) -> DatabaseSchema:
+        """Introspect the database schema again, e.g. after a migration.
+
+        Returns:
+            Database schema
+        """
+        return self.get_schema(refresh=True)
+
+    def _introspect_schema(self) -> DatabaseSchema:
+        """Fetch every table, view and column with one query, and the foreign keys with another.
+
+        Returns:
+            Database schema
+        """
+        with self.get_connection() as conn:
+            dialect_name = conn.dialect.name
+            schema_query = SCHEMA_QUERIES.get(dialect_name, INFORMATION_SCHEMA_SQL)
+            rows = conn.execute(text(schema_query)).fetchall()
+            
+            # Foreign keys only refine schema checks, so introspection survives without them
+            foreign_key_query = FOREIGN_KEY_QUERIES.get(
+                dialect_name, INFORMATION_SCHEMA_FOREIGN_KEYS_SQL
+            )
+            try:
+                foreign_key_rows = conn.execute(text(foreign_key_query)).fetchall()
+            except DBAPIError as e:
+                logger.warning(f"Error introspecting foreign keys: {str(e)}")
+                conn.rollback()
+                foreign_key_rows = []
+        
+        schema = DatabaseSchema.from_rows(rows, foreign_key_rows)
+        logger.info(
+            f"Introspected database schema with {len(schema.tables)} tables and views "
+            f"and {len(schema.foreign_keys)} foreign key columns"
+        )
+        return schema
+
+    def execute_query_memoized(
+        self,
+        query: str,
+        memo: Optional[Dict[str, ExecutionOutcome]] = None,
+        is_reference: bool = False,
+        timeout_ms: Optional[int] = None,
+        handle: Optional[QueryHandle] = None,
+    ) -> ExecutionOutcome:
+        """Execute a SQL query at most once per memo.
+
+        Args:
+            query: SQL query to execute
+            memo: Execution outcomes keyed by SQL string, shared by the callers of a
+                single evaluation (None executes the query unconditionally)
+            is_reference: Whether the query is a reference query whose results may be
+                served from the reference cache
+            timeout_ms: Query execution timeout in milliseconds
+            handle: Handle through which another thread may cancel the query
+
+        Returns:
+            Same tuple as fetch_result_set, reused from the memo when available
+        """
+        if memo is not None and query in memo:
+            return memo[query]
+        
+        if is_reference:
+            outcome = self.execute_reference_query(query, timeout_ms=timeout_ms, handle=handle)
+        else:
+            outcome = self.fetch_result_set(query, timeout_ms=timeout_ms, handle=handle)
+        
+        if memo is not None:
+            memo[query] = outcome
+        
+        return outcome
+
+    async def aexecute_query_memoized(
+        self,
+        query: str,
+        memo: Optional[Dict[str, ExecutionOutcome]] = None,
+        is_reference: bool = False,
+        timeout_ms: Optional[int] = None,
+    ) -> ExecutionOutcome:
+        """Async version of execute_query_memoized.
+
+        Args:
+            query: SQL query to execute
+            memo: Execution outcomes keyed by SQL string
+            is_reference: Whether the query is a reference query whose results may be
+                served from the reference cache
+            timeout_ms: Query execution timeout in milliseconds
+
+        Returns:
+            Same tuple as fetch_result_set, reused from the memo when available
+        """
+        if memo is not None and query in memo:
+            return memo[query]
+        
+        if is_reference:
+            outcome = await self.aexecute_reference_query(query, timeout_ms=timeout_ms)
+        else:
+            outcome = await self.afetch_result_set(query, timeout_ms=timeout_ms)
+        
+        if memo is not None:
+            memo[query] = outcome
+        
+        return outcome
+
+    async def aexecute_reference_query(
+        self, query: str, timeout_ms: Optional[int] = None
+    ) -> ExecutionOutcome:
+        """Async version of execute_reference_query.
+
+        Args:
+            query: Reference SQL query to execute
+            timeout_ms: Query execution timeout in milliseconds
+
+        Returns:
+            Same tuple as fetch_result_set; cached results report an execution time of 0.0
+        """
+        if self._reference_cache is None:
+            return await self.afetch_result_set(query, timeout_ms=timeout_ms)
+        
+        database_version = self.database_version
+        if self._database_version_expired():
+            database_version = await asyncio.to_thread(self.get_database_version)
+        
+        # Changes to the data cannot be noticed without a version
+        if database_version is None:
+            return await self.afetch_result_set(query, timeout_ms=timeout_ms)
+        
+        key = (self._normalize_reference(query), database_version)
+        cached_result = self._reference_cache.get(key)
+        if cached_result is not None:
+            return True, cached_result, 0.0
+        
+        success, result, execution_time_ms = await self.afetch_result_set(
+            query, timeout_ms=timeout_ms
+        )
+        if success and not result.spilled:
+            self._reference_cache.put(key, result)
+        
+        return success, result, execution_time_ms
+
+    def execute_reference_query(
+        self,
+        query: str,
+        timeout_ms: Optional[int] = None,
+        handle: Optional[QueryHandle] = None,
+    ) -> ExecutionOutcome:
+        """Execute a reference query, reusing cached results for the same database version.
+
+        Only successful executions are cached, so transient failures are retried. Results
+        spilled to disk, and results of a database whose version is unknown, are not cached.
+
+        Args:
+            query: Reference SQL query to execute
+            timeout_ms: Query execution timeout in milliseconds
+            handle: Handle through which another thread may cancel the query
+
+        Returns:
+            Same tuple as fetch_result_set; cached results report an execution time of 0.0
+        """
+        database_version = None if self._reference_cache is None else self.get_database_version()
+        
+        # Changes to the data cannot be noticed without a version
+        if database_version is None:
+            return self.fetch_result_set(query, timeout_ms=timeout_ms, handle=handle)
+        
+        key = (self._normalize_reference(query), database_version)
+        cached_result = self._reference_cache.get(key)
+        if cached_result is not None:
+            return True, cached_result, 0.0
+        
+        success, result, execution_time_ms = self.fetch_result_set(
+            query, timeout_ms=timeout_ms, handle=handle
+        )
+        if success and not result.spilled:
+            self._reference_cache.put(key, result)
+        
+        return success, result, execution_time_ms
+
+    def get_database_version(self) -> Optional[str]:
+        """Get the snapshot version used to key cached reference results.
+
+        Unless it was provided explicitly, the version is detected again once the
+        previous detection is older than database_version_ttl, so that cached results
+        stop being reused shortly after the data changes.
+
+        Returns:
+            Database snapshot version, or None if it is unknown
+        """
+        if self._database_version_expired():
+            self.database_version = self._detect_database_version()
+            self._database_version_detected_at = time.monotonic()
+        
+        return self.database_version
+
+    def _database_version_expired(self) -> bool:
+        """Check whether the database version must be detected again.
+
+        Returns:
+            True if the version was not provided explicitly and was never detected or was
+            detected more than database_version_ttl seconds ago
+        """
+        if self._database_version_pinned:
+            return False
+        
+        detected_at = self._database_version_detected_at
+        return detected_at is None or time.monotonic() - detected_at >= self.database_version_ttl
+
+    def _detect_database_version(self) -> Optional[str]:
+        """Detect a version that changes whenever the database contents change.
+
+        The version combines the number of rows written since the statistics were reset,
+        which PostgreSQL reports once the writing transaction ends, with a hash of the
+        storage file and row version of every relation in the catalog. TRUNCATE gives a
+        table a new storage file and DDL rewrites its catalog row, neither of which counts
+        as a row write. Detection costs one catalog query per database_version_ttl. Other
+        dialects are not supported, and need an explicit version or a call to
+        invalidate_reference_cache after every change.
+
+        Returns:
+            Detected version, or None if the dialect is not supported or detection failed
+        """
+        if not self.engine or self.engine.dialect.name != "postgresql":
+            return None
+        
+        version_query = """
+        SELECT
+            (
+                SELECT tup_inserted + tup_updated + tup_deleted
+                FROM pg_stat_database
+                WHERE datname = current_database()
+            )::text || ':' || (
+                SELECT md5(COALESCE(
+                    string_agg(oid::text || '.' || relfilenode::text || '.' || xmin::text, ','
+                        ORDER BY oid),
+                    ''
+                ))
+                FROM pg_class
+                WHERE relkind IN ('r', 'p', 'v', 'm', 'f')
+                  AND relpersistence <> 't'
+                  AND relnamespace NOT IN (
+                      'pg_catalog'::regnamespace, 'information_schema'::regnamespace
+                  )
+            )
+        """
+        try:
+            with self.get_connection() as conn:
+                version = conn.execute(text(version_query)).scalar()
+                return str(version)
+        except Exception as e:
+            logger.warning(f"Failed to detect database version: {str(e)}")
+            return None
+
+    def invalidate_reference_cache(self, database_version: Optional[str] = None) -> None:
+        """Drop all cached reference results.
+
+        Args:
+            database_version: New snapshot version of the database contents; detected
+                again on next use when not provided
+        """
+        if self._reference_cache is not None:
+            self._reference_cache.invalidate()
+        
+        self.database_version = database_version
+        self._database_version_pinned = database_version is not None
+        self._database_version_detected_at = None
+
+    def cache_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get hit, miss and eviction statistics for the reference cache.
+
+        Returns:
+            Dictionary with statistics for the reference cache, empty if it is disabled
+        """
+        if self._reference_cache is None:
+            return {}
+        
+        return {"reference_results": self._reference_cache.stats()}
+
+    @staticmethod
+    def _normalize_reference(query: str) -> str:
+        """Normalize a reference query for use as a cache key.
+
+        Whitespace inside the query is kept as is, as it may be part of a string literal
+        and change the results.
+
+        Args:
+            query: SQL query
+
+        Returns:
+            Query without leading whitespace, trailing whitespace and trailing semicolons
+        """
+        return query.strip().rstrip("; \t\r\n")
+
     def compare_query_results(
-        self, query1: str, query2: str
+        self,
+        query1: str,
+        query2: str,
+        memo: Optional[Dict[str, ExecutionOutcome]] = None,
+        timeout_ms: Optional[int] = None,
+        ordered: bool = False,
     ) -> Tuple[bool, Dict[str, Any]]:
         """Compare the results of two SQL queries.
 
+        Both queries run concurrently on separate pooled connections, so the latency is
+        close to that of the slower query.
+
+        Args:
+            query1: First SQL query
+            query2: Second SQL query, treated as the reference query whose results may
+                be served from the reference cache
+            memo: Execution outcomes keyed by SQL string, so each distinct query is
+                executed at most once across comparisons sharing the memo
+            timeout_ms: Query execution timeout in milliseconds (defaults to the
+                executor timeout)
+            ordered: Whether the row order must match as well, e.g. when the reference
+                query has an ORDER BY clause
+
+        Returns:
+            Tuple containing:
+                - Boolean indicating if results match
+                - Dictionary with comparison details
+        """
+        # Identical queries only need to be executed once
+        if query1 == query2:
+            outcome = self.execute_query_memoized(
+                query2, memo, is_reference=True, timeout_ms=timeout_ms
+            )
+            with stage("comparison"):
+                return self._compare_outcomes(outcome, outcome, ordered)
+        
+        # Compare inside the database when possible, falling back to fetching both results
+        if self.in_database_comparison and not ordered:
+            in_database = self.compare_in_database(query1, query2, timeout_ms=timeout_ms)
+            if in_database is not None:
+                return in_database
+        
+        handle1 = QueryHandle()
+        handle2 = QueryHandle()
+        
+        # Run the first query on the comparison pool and the second on this thread
+        future1 = self._get_comparison_pool().submit(
+            self.execute_query_memoized, query1, memo, False, timeout_ms, handle1
+        )
+        if self.cancel_on_failure:
+            future1.add_done_callback(lambda future: self._cancel_if_failed(future, handle2))
+        
+        outcome2 = self.execute_query_memoized(query2, memo, True, timeout_ms, handle2)
+        if self.cancel_on_failure and not outcome2[0]:
+            handle1.cancel()
+        
+        outcome1 = future1.result()
+        
+        with stage("comparison"):
+            return self._compare_outcomes(outcome1, outcome2, ordered)
+
+    @staticmethod
+    def _cancel_if_failed(future: "Future[ExecutionOutcome]", handle: QueryHandle) -> None:
+        """Cancel a query when the query of the given future failed.
+
+        Args:
+            future: Future of the other query of a comparison
+            handle: Handle of the query to cancel
+        """
+        if future.exception() is not None or not future.result()[0]:
+            handle.cancel()
+
+    async def acompare_query_results(
+        self,
+        query1: str,
+        query2: str,
+        memo: Optional[Dict[str, ExecutionOutcome]] = None,
+        timeout_ms: Optional[int] = None,
+        ordered: bool = False,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Async version of compare_query_results.
+
+        Both queries run concurrently as separate tasks; with cancel_on_failure, the
+        pending task is cancelled as soon as the other one fails.
+
+        Args:
+            query1: First SQL query
+            query2: Second SQL query, treated as the reference query
+            memo: Execution outcomes keyed by SQL string
+            timeout_ms: Query execution timeout in milliseconds
+            ordered: Whether the row order must match as well
+
+        Returns:
+            Tuple containing:
+                - Boolean indicating if results match
+                - Dictionary with comparison details
+        """
+        # Identical queries only need to be executed once
+        if query1 == query2:
+            outcome = await self.aexecute_query_memoized(
+                query2, memo, is_reference=True, timeout_ms=timeout_ms
+            )
+            with stage("comparison"):
+                return self._compare_outcomes(outcome, outcome, ordered)
+        
+        # Compare inside the database when possible, falling back to fetching both results
+        if self.in_database_comparison and not ordered:
+            in_database = await self.acompare_in_database(query1, query2, timeout_ms=timeout_ms)
+            if in_database is not None:
+                return in_database
+        
+        start_time = time.time()
+        task1 = asyncio.ensure_future(
+            self.aexecute_query_memoized(query1, memo, timeout_ms=timeout_ms)
+        )
+        task2 = asyncio.ensure_future(
+            self.aexecute_query_memoized(query2, memo, is_reference=True, timeout_ms=timeout_ms)
+        )
+        
+        if self.cancel_on_failure:
+            pending = {task1, task2}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if any(not task.result()[0] for task in done):
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.wait(pending)
+                    break
+        else:
+            await asyncio.wait({task1, task2})
+        
+        outcome1, outcome2 = (
+            (False, QUERY_CANCELLED_MESSAGE, (time.time() - start_time) * 1000)
+            if task.cancelled()
+            else task.result()
+            for task in (task1, task2)
+        )
+        
+        with stage("comparison"):
+            return self._compare_outcomes(outcome1, outcome2, ordered)
+
+    def compare_in_database(
+        self, query1: str, query2: str, timeout_ms: Optional[int] = None
+    ) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """Compare the results of two SQL queries with a single statement in the database.
+
+        Both queries are wrapped in common table expressions and compared with EXCEPT ALL
+        in both directions, so only four counts are transferred. Columns are compared by
+        position, as in client-side comparison. Results with the same row count but
+        different rows are probed for their column names, within the same timeout.
+
+        Args:
+            query1: First SQL query
+            query2: Second SQL query
+            timeout_ms: Query execution timeout in milliseconds
+
+        Returns:
+            Same tuple as compare_query_results, or None when the dialect or the query
+            shape does not allow in-database comparison and the results must be compared
+            client-side
+        """
+        probe = self._in_database_probe(query1, query2)
+        if probe is None:
+            return None
+        
+        outcome = self.fetch_result_set(probe, timeout_ms=timeout_ms)
+        comparison = self._in_database_comparison(outcome)
+        if comparison is None or comparison[0] or not comparison[1]["row_count_match"]:
+            return comparison
+        
+        # Results with the same columns in a different order are matched client-side
+        columns = [
+            self.fetch_result_set(
+                COLUMN_NAMES_SQL.format(query=self._as_subquery(query)), timeout_ms=timeout_ms
+            )
+            for query in (query1, query2)
+        ]
+        if self._columns_reordered(*columns):
+            return None
+        
+        return comparison
+
+    async def acompare_in_database(
+        self, query1: str, query2: str, timeout_ms: Optional[int] = None
+    ) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """Async version of compare_in_database.
+
+        Args:
+            query1: First SQL query
+            query2: Second SQL query
+            timeout_ms: Query execution timeout in milliseconds
+
+        Returns:
+            Same as compare_in_database
+        """
+        probe = self._in_database_probe(query1, query2)
+        if probe is None:
+            return None
+        
+        outcome = await self.afetch_result_set(probe, timeout_ms=timeout_ms)
+        comparison = self._in_database_comparison(outcome)
+        if comparison is None or comparison[0] or not comparison[1]["row_count_match"]:
+            return comparison
+        
+        # Results with the same columns in a different order are matched client-side
+        columns = [
+            await self.afetch_result_set(
+                COLUMN_NAMES_SQL.format(query=self._as_subquery(query)), timeout_ms=timeout_ms
+            )
+            for query in (query1, query2)
+        ]
+        if self._columns_reordered(*columns):
+            return None
+        
+        return comparison
+
+    def _in_database_probe(self, query1: str, query2: str) -> Optional[str]:
+        """Build the in-database comparison statement for two queries.
+
         Args:
             query1: First SQL query
             query2: Second SQL query
 
+        Returns:
+            Comparison statement, or None if the dialect or a query does not support it
+        """
+        if self.engine is None:
+            return None
+        
+        dialect = self.engine.dialect
+        minimum_version = IN_DATABASE_COMPARISON_DIALECTS.get(dialect.name)
+        if minimum_version is None:
+            return None
+        
+        # The server version is only known after the first connection
+        server_version = dialect.server_version_info
+        try:
+            if server_version and tuple(server_version[:len(minimum_version)]) < minimum_version:
+                return None
+        except TypeError:
+            return None
+        
+        subquery1 = self._as_subquery(query1)
+        subquery2 = self._as_subquery(query2)
+        if subquery1 is None or subquery2 is None:
+            return None
+        
+        return IN_DATABASE_COMPARISON_SQL.format(query1=subquery1, query2=subquery2)
+
+    @staticmethod
+    def _as_subquery(query: str) -> Optional[str]:
+        """Prepare a query for use inside a common table expression.
+
+        Args:
+            query: SQL query
+
+        Returns:
+            Query without the trailing semicolon, or None if it is not a single SELECT
+            statement
+        """
+        statement = query.strip().rstrip(";").strip()
+        if ";" in statement or not SELECT_PATTERN.match(statement):
+            return None
+        return statement
+
+    @staticmethod
+    def _in_database_comparison(
+        outcome: ExecutionOutcome,
+    ) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """Build comparison details from the outcome of an in-database comparison.
+
+        Args:
+            outcome: Execution outcome of the comparison statement
+
+        Returns:
+            Same tuple as compare_query_results, or None if the statement failed, e.g.
+            because either query is invalid or the column counts or types differ
+        """
+        success, result, execution_time_ms = outcome
+        if not success:
+            logger.debug(f"In-database comparison failed, comparing client-side: {result}")
+            return None
+        
+        row_count1, row_count2, only_in_query1, only_in_query2 = result.rows[0]
+        row_count_match = row_count1 == row_count2
+        match = row_count_match and only_in_query1 == 0 and only_in_query2 == 0
+        
+        # Both queries run within the single comparison statement
+        comparison = {
+            "query1_success": True,
+            "query2_success": True,
+            "query1_time_ms": execution_time_ms,
+            "query2_time_ms": execution_time_ms,
+            "both_succeeded": True,
+            "result_match": match,
+            "error": None,
+            "in_database": True,
+            "ordered": False,
+            "row_count_match": row_count_match,
+            "query1_rows": row_count1,
+            "query2_rows": row_count2,
+            "rows_only_in_query1": only_in_query1,
+            "rows_only_in_query2": only_in_query2,
+        }
+        if row_count_match:
+            comparison["row_count"] = row_count1
+        else:
+            comparison["row_count1"] = row_count1
+            comparison["row_count2"] = row_count2
+        
+        return match, comparison
+
+    @staticmethod
+    def _columns_reordered(outcome1: ExecutionOutcome, outcome2: ExecutionOutcome) -> bool:
+        """Check whether two queries return the same distinct columns in a different order.
+
+        Args:
+            outcome1: Execution outcome of the first column name query
+            outcome2: Execution outcome of the second column name query
+
+        Returns:
+            True if the column names are a reordering of each other, or could not be
+            determined
+        """
+        if not outcome1[0] or not outcome2[0]:
+            return True
+        
+        columns1 = outcome1[1].columns
+        columns2 = outcome2[1].columns
+        return (
+            columns1 != columns2
+            and sorted(columns1) == sorted(columns2)
+            and len(set(columns1)) == len(columns1)
+        )
+
+    def _compare_outcomes(
+        self, outcome1: ExecutionOutcome, outcome2: ExecutionOutcome, ordered: bool = False
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Compare the execution outcomes of two SQL queries.
+
+        Args:
+            outcome1: Execution outcome of the first query
+            outcome2: Execution outcome of the second query
+            ordered: Whether the row order must match as well
+
         Returns:
             Tuple containing:
                 - Boolean indicating if results match
                 - Dictionary with comparison details
         """
-        success1, result1, time1 = self.execute_query(query1)
-        success2, result2, time2 = self.execute_query(query2)
+        success1, result1, time1 = outcome1
+        success2, result2, time2 = outcome2
         
         comparison = {
             "query1_success": success1,
@@ -252,27 +1469,25 @@ class DatabaseExecutor:
         
         # If both queries succeeded, compare results
         try:
-            # Check if results are lists (as expected)
-            if not isinstance(result1, list) or not isinstance(result2, list):
+            # Check if results are result sets (as expected)
+            if not isinstance(result1, ResultSet) or not isinstance(result2, ResultSet):
                 comparison["error"] = "One or both query results are not in the expected format"
                 return False, comparison
             
-            # Compare result sets (order-independent)
-            if len(result1) != len(result2):
-                comparison["result_match"] = False
-                comparison["row_count_match"] = False
-                comparison["row_count1"] = len(result1)
-                comparison["row_count2"] = len(result2)
-            else:
-                # Sort results by converting to tuples of sorted items
-                sorted_result1 = sorted([tuple(sorted(row.items())) for row in result1])
-                sorted_result2 = sorted([tuple(sorted(row.items())) for row in result2])
-                
-                comparison["result_match"] = sorted_result1 == sorted_result2
-                comparison["row_count_match"] = True
-                comparison["row_count"] = len(result1)
+            # Report the rows and bytes transferred for each query
+            for index, result in ((1, result1), (2, result2)):
+                comparison[f"query{index}_rows"] = result.row_count
+                comparison[f"query{index}_bytes"] = result.byte_count
+                comparison[f"query{index}_spilled"] = result.spilled
+            
+            # Compare result sets by value (order-independent unless requested)
+            match, details = compare_result_sets(
+                result1, result2, ordered=ordered, memory_budget_bytes=self.memory_budget_bytes
+            )
+            comparison.update(details)
+            comparison["result_match"] = match
             
-            return comparison["result_match"], comparison
+            return match, comparison
         except Exception as e:
             comparison["error"] = f"Error comparing results: {str(e)}"
-            return False, comparison 
\ No newline at end of file
+            return False, comparison
\ No newline at end of file
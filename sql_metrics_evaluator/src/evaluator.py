@@ -1,20 +1,74 @@
 """SQL metrics evaluator module."""
 
+import asyncio
+import hashlib
+import json
 import logging
+import re
 import time
-from typing import Any, Dict, List, Optional, Tuple, Union
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
-from sql_metrics_evaluator.src.database import DatabaseExecutor
+from sql_metrics_evaluator.src.cache import LRUCache, SQLiteCache
+from sql_metrics_evaluator.src.comparison import DEFAULT_MEMORY_BUDGET_BYTES
+from sql_metrics_evaluator.src.instrumentation import EvaluationTrace, stage, trace_evaluation
 from sql_metrics_evaluator.src.models import (
     EvaluationRequest,
     EvaluationResponse,
     QueryComplexity,
     SQLMetrics,
 )
-from sql_metrics_evaluator.src.parser import SQLParser
+from sql_metrics_evaluator.src.profiling import RequestProfiler
+from sql_metrics_evaluator.src.schema import DatabaseSchema, parse_schema_text
+
+# The parser and the database executor load sqlglot and SQLAlchemy, so they are imported
+# when an evaluator is created rather than with this module
+if TYPE_CHECKING:
+    from sql_metrics_evaluator.src.database import DatabaseExecutor
+    from sql_metrics_evaluator.src.parser import AnalyzedQuery
 
 logger = logging.getLogger(__name__)
 
+# Evaluator used by process pool workers for static analysis in evaluate_batch
+_worker_evaluator: Optional["SQLMetricsEvaluator"] = None
+
+# Introspected database schema shared with process pool workers
+_worker_schema: Optional[DatabaseSchema] = None
+
+# Number of parsed schema descriptions cached by content hash
+SCHEMA_CACHE_SIZE = 64
+
+# Version of the evaluation logic, part of every memo key; increment it whenever a change
+# alters the metrics of an evaluation so that memoized results are no longer reused
+EVALUATOR_VERSION = 2
+
+# Metrics describing a single call rather than its inputs, left out of memoized results
+MEMO_EXCLUDED_FIELDS = {"inference_latency", "evaluation_time", "stage_timings", "profile"}
+
+# Execution errors that may not happen again, whose metrics are not memoized: timeouts,
+# and connections that could not be opened or were lost
+TRANSIENT_ERROR_PATTERN = re.compile(
+    r"timed out|statement timeout|maximum statement execution time|could not connect"
+    r"|can't connect|connection (?:reset|refused|timed out)|server closed the connection"
+    r"|lost connection",
+    re.IGNORECASE,
+)
+
 
 class SQLMetricsEvaluator:
     """Class for evaluating SQL generation models with real-time metrics."""
@@ -24,6 +78,25 @@ class SQLMetricsEvaluator:
         db_connection_string: Optional[str] = None,
         execution_timeout: int = 5000,
         complexity_weights: Optional[Dict[str, float]] = None,
+        parser_cache_size: int = 0,
+        reference_cache_size: int = 0,
+        database_version: Optional[str] = None,
+        database_version_ttl: float = 1.0,
+        cancel_on_failure: bool = False,
+        ordered_comparison: bool = False,
+        fetch_chunk_size: int = 1000,
+        memory_budget_bytes: Optional[int] = DEFAULT_MEMORY_BUDGET_BYTES,
+        in_database_comparison: bool = False,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle: int = 1800,
+        schema_ttl: float = 300.0,
+        profiling: bool = False,
+        profile_sample_rate: float = 0.0,
+        profile_top_n: int = 20,
+        profile_dir: Optional[str] = None,
+        memo_size: int = 0,
+        memo_path: Optional[str] = None,
     ) -> None:
         """Initialize the SQL metrics evaluator.
 
@@ -31,15 +104,78 @@ class SQLMetricsEvaluator:
             db_connection_string: Database connection string for execution accuracy testing
             execution_timeout: Query execution timeout in milliseconds
             complexity_weights: Weights for different complexity levels
+            parser_cache_size: Number of normalized and parsed queries to cache (0 disables
+                caching)
+            reference_cache_size: Number of reference query results to cache (0 disables
+                caching)
+            database_version: Snapshot version of the database contents used to key cached
+                reference results (detected automatically when not provided)
+            database_version_ttl: Time in seconds for which a detected database version is
+                reused before it is detected again
+            cancel_on_failure: Whether to cancel the other query of a comparison as soon as
+                one of them fails or times out
+            ordered_comparison: Whether result rows must also match in order when the
+                reference query has an ORDER BY clause
+            fetch_chunk_size: Number of result rows fetched per round trip
+            memory_budget_bytes: Estimated size of a query result above which its rows are
+                spilled to disk (None keeps every row in memory)
+            in_database_comparison: Whether to compare query results inside the database
+                when the dialect supports it, instead of fetching both results
+            pool_size: Number of database connections kept open in the pool
+            max_overflow: Number of connections opened beyond pool_size under load
+            pool_recycle: Age in seconds after which a pooled connection is replaced
+            schema_ttl: Time in seconds for which the introspected database schema is reused
+            profiling: Whether evaluations may be profiled with cProfile, when requested or
+                sampled
+            profile_sample_rate: Fraction of evaluations profiled without being requested
+            profile_top_n: Number of hot functions reported per profile
+            profile_dir: Directory raw profiles are saved to (None keeps them in memory)
+            memo_size: Number of whole evaluation results memoized in memory, or in the
+                memo_path file when given (0 disables memoization in memory, and keeps the
+                default size of the file)
+            memo_path: SQLite file whole evaluation results are memoized in, shared by
+                every process using it and kept across restarts
         """
-        self.parser = SQLParser()
-        self.db_executor = None
+        from sql_metrics_evaluator.src.parser import SQLParser
+        
+        self.parser = SQLParser(cache_size=parser_cache_size)
+        self.parser_cache_size = parser_cache_size
+        self.ordered_comparison = ordered_comparison
+        self.db_executor: Optional["DatabaseExecutor"] = None
+        self._schema_cache = LRUCache(max_size=SCHEMA_CACHE_SIZE)
+        self.profiler: Optional[RequestProfiler] = None
+        self._memo: Optional[Union[LRUCache, SQLiteCache]] = None
+        
+        if memo_path and memo_size > 0:
+            self._memo = SQLiteCache(memo_path, max_size=memo_size)
+        elif memo_path:
+            self._memo = SQLiteCache(memo_path)
+        elif memo_size > 0:
+            self._memo = LRUCache(max_size=memo_size)
+        
+        if profiling:
+            self.profiler = RequestProfiler(
+                sample_rate=profile_sample_rate, top_n=profile_top_n, output_dir=profile_dir
+            )
         
         if db_connection_string:
             try:
+                from sql_metrics_evaluator.src.database import DatabaseExecutor
+                
                 self.db_executor = DatabaseExecutor(
                     connection_string=db_connection_string,
-                    timeout=execution_timeout
+                    timeout=execution_timeout,
+                    reference_cache_size=reference_cache_size,
+                    database_version=database_version,
+                    database_version_ttl=database_version_ttl,
+                    cancel_on_failure=cancel_on_failure,
+                    fetch_chunk_size=fetch_chunk_size,
+                    memory_budget_bytes=memory_budget_bytes,
+                    in_database_comparison=in_database_comparison,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                    pool_recycle=pool_recycle,
+                    schema_ttl=schema_ttl,
                 )
                 logger.info("Database executor initialized successfully")
             except Exception as e:
@@ -51,6 +187,17 @@ class SQLMetricsEvaluator:
             QueryComplexity.MEDIUM: 0.3,
             QueryComplexity.COMPLEX: 0.5,
         }
+        
+        # Settings that change the metrics of an evaluation, part of every memo key
+        self._memo_config = json.dumps(
+            [
+                EVALUATOR_VERSION,
+                self.parser.dialect,
+                ordered_comparison,
+                sorted((str(key), weight) for key, weight in self.complexity_weights.items()),
+                db_connection_string if self.db_executor else None,
+            ]
+        )
 
     def evaluate(
         self,
@@ -60,9 +207,74 @@ class SQLMetricsEvaluator:
         inference_latency: Optional[float] = None,
         database_schema: Optional[str] = None,
         execution_timeout: Optional[int] = None,
+        profile: bool = False,
     ) -> SQLMetrics:
         """Evaluate a generated SQL query against a reference query.
 
+        Args:
+            generated_query: SQL query generated by the model
+            reference_query: Reference SQL query to compare against
+            query_complexity: Complexity level of the query
+            inference_latency: Time taken to generate the query in milliseconds
+            database_schema: Database schema for zero-shot evaluation
+            execution_timeout: Timeout for query execution in milliseconds
+            profile: Whether to profile the evaluation, if the evaluator was created with
+                profiling enabled
+
+        Returns:
+            SQLMetrics object with evaluation results, with the hot functions of profiled
+            evaluations in its profile field
+        """
+        arguments = (
+            generated_query,
+            reference_query,
+            query_complexity,
+            inference_latency,
+            database_schema,
+            execution_timeout,
+        )
+        profiled = self.profiler is not None and self.profiler.should_profile(profile)
+        
+        memo_keys: List[str] = []
+        if self._memo is not None:
+            if profiled:
+                # Profiled evaluations run in full for the profile to cover them
+                memo_keys = list(
+                    self._memo_keys(
+                        generated_query,
+                        reference_query,
+                        query_complexity,
+                        database_schema,
+                        execution_timeout,
+                    )
+                )
+            else:
+                memo_keys, metrics = self._recall(*arguments)
+                if metrics is not None:
+                    return metrics
+        
+        if profiled:
+            metrics, report = self.profiler.run(self._evaluate, *arguments)
+            metrics.profile = report
+        else:
+            metrics = self._evaluate(*arguments)
+        
+        if memo_keys:
+            self._memoize(memo_keys, metrics)
+        
+        return metrics
+
+    def _evaluate(
+        self,
+        generated_query: str,
+        reference_query: str,
+        query_complexity: Union[str, QueryComplexity],
+        inference_latency: Optional[float],
+        database_schema: Optional[str],
+        execution_timeout: Optional[int],
+    ) -> SQLMetrics:
+        """Evaluate a generated SQL query against a reference query without profiling.
+
         Args:
             generated_query: SQL query generated by the model
             reference_query: Reference SQL query to compare against
@@ -76,79 +288,531 @@ class SQLMetricsEvaluator:
         """
         start_time = time.time()
         
-        # Initialize metrics
-        metrics = SQLMetrics()
+        with trace_evaluation() as trace:
+            # Fall back to the introspected schema for zero-shot evaluation
+            schema = self._introspected_schema(database_schema)
+            
+            # Calculate all metrics that only need static analysis
+            metrics, order_by = self._evaluate_static(
+                generated_query,
+                reference_query,
+                query_complexity,
+                inference_latency,
+                database_schema,
+                schema,
+            )
+            
+            # Calculate execution-based metrics if database executor is available
+            if self.db_executor:
+                with stage("execution"):
+                    match, comparison = self.db_executor.compare_query_results(
+                        generated_query,
+                        reference_query,
+                        memo={},
+                        timeout_ms=execution_timeout,
+                        ordered=self._requires_ordered_comparison(order_by),
+                    )
+                self._apply_execution_results(metrics, match, comparison)
         
-        # Set inference latency if provided
-        if inference_latency is not None:
-            metrics.inference_latency = inference_latency
+        # Record evaluation time and stage timings
+        metrics.evaluation_time = (time.time() - start_time) * 1000
+        metrics.stage_timings = trace.timings_ms()
+        trace.record(metrics.evaluation_time / 1000)
         
-        # Update database executor timeout if provided
-        if execution_timeout is not None and self.db_executor:
-            self.db_executor.timeout_ms = execution_timeout
+        return metrics
+
+    async def aevaluate(
+        self,
+        generated_query: str,
+        reference_query: str,
+        query_complexity: Union[str, QueryComplexity] = QueryComplexity.MEDIUM,
+        inference_latency: Optional[float] = None,
+        database_schema: Optional[str] = None,
+        execution_timeout: Optional[int] = None,
+        profile: bool = False,
+    ) -> SQLMetrics:
+        """Evaluate a generated SQL query without blocking the event loop.
+
+        Static analysis runs in a worker thread and queries are executed through the async
+        database engine.
+
+        Args:
+            generated_query: SQL query generated by the model
+            reference_query: Reference SQL query to compare against
+            query_complexity: Complexity level of the query
+            inference_latency: Time taken to generate the query in milliseconds
+            database_schema: Database schema for zero-shot evaluation
+            execution_timeout: Timeout for query execution in milliseconds
+            profile: Whether to profile the evaluation, if the evaluator was created with
+                profiling enabled
+
+        Returns:
+            SQLMetrics object with evaluation results
+        """
+        if self.profiler is not None and self.profiler.should_profile(profile):
+            # cProfile only follows the thread that enables it, so a profiled evaluation
+            # runs synchronously in a single worker thread
+            return await asyncio.to_thread(
+                self.evaluate,
+                generated_query,
+                reference_query,
+                query_complexity,
+                inference_latency,
+                database_schema,
+                execution_timeout,
+                profile=True,
+            )
         
-        # Ensure query_complexity is a QueryComplexity enum
-        if isinstance(query_complexity, str):
-            try:
-                query_complexity = QueryComplexity(query_complexity)
-            except ValueError:
-                query_complexity = QueryComplexity.MEDIUM
+        memo_keys: List[str] = []
+        if self._memo is not None:
+            memo_keys, metrics = await asyncio.to_thread(
+                self._recall,
+                generated_query,
+                reference_query,
+                query_complexity,
+                inference_latency,
+                database_schema,
+                execution_timeout,
+            )
+            if metrics is not None:
+                return metrics
         
-        # Calculate exact match accuracy
-        exact_match = self._calculate_exact_match_accuracy(generated_query, reference_query)
-        metrics.exact_match_accuracy = 1.0 if exact_match else 0.0
+        start_time = time.time()
         
-        # Calculate logical form accuracy
-        logical_equivalence, comparison_details = self._calculate_logical_form_accuracy(
-            generated_query, reference_query
-        )
-        metrics.logical_form_accuracy = 1.0 if logical_equivalence else 0.0
-        metrics.parsing_details = comparison_details
+        # The trace follows the static analysis into its worker thread with the context
+        with trace_evaluation() as trace:
+            # Fall back to the introspected schema for zero-shot evaluation
+            schema = None
+            if self.db_executor and not database_schema:
+                schema = await asyncio.to_thread(self._introspected_schema, database_schema)
+            
+            # Calculate all metrics that only need static analysis off the event loop
+            metrics, order_by = await asyncio.to_thread(
+                self._evaluate_static,
+                generated_query,
+                reference_query,
+                query_complexity,
+                inference_latency,
+                database_schema,
+                schema,
+            )
+            
+            # Calculate execution-based metrics if database executor is available
+            if self.db_executor:
+                with stage("execution"):
+                    match, comparison = await self.db_executor.acompare_query_results(
+                        generated_query,
+                        reference_query,
+                        memo={},
+                        timeout_ms=execution_timeout,
+                        ordered=self._requires_ordered_comparison(order_by),
+                    )
+                self._apply_execution_results(metrics, match, comparison)
         
-        # Calculate execution accuracy if database executor is available
+        # Record evaluation time and stage timings
+        metrics.evaluation_time = (time.time() - start_time) * 1000
+        metrics.stage_timings = trace.timings_ms()
+        trace.record(metrics.evaluation_time / 1000)
+        
+        if memo_keys:
+            await asyncio.to_thread(self._memoize, memo_keys, metrics)
+        
+        return metrics
+
+    async def aevaluate_batch(
+        self, requests: List[EvaluationRequest], max_concurrency: int = 16
+    ) -> List[EvaluationResponse]:
+        """Evaluate a batch of SQL queries concurrently on the event loop.
+
+        Responses are returned in request order, and a failing item yields a response with
+        error messages instead of failing the whole batch.
+
+        Args:
+            requests: List of evaluation requests
+            max_concurrency: Maximum number of items evaluated at the same time
+
+        Returns:
+            List of evaluation responses
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def evaluate_request(request: EvaluationRequest) -> EvaluationResponse:
+            async with semaphore:
+                return await self._aevaluate_request(request)
+        
+        return await asyncio.gather(*(evaluate_request(request) for request in requests))
+
+    async def aevaluate_stream(
+        self,
+        requests: AsyncIterable[EvaluationRequest],
+        max_concurrency: int = 16,
+        ordered: bool = True,
+    ) -> AsyncIterator[EvaluationResponse]:
+        """Evaluate a stream of SQL queries, yielding each response as soon as it is ready.
+
+        At most max_concurrency items are in flight at any time, so memory use does not
+        depend on the length of the stream. A failing item yields a response with error
+        messages instead of ending the stream.
+
+        Args:
+            requests: Async iterable of evaluation requests
+            max_concurrency: Maximum number of items evaluated at the same time
+            ordered: Whether to yield responses in request order (True) or in completion
+                order (False)
+
+        Yields:
+            Evaluation responses
+        """
+        in_order: Deque["asyncio.Task[EvaluationResponse]"] = deque()
+        in_flight: Set["asyncio.Task[EvaluationResponse]"] = set()
+        
+        async def next_completed() -> List[EvaluationResponse]:
+            if ordered:
+                return [await in_order.popleft()]
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.difference_update(done)
+            return [task.result() for task in done]
+        
+        try:
+            async for request in requests:
+                task = asyncio.ensure_future(self._aevaluate_request(request))
+                if ordered:
+                    in_order.append(task)
+                else:
+                    in_flight.add(task)
+                
+                # Wait for a free slot before reading the next request
+                while len(in_order) + len(in_flight) >= max_concurrency:
+                    for response in await next_completed():
+                        yield response
+            
+            while in_order or in_flight:
+                for response in await next_completed():
+                    yield response
+        finally:
+            for task in [*in_order, *in_flight]:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        """Release the async database resources held by the evaluator."""
         if self.db_executor:
-            execution_accuracy, execution_details = self._calculate_execution_accuracy(
-                generated_query, reference_query
-            )
-            metrics.execution_accuracy = execution_accuracy
-            metrics.execution_details = execution_details
-        else:
-            metrics.execution_accuracy = 0.0
-            metrics.execution_details = {"error": "Database executor not available"}
+            await self.db_executor.aclose()
+
+    def cache_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get hit, miss and eviction statistics for the evaluator caches.
+
+        Returns:
+            Dictionary of cache statistics keyed by cache name
+        """
+        stats = self.parser.cache_stats()
+        stats["schema"] = self._schema_cache.stats()
+        if self._memo is not None:
+            stats["memo"] = self._memo.stats()
         
-        # Calculate complexity handling score
-        metrics.complexity_handling = self._calculate_complexity_handling(
-            generated_query, reference_query, query_complexity
-        )
+        if self.db_executor:
+            stats.update(self.db_executor.cache_stats())
         
-        # Calculate zero-shot performance if database schema is provided
-        if database_schema:
-            metrics.zero_shot_performance = self._calculate_zero_shot_performance(
-                generated_query, reference_query, database_schema
+        return stats
+
+    def _memo_keys(
+        self,
+        generated_query: str,
+        reference_query: str,
+        query_complexity: Union[str, QueryComplexity],
+        database_schema: Optional[str],
+        execution_timeout: Optional[int],
+    ) -> Iterator[str]:
+        """Get the content addresses of an evaluation in the memo.
+
+        The exact text of the queries is addressed first. Without a database, the
+        normalized queries are addressed as well, so that queries only differing in
+        formatting share a result. Normalizing also collapses whitespace and case inside
+        string literals, which changes what a query returns, so evaluations executed on a
+        database are only addressed by their exact text. They have no address at all while
+        the database snapshot version is unknown.
+
+        Args:
+            generated_query: SQL query generated by the model
+            reference_query: Reference SQL query to compare against
+            query_complexity: Complexity level of the query
+            database_schema: Database schema for zero-shot evaluation
+            execution_timeout: Timeout for query execution in milliseconds
+
+        Yields:
+            SHA-256 hashes of the inputs, the evaluator settings, the effective execution
+            timeout and the database snapshot version
+        """
+        # Queries are only executed, and can only time out, with a database
+        database_version = None
+        if self.db_executor:
+            database_version = self.db_executor.get_database_version()
+            if database_version is None:
+                return
+            execution_timeout = execution_timeout or self.db_executor.timeout_ms
+        else:
+            execution_timeout = None
+        
+        for normalize in (False, True):
+            if normalize:
+                if self.db_executor:
+                    return
+                generated_query = self.parser.normalize_query(generated_query)
+                reference_query = self.parser.normalize_query(reference_query)
+            
+            inputs = json.dumps(
+                [
+                    self._memo_config,
+                    database_version,
+                    normalize,
+                    generated_query,
+                    reference_query,
+                    getattr(query_complexity, "value", query_complexity),
+                    (database_schema or "").strip(),
+                    execution_timeout,
+                ]
             )
+            yield hashlib.sha256(inputs.encode()).hexdigest()
+
+    def _recall(
+        self,
+        generated_query: str,
+        reference_query: str,
+        query_complexity: Union[str, QueryComplexity],
+        inference_latency: Optional[float],
+        database_schema: Optional[str],
+        execution_timeout: Optional[int],
+    ) -> Tuple[List[str], Optional[SQLMetrics]]:
+        """Look up the memoized metrics of an evaluation.
+
+        The exact text of the queries is looked up first, so that repeated inputs are
+        answered without normalizing them, then their normalized form if it is addressed.
+
+        Args:
+            generated_query: SQL query generated by the model
+            reference_query: Reference SQL query to compare against
+            query_complexity: Complexity level of the query
+            inference_latency: Time taken to generate the query in milliseconds
+            database_schema: Database schema for zero-shot evaluation
+            execution_timeout: Timeout for query execution in milliseconds
+
+        Returns:
+            Tuple of the memo keys looked up and the memoized metrics, completed with the
+            inference latency and timings of this call, or None if the evaluation is not
+            memoized
+        """
+        start_time = time.time()
+        keys: List[str] = []
+        value = None
         
-        # Record evaluation time
+        with trace_evaluation() as trace, stage("memo"):
+            try:
+                for key in self._memo_keys(
+                    generated_query,
+                    reference_query,
+                    query_complexity,
+                    database_schema,
+                    execution_timeout,
+                ):
+                    keys.append(key)
+                    value = self._memo.get(key)
+                    if value is not None:
+                        break
+                
+                # Later lookups of the same text are answered by its exact key
+                if value is not None and len(keys) > 1:
+                    self._memo.put(keys[0], value)
+            except Exception as e:
+                logger.warning(f"Failed to look up memoized evaluation: {str(e)}")
+                value = None
+        
+        if value is None:
+            return keys, None
+        
+        # Metrics are assigned without validation while evaluating, and are loaded alike
+        metrics = SQLMetrics.model_construct(**json.loads(value))
+        if inference_latency is not None:
+            metrics.inference_latency = inference_latency
         metrics.evaluation_time = (time.time() - start_time) * 1000
+        metrics.stage_timings = trace.timings_ms()
+        trace.record(metrics.evaluation_time / 1000)
         
-        return metrics
+        return keys, metrics
+
+    def _memoize(self, keys: List[str], metrics: SQLMetrics) -> None:
+        """Store the metrics of an evaluation in the memo.
+
+        Metrics of evaluations that failed, or whose queries timed out or could not reach
+        the database, are not stored, as the next evaluation may succeed.
+
+        Args:
+            keys: Memo keys the metrics are stored under, returned by _recall
+            metrics: Metrics of the evaluation
+        """
+        if metrics.error_messages:
+            return
+        
+        details = (metrics.execution_details or {}).get("details")
+        error = details.get("error") if isinstance(details, dict) else None
+        if error and TRANSIENT_ERROR_PATTERN.search(error):
+            return
+        
+        # Execution details hold the comparison details as a nested dictionary
+        value = metrics.model_dump_json(exclude=MEMO_EXCLUDED_FIELDS, warnings=False)
+        try:
+            for key in keys:
+                self._memo.put(key, value)
+        except Exception as e:
+            logger.warning(f"Failed to store memoized evaluation: {str(e)}")
+
+    def get_schema(self, refresh: bool = False) -> Optional[DatabaseSchema]:
+        """Get the introspected database schema, cached by the database executor.
+
+        Args:
+            refresh: Whether to introspect the schema again instead of using the cache
+
+        Returns:
+            Database schema, or None without a database or if introspection failed
+        """
+        if not self.db_executor:
+            return None
+        
+        try:
+            return self.db_executor.get_schema(refresh=refresh)
+        except Exception as e:
+            # The executor logs each failed introspection once
+            logger.debug(f"Database schema not available: {str(e)}")
+            return None
+
+    def _introspected_schema(self, database_schema: Optional[str]) -> Optional[DatabaseSchema]:
+        """Get the introspected schema used when a request describes no schema itself.
+
+        Args:
+            database_schema: Database schema description of the request
+
+        Returns:
+            Database schema, or None if the request has a schema description, there is no
+            database or the database has no tables
+        """
+        if database_schema or not self.db_executor:
+            return None
+        
+        schema = self.get_schema()
+        if schema is None or not schema.tables:
+            return None
+        
+        return schema
+
+    def _parse_schema(self, database_schema: str) -> DatabaseSchema:
+        """Parse a schema description into an indexed schema, cached by content hash.
+
+        Args:
+            database_schema: Database schema description of a request
+
+        Returns:
+            Database schema
+        """
+        key = hashlib.sha256(database_schema.encode()).hexdigest()
+        schema = self._schema_cache.get(key)
+        if schema is None:
+            schema = parse_schema_text(database_schema)
+            self._schema_cache.put(key, schema)
+        return schema
+
+    def pool_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get connection pool occupancy, wait time and checkout statistics.
+
+        Returns:
+            Dictionary of pool statistics keyed by engine, empty without a database
+        """
+        if not self.db_executor:
+            return {}
+        
+        return self.db_executor.pool_stats()
 
     def evaluate_batch(
         self,
-        requests: List[EvaluationRequest]
+        requests: List[EvaluationRequest],
+        max_workers: int = 1,
+        io_workers: int = 4,
     ) -> List[EvaluationResponse]:
         """Evaluate a batch of SQL queries.
 
+        With more than one worker, static analysis is spread across a process pool while
+        query execution runs on a separate, bounded thread pool. Responses are returned in
+        request order, and a failing item yields a response with error messages instead
+        of failing the whole batch.
+
         Args:
             requests: List of evaluation requests
+            max_workers: Number of processes used for static analysis (1 evaluates the
+                batch sequentially in the current process)
+            io_workers: Number of threads used for query execution
 
         Returns:
             List of evaluation responses
         """
-        responses = []
+        if max_workers <= 1 or len(requests) <= 1:
+            return [self._evaluate_request(request) for request in requests]
         
-        for request in requests:
-            start_time = time.time()
-            
+        # Memoized items are answered right away, and only the others reach the pools
+        responses: List[Optional[EvaluationResponse]] = [None] * len(requests)
+        memo_keys: List[List[str]] = [[] for _ in requests]
+        if self._memo is not None:
+            for index, request in enumerate(requests):
+                memo_keys[index], metrics = self._recall(
+                    request.generated_query,
+                    request.reference_query,
+                    request.query_complexity,
+                    None,
+                    request.database_schema,
+                    request.execution_timeout,
+                )
+                if metrics is not None:
+                    responses[index] = EvaluationResponse(
+                        metrics=metrics,
+                        generated_query=request.generated_query,
+                        reference_query=request.reference_query,
+                        query_complexity=request.query_complexity,
+                        evaluation_time=metrics.evaluation_time,
+                    )
+        pending = [index for index, response in enumerate(responses) if response is None]
+        if not pending:
+            return responses
+        
+        chunksize = max(1, len(pending) // (max_workers * 4))
+        schema = self._introspected_schema(None)
+        
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_initialize_worker,
+            initargs=(self.parser_cache_size, self.parser.dialect, schema),
+        ) as process_pool, ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+            static_results = process_pool.map(
+                _evaluate_static_worker, [requests[index] for index in pending], chunksize=chunksize
+            )
+            futures = [
+                io_pool.submit(
+                    self._complete_request, requests[index], static_result, memo_keys[index]
+                )
+                for index, static_result in zip(pending, static_results)
+            ]
+            for index, future in zip(pending, futures):
+                responses[index] = future.result()
+        
+        return responses
+
+    def _evaluate_request(self, request: EvaluationRequest) -> EvaluationResponse:
+        """Evaluate a single batch item, isolating any failure to its response.
+
+        Args:
+            request: Evaluation request
+
+        Returns:
+            Evaluation response
+        """
+        start_time = time.time()
+        
+        try:
             metrics = self.evaluate(
                 generated_query=request.generated_query,
                 reference_query=request.reference_query,
@@ -156,81 +820,272 @@ class SQLMetricsEvaluator:
                 database_schema=request.database_schema,
                 execution_timeout=request.execution_timeout
             )
-            
-            evaluation_time = (time.time() - start_time) * 1000
-            
-            response = EvaluationResponse(
-                metrics=metrics,
+        except Exception as e:
+            logger.error(f"Error evaluating query: {str(e)}")
+            metrics = SQLMetrics(error_messages=[f"Error evaluating query: {str(e)}"])
+        
+        evaluation_time = (time.time() - start_time) * 1000
+        
+        return EvaluationResponse(
+            metrics=metrics,
+            generated_query=request.generated_query,
+            reference_query=request.reference_query,
+            query_complexity=request.query_complexity,
+            evaluation_time=evaluation_time
+        )
+
+    async def _aevaluate_request(self, request: EvaluationRequest) -> EvaluationResponse:
+        """Async version of _evaluate_request.
+
+        Args:
+            request: Evaluation request
+
+        Returns:
+            Evaluation response
+        """
+        start_time = time.time()
+        
+        try:
+            metrics = await self.aevaluate(
                 generated_query=request.generated_query,
                 reference_query=request.reference_query,
                 query_complexity=request.query_complexity,
-                evaluation_time=evaluation_time
+                database_schema=request.database_schema,
+                execution_timeout=request.execution_timeout
+            )
+        except Exception as e:
+            logger.error(f"Error evaluating query: {str(e)}")
+            metrics = SQLMetrics(error_messages=[f"Error evaluating query: {str(e)}"])
+        
+        evaluation_time = (time.time() - start_time) * 1000
+        
+        return EvaluationResponse(
+            metrics=metrics,
+            generated_query=request.generated_query,
+            reference_query=request.reference_query,
+            query_complexity=request.query_complexity,
+            evaluation_time=evaluation_time
+        )
+
+    def _complete_request(
+        self,
+        request: EvaluationRequest,
+        static_result: Tuple[
+            Optional[SQLMetrics], Sequence[Dict[str, str]], Optional[str], float, EvaluationTrace
+        ],
+        memo_keys: Optional[List[str]] = None,
+    ) -> EvaluationResponse:
+        """Add execution-based metrics to a statically evaluated batch item.
+
+        Args:
+            request: Evaluation request
+            static_result: Tuple of static metrics, ORDER BY items of the reference query,
+                error message, static analysis time in milliseconds and static analysis
+                trace, as returned by the process pool worker
+            memo_keys: Memo keys the complete metrics are stored under (None to not store
+                them)
+
+        Returns:
+            Evaluation response
+        """
+        start_time = time.time()
+        metrics, order_by, error, static_time, trace = static_result
+        
+        if metrics is None:
+            logger.error(f"Error evaluating query: {error}")
+            metrics = SQLMetrics(error_messages=[f"Error evaluating query: {error}"])
+        elif self.db_executor:
+            try:
+                with trace_evaluation(trace), stage("execution"):
+                    match, comparison = self.db_executor.compare_query_results(
+                        request.generated_query,
+                        request.reference_query,
+                        memo={},
+                        timeout_ms=request.execution_timeout,
+                        ordered=self._requires_ordered_comparison(order_by),
+                    )
+                self._apply_execution_results(metrics, match, comparison)
+            except Exception as e:
+                logger.error(f"Error executing queries: {str(e)}")
+                metrics.error_messages = [f"Error executing queries: {str(e)}"]
+        
+        evaluation_time = static_time + (time.time() - start_time) * 1000
+        metrics.evaluation_time = evaluation_time
+        if error is None:
+            metrics.stage_timings = trace.timings_ms()
+        trace.record(evaluation_time / 1000)
+        
+        if memo_keys and error is None:
+            self._memoize(memo_keys, metrics)
+        
+        return EvaluationResponse(
+            metrics=metrics,
+            generated_query=request.generated_query,
+            reference_query=request.reference_query,
+            query_complexity=request.query_complexity,
+            evaluation_time=evaluation_time
+        )
+
+    def _evaluate_static(
+        self,
+        generated_query: str,
+        reference_query: str,
+        query_complexity: Union[str, QueryComplexity],
+        inference_latency: Optional[float],
+        database_schema: Optional[str],
+        schema: Optional[DatabaseSchema] = None,
+    ) -> Tuple[SQLMetrics, Sequence[Dict[str, str]]]:
+        """Calculate every metric that does not require query execution.
+
+        Args:
+            generated_query: SQL query generated by the model
+            reference_query: Reference SQL query to compare against
+            query_complexity: Complexity level of the query
+            inference_latency: Time taken to generate the query in milliseconds
+            database_schema: Database schema for zero-shot evaluation
+            schema: Introspected database schema for zero-shot evaluation, used when
+                database_schema is not provided
+
+        Returns:
+            Tuple of the SQLMetrics object with static evaluation results and the ORDER BY
+            items of the reference query, which decide whether results are compared in order
+        """
+        with stage("static_analysis"):
+            # Initialize metrics
+            metrics = SQLMetrics()
+            
+            # Set inference latency if provided
+            if inference_latency is not None:
+                metrics.inference_latency = inference_latency
+            
+            # Ensure query_complexity is a QueryComplexity enum
+            if isinstance(query_complexity, str):
+                try:
+                    query_complexity = QueryComplexity(query_complexity)
+                except ValueError:
+                    query_complexity = QueryComplexity.MEDIUM
+            
+            # Normalize and parse each query once for all metrics
+            generated = self.parser.analyze_query(generated_query)
+            reference = self.parser.analyze_query(reference_query)
+            
+            # Calculate exact match accuracy
+            exact_match = self._calculate_exact_match_accuracy(generated, reference)
+            metrics.exact_match_accuracy = 1.0 if exact_match else 0.0
+            
+            # Calculate logical form accuracy
+            logical_equivalence, comparison_details = self._calculate_logical_form_accuracy(
+                generated, reference
             )
+            metrics.logical_form_accuracy = 1.0 if logical_equivalence else 0.0
+            metrics.parsing_details = comparison_details
             
-            responses.append(response)
+            # Execution accuracy is filled in by _apply_execution_results when available
+            metrics.execution_accuracy = 0.0
+            metrics.execution_details = {"error": "Database executor not available"}
+            
+            # Calculate complexity handling score
+            metrics.complexity_handling = self._calculate_complexity_handling(
+                generated, reference, query_complexity
+            )
+            
+            # Calculate zero-shot performance if a database schema is available
+            if database_schema:
+                schema = self._parse_schema(database_schema)
+            if database_schema or schema is not None:
+                metrics.zero_shot_performance, schema_check = self._calculate_zero_shot_performance(
+                    generated, reference, logical_equivalence, schema
+                )
+                if schema_check is not None:
+                    metrics.parsing_details["schema_check"] = schema_check
+            
+        return metrics, reference.parsed["order_by"]
+
+    def _requires_ordered_comparison(self, order_by: Sequence[Dict[str, str]]) -> bool:
+        """Check whether query results must be compared in row order.
+
+        Args:
+            order_by: ORDER BY items of the reference query, returned by _evaluate_static
+
+        Returns:
+            True if ordered comparison is enabled and the reference query has an ORDER BY
+            clause
+        """
+        return self.ordered_comparison and bool(order_by)
+
+    def _apply_execution_results(
+        self, metrics: SQLMetrics, match: bool, comparison: Dict[str, Any]
+    ) -> None:
+        """Update statically calculated metrics with query execution results.
+
+        Args:
+            metrics: Metrics returned by _evaluate_static
+            match: Whether the results of both queries match
+            comparison: Comparison details returned by compare_query_results
+        """
+        # Queries that match exactly are logically equivalent without execution
+        if not metrics.exact_match_accuracy:
+            if metrics.parsing_details is not None:
+                metrics.parsing_details["execution_comparison"] = comparison
+            
+            # If execution results match, queries are logically equivalent
+            if match:
+                metrics.logical_form_accuracy = 1.0
+                if metrics.zero_shot_performance is not None:
+                    metrics.zero_shot_performance = 1.0
         
-        return responses
+        metrics.execution_accuracy, metrics.execution_details = (
+            self._calculate_execution_accuracy(match, comparison)
+        )
 
-    def _calculate_exact_match_accuracy(self, generated_query: str, reference_query: str) -> bool:
+    def _calculate_exact_match_accuracy(
+        self, generated: "AnalyzedQuery", reference: "AnalyzedQuery"
+    ) -> bool:
         """Calculate exact match accuracy.
 
         Args:
-            generated_query: Generated SQL query
-            reference_query: Reference SQL query
+            generated: Analyzed generated SQL query
+            reference: Analyzed reference SQL query
 
         Returns:
             Boolean indicating exact match
         """
-        # Normalize queries before comparison
-        normalized_generated = self.parser.normalize_query(generated_query)
-        normalized_reference = self.parser.normalize_query(reference_query)
-        
-        return normalized_generated == normalized_reference
+        # Compare the normalized forms of both queries
+        return generated.normalized == reference.normalized
 
     def _calculate_logical_form_accuracy(
-        self, generated_query: str, reference_query: str
+        self, generated: "AnalyzedQuery", reference: "AnalyzedQuery"
     ) -> Tuple[bool, Dict[str, Any]]:
-        """Calculate logical form accuracy.
+        """Calculate logical form accuracy using static analysis.
+
+        Execution-based equivalence is applied afterwards by _apply_execution_results.
 
         Args:
-            generated_query: Generated SQL query
-            reference_query: Reference SQL query
+            generated: Analyzed generated SQL query
+            reference: Analyzed reference SQL query
 
         Returns:
             Tuple containing:
                 - Boolean indicating logical equivalence
                 - Dictionary with comparison details
         """
-        # If database executor is available, use execution-based comparison
-        if self.db_executor:
-            return self.parser.try_logical_equivalence_with_execution(
-                generated_query, reference_query, self.db_executor
-            )
-        
-        # Otherwise, use static analysis
-        comparison = self.parser.compare_queries(generated_query, reference_query)
+        comparison = self.parser.compare_queries(generated, reference)
         return comparison["logical_equivalence"], comparison
 
     def _calculate_execution_accuracy(
-        self, generated_query: str, reference_query: str
+        self, match: bool, comparison: Dict[str, Any]
     ) -> Tuple[float, Dict[str, Any]]:
         """Calculate execution accuracy.
 
         Args:
-            generated_query: Generated SQL query
-            reference_query: Reference SQL query
+            match: Whether the results of the generated and reference queries match
+            comparison: Comparison details returned by compare_query_results
 
         Returns:
             Tuple containing:
                 - Execution accuracy score (0.0 to 1.0)
                 - Dictionary with execution details
         """
-        if not self.db_executor:
-            return 0.0, {"error": "Database executor not available"}
-        
-        # Execute both queries and compare results
-        match, comparison = self.db_executor.compare_query_results(generated_query, reference_query)
-        
         # If there was an error executing either query
         if not comparison["both_succeeded"]:
             if not comparison["query1_success"]:
@@ -251,21 +1106,21 @@ class SQLMetricsEvaluator:
             return 0.0, {"match": False, "details": comparison}
 
     def _calculate_complexity_handling(
-        self, generated_query: str, reference_query: str, complexity: QueryComplexity
+        self, generated: "AnalyzedQuery", reference: "AnalyzedQuery", complexity: QueryComplexity
     ) -> float:
         """Calculate complexity handling score.
 
         Args:
-            generated_query: Generated SQL query
-            reference_query: Reference SQL query
+            generated: Analyzed generated SQL query
+            reference: Analyzed reference SQL query
             complexity: Query complexity level
 
         Returns:
             Complexity handling score (0.0 to 1.0)
         """
         # Parse both queries
-        parsed_generated = self.parser.parse_query(generated_query)
-        parsed_reference = self.parser.parse_query(reference_query)
+        parsed_generated = generated.parsed
+        parsed_reference = reference.parsed
         
         # If parsing failed for either query
         if not parsed_generated["success"] or not parsed_reference["success"]:
@@ -320,37 +1175,46 @@ class SQLMetricsEvaluator:
         return weighted_score
 
     def _calculate_zero_shot_performance(
-        self, generated_query: str, reference_query: str, database_schema: str
-    ) -> float:
+        self,
+        generated: "AnalyzedQuery",
+        reference: "AnalyzedQuery",
+        logical_equivalence: bool,
+        schema: Optional[DatabaseSchema] = None,
+    ) -> Tuple[float, Optional[Dict[str, Any]]]:
         """Calculate zero-shot performance score.
 
+        The generated query is checked against the indexed schema for unknown tables,
+        unknown columns and joins not backed by a foreign key. The check only looks up the
+        references of the query and never touches the database.
+
         Args:
-            generated_query: Generated SQL query
-            reference_query: Reference SQL query
-            database_schema: Database schema description
+            generated: Analyzed generated SQL query
+            reference: Analyzed reference SQL query
+            logical_equivalence: Whether the queries are statically logically equivalent
+            schema: Indexed database schema the generated query is checked against
 
         Returns:
-            Zero-shot performance score (0.0 to 1.0)
+            Tuple containing:
+                - Zero-shot performance score (0.0 to 1.0)
+                - Schema check details, or None if the query was not checked
         """
-        # This is a simplified implementation
-        # In a real-world scenario, you would:
-        # 1. Parse the database schema
-        # 2. Check if the generated query uses correct tables and columns from the schema
-        # 3. Verify joins are valid based on the schema
-        # 4. Ensure data types are used correctly
+        parsed_generated = generated.parsed
+        parsed_reference = reference.parsed
         
-        # For now, we'll use a simplified approach based on logical form accuracy
-        logical_equivalence, _ = self._calculate_logical_form_accuracy(generated_query, reference_query)
+        if not parsed_generated["success"]:
+            return 0.0, None
+        
+        # Check the generated query against the schema
+        schema_check = None
+        if schema is not None and schema.tables:
+            schema_check = schema.check_references(parsed_generated["references"])
         
         if logical_equivalence:
-            return 1.0
+            return 1.0, schema_check
         
         # If not logically equivalent, check component-level matches
-        parsed_generated = self.parser.parse_query(generated_query)
-        parsed_reference = self.parser.parse_query(reference_query)
-        
-        if not parsed_generated["success"] or not parsed_reference["success"]:
-            return 0.0
+        if not parsed_reference["success"]:
+            return 0.0, schema_check
         
         # Calculate partial scores
         table_score = len(parsed_generated["tables"].intersection(parsed_reference["tables"])) / max(
@@ -364,4 +1228,60 @@ class SQLMetricsEvaluator:
         # Simplified zero-shot score
         zero_shot_score = 0.5 * table_score + 0.5 * column_score
         
-        return zero_shot_score 
\ No newline at end of file
+        # Penalize references that do not exist in the database
+        if schema_check is not None:
+            zero_shot_score *= schema_check["score"]
+        
+        return zero_shot_score, schema_check
+
+
+def _initialize_worker(
+    parser_cache_size: int, dialect: Optional[str], schema: Optional[DatabaseSchema] = None
+) -> None:
+    """Create the static analysis evaluator of a process pool worker.
+
+    Args:
+        parser_cache_size: Number of normalized and parsed queries to cache per worker
+        dialect: sqlglot dialect used to read queries
+        schema: Introspected database schema for requests without a schema description
+    """
+    global _worker_evaluator, _worker_schema
+    _worker_evaluator = SQLMetricsEvaluator(parser_cache_size=parser_cache_size)
+    _worker_evaluator.parser.dialect = dialect
+    _worker_schema = schema
+
+
+def _evaluate_static_worker(
+    request: EvaluationRequest,
+) -> Tuple[Optional[SQLMetrics], Sequence[Dict[str, str]], Optional[str], float, EvaluationTrace]:
+    """Calculate the static metrics of a batch item in a process pool worker.
+
+    Args:
+        request: Evaluation request
+
+    Returns:
+        Tuple containing:
+            - Static metrics, or None if evaluation failed
+            - ORDER BY items of the reference query, empty if evaluation failed
+            - Error message, or None if evaluation succeeded
+            - Static analysis time in milliseconds
+            - Stages and events of the static analysis, recorded by the parent process
+    """
+    start_time = time.time()
+    
+    with trace_evaluation() as trace:
+        try:
+            if _worker_evaluator is None:
+                raise RuntimeError("Worker evaluator not initialized")
+            
+            metrics, order_by = _worker_evaluator._evaluate_static(
+                request.generated_query,
+                request.reference_query,
+                request.query_complexity,
+                None,
+                request.database_schema,
+                None if request.database_schema else _worker_schema,
+            )
+            return metrics, order_by, None, (time.time() - start_time) * 1000, trace
+        except Exception as e:
+            return None, (), str(e), (time.time() - start_time) * 1000, trace
@@ -0,0 +1,241 @@
+"""Single-pass extraction of query components from sqlglot parse trees."""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlglot import expressions as exp
+
+# Predicates recorded as WHERE and HAVING conditions
+CONDITION_TYPES = (exp.EQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.NEQ, exp.Like, exp.In)
+
+# Aggregate functions recorded as aggregations
+AGGREGATION_TYPES = (exp.Count, exp.Sum, exp.Avg, exp.Min, exp.Max)
+
+# Clauses whose predicates are recorded, keyed by the argument name holding them
+CONDITION_CLAUSES = {"where": "where_conditions", "having": "having_conditions"}
+
+
+class ComponentVisitor:
+    """Collect every component of a query in a single walk over its parse tree.
+
+    The tree is walked iteratively with an explicit stack, so deeply nested queries do not
+    hit the recursion limit. Each node is visited once, together with the clause it
+    belongs to, and CTEs and subqueries are visited like the outer query.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the visitor."""
+        self.tables: Set[str] = set()
+        self.columns: Set[str] = set()
+        self.joins: List[Dict[str, Any]] = []
+        self.where_conditions: List[str] = []
+        self.having_conditions: List[str] = []
+        self.group_by: List[str] = []
+        self.order_by: List[Dict[str, Any]] = []
+        self.limit: Optional[int] = None
+        self.aggregations: Set[str] = set()
+        self.window_functions: List[str] = []
+        self.ctes: List[str] = []
+
+        # Schema references, resolved once every CTE name is known
+        self._table_nodes: List[exp.Table] = []
+        self._derived: Set[str] = set()
+        self._output_aliases: Set[str] = set()
+        self._column_references: Set[Tuple[Optional[str], str]] = set()
+        self._join_keys: List[Tuple[Tuple[Optional[str], str], Tuple[Optional[str], str]]] = []
+
+    def visit(self, tree: exp.Expression) -> Dict[str, Any]:
+        """Walk a parse tree and collect its components.
+
+        Args:
+            tree: sqlglot parsed expression
+
+        Returns:
+            Dictionary of query components, in the format of SQLParser.parse_query
+        """
+        # Each entry holds a node, the clause containing it and whether it is part of an
+        # already recorded condition
+        stack: List[Tuple[exp.Expression, Optional[str], bool]] = [(tree, None, False)]
+        while stack:
+            node, clause, in_condition = stack.pop()
+
+            # Subqueries start a new scope
+            if isinstance(node, (exp.Select, exp.Union)):
+                clause, in_condition = None, False
+            elif isinstance(node, exp.Join):
+                clause = "join"
+
+            in_condition = self._visit_node(tree, node, clause, in_condition)
+
+            children = []
+            for key, child in node.iter_expressions():
+                children.append((child, key if key in CONDITION_CLAUSES else clause, in_condition))
+            stack.extend(reversed(children))
+
+        return {
+            "tables": self.tables,
+            "columns": self.columns,
+            "joins": self.joins,
+            "where_conditions": self.where_conditions,
+            "having_conditions": self.having_conditions,
+            "group_by": self.group_by,
+            "order_by": self.order_by,
+            "limit": self.limit,
+            "aggregations": self.aggregations,
+            "window_functions": self.window_functions,
+            "ctes": self.ctes,
+            "references": self._references(),
+        }
+
+    def _visit_node(
+        self, tree: exp.Expression, node: exp.Expression, clause: Optional[str], in_condition: bool
+    ) -> bool:
+        """Record the components of a single node.
+
+        Args:
+            tree: Root of the parse tree
+            node: Node to record
+            clause: Argument name of the clause containing the node
+            in_condition: Whether the node is part of an already recorded condition
+
+        Returns:
+            Whether the children of the node are part of a recorded condition
+        """
+        if isinstance(node, exp.Column):
+            if not isinstance(node.this, exp.Star) and node.name:
+                self.columns.add(node.name)
+                self._column_references.add((node.table.lower() or None, node.name))
+        elif isinstance(node, CONDITION_TYPES):
+            if clause in CONDITION_CLAUSES and not in_condition:
+                getattr(self, CONDITION_CLAUSES[clause]).append(str(node))
+                in_condition = True
+            if clause == "join" and isinstance(node, exp.EQ):
+                self._record_join_key(node)
+        elif isinstance(node, exp.Table):
+            if node.name:
+                self._table_nodes.append(node)
+        elif isinstance(node, AGGREGATION_TYPES):
+            # Aggregates over a window are recorded as window functions
+            if not isinstance(node.parent, exp.Window):
+                self.aggregations.add(f"{node.__class__.__name__.upper()}({str(node.this)})")
+        elif isinstance(node, exp.Alias):
+            if node.alias:
+                self._output_aliases.add(node.alias.lower())
+        elif isinstance(node, exp.Join):
+            self.joins.append(self._join_info(node))
+        elif isinstance(node, exp.Group):
+            self.group_by.extend(str(expression) for expression in node.expressions)
+        elif isinstance(node, exp.Order):
+            # Window ORDER BY clauses are part of the window function
+            if not isinstance(node.parent, exp.Window):
+                self.order_by.extend(
+                    {
+                        "column": str(ordered.this),
+                        "direction": "DESC" if ordered.args.get("desc") else "ASC",
+                    }
+                    for ordered in node.expressions
+                )
+        elif isinstance(node, exp.Limit):
+            if node.parent is tree:
+                self.limit = _limit_value(node)
+        elif isinstance(node, exp.Window):
+            self.window_functions.append(str(node))
+        elif isinstance(node, exp.CTE):
+            self.ctes.append(node.alias_or_name.lower())
+        elif isinstance(node, exp.Subquery):
+            if node.alias:
+                self._derived.add(node.alias.lower())
+
+        return in_condition
+
+    @staticmethod
+    def _join_info(join: exp.Join) -> Dict[str, Any]:
+        """Describe a join by type, joined table and condition.
+
+        Args:
+            join: Join node
+
+        Returns:
+            Join dictionary
+        """
+        side = join.side or ("CROSS" if join.kind == "CROSS" else "")
+        condition = join.args.get("on")
+        return {
+            "type": f"{side} JOIN".strip(),
+            "table": join.this.name if isinstance(join.this, exp.Table) else None,
+            "condition": str(condition) if condition is not None else None,
+        }
+
+    def _record_join_key(self, equality: exp.EQ) -> None:
+        """Record a column equality of a JOIN ON condition.
+
+        Args:
+            equality: Equality inside a JOIN ON condition
+        """
+        left, right = equality.left, equality.right
+        if isinstance(left, exp.Column) and isinstance(right, exp.Column):
+            self._join_keys.append(
+                (
+                    (left.table.lower() or None, left.name),
+                    (right.table.lower() or None, right.name),
+                )
+            )
+
+    def _references(self) -> Dict[str, Any]:
+        """Resolve the schema references of the query.
+
+        Tables are collected before every CTE name is known, so they are only split into
+        schema tables and references to CTEs at the end of the walk.
+
+        Returns:
+            Dictionary of table aliases, derived table names, output aliases, column
+            references and join keys
+        """
+        ctes = set(self.ctes)
+        derived = self._derived | ctes
+        tables: Dict[str, str] = {}
+
+        for table in self._table_nodes:
+            alias = table.alias_or_name.lower()
+            if table.name.lower() in ctes:
+                derived.add(alias)
+            else:
+                self.tables.add(table.name)
+                tables[alias] = f"{table.db}.{table.name}" if table.db else table.name
+
+        return {
+            "tables": tables,
+            "derived": derived,
+            "output_aliases": self._output_aliases,
+            "columns": self._column_references,
+            "joins": self._join_keys,
+        }
+
+
+def extract_components(tree: exp.Expression) -> Dict[str, Any]:
+    """Extract every component of a query in a single walk over its parse tree.
+
+    Args:
+        tree: sqlglot parsed expression
+
+    Returns:
+        Dictionary of query components, in the format of SQLParser.parse_query
+    """
+    return ComponentVisitor().visit(tree)
+
+
+def _limit_value(limit: exp.Limit) -> Optional[int]:
+    """Get the row count of a LIMIT clause.
+
+    Args:
+        limit: Limit node
+
+    Returns:
+        Limit value, or None if it is not an integer literal
+    """
+    value = limit.args.get("expression") or limit.this
+    if isinstance(value, exp.Literal):
+        try:
+            return int(value.this)
+        except (ValueError, TypeError):
+            return None
+    return None
@@ -0,0 +1,406 @@
+"""Per-stage timings and Prometheus metrics for SQL metrics evaluation."""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Upper bounds in seconds of the duration histogram buckets
+DURATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str]) -> str:
+    """Format label pairs for a sample line.
+
+    Args:
+        label_names: Label names
+        label_values: Label values, in the order of the names
+
+    Returns:
+        Label pairs in braces, or an empty string without labels
+    """
+    if not label_names:
+        return ""
+    pairs = []
+    for name, value in zip(label_names, label_values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        """Initialize the counter.
+
+        Args:
+            name: Metric name, ending in _total
+            documentation: Help text
+            label_names: Names of the labels distinguishing the series
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter.
+
+        Args:
+            amount: Non-negative increment
+            labels: Label values of the series
+        """
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Get the current value of a series.
+
+        Args:
+            labels: Label values of the series
+
+        Returns:
+            Counter value
+        """
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        """Render the counter in the Prometheus text format.
+
+        Returns:
+            Lines of the metric family
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.label_names:
+            values[()] = 0.0
+        for key, value in sorted(values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Histogram:
+    """Thread-safe histogram of observed values with optional labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> None:
+        """Initialize the histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            label_names: Names of the labels distinguishing the series
+            buckets: Increasing upper bounds of the buckets, without +Inf
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # Per series: bucket counts (not cumulative), sum and count
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation.
+
+        Args:
+            value: Observed value
+            labels: Label values of the series
+        """
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0.0]))
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        """Get the number of observations of a series.
+
+        Args:
+            labels: Label values of the series
+
+        Returns:
+            Observation count
+        """
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            return int(series[1][1]) if series else 0
+
+    def render(self) -> List[str]:
+        """Render the histogram in the Prometheus text format.
+
+        Returns:
+            Lines of the metric family
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {
+                key: (list(counts), list(totals)) for key, (counts, totals) in self._series.items()
+            }
+        for key, (counts, (total, count)) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.label_names + ("le",), key + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {_format_value(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on the /metrics endpoint."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: List[Union[Counter, Histogram]] = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """Create and register a counter.
+
+        Args:
+            name: Metric name, ending in _total
+            documentation: Help text
+            label_names: Names of the labels distinguishing the series
+
+        Returns:
+            Registered counter
+        """
+        counter = Counter(name, documentation, label_names)
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            label_names: Names of the labels distinguishing the series
+            buckets: Increasing upper bounds of the buckets, without +Inf
+
+        Returns:
+            Registered histogram
+        """
+        histogram = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text format.
+
+        Returns:
+            Text exposition of the metrics
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+EVALUATIONS = REGISTRY.counter("sql_metrics_evaluations_total", "Completed evaluations.")
+EVALUATION_DURATION = REGISTRY.histogram(
+    "sql_metrics_evaluation_duration_seconds", "Total duration of evaluations."
+)
+STAGE_DURATION = REGISTRY.histogram(
+    "sql_metrics_stage_duration_seconds",
+    "Time spent in each evaluation stage, excluding nested stages.",
+    ("stage",),
+)
+PARSE_FAILURES = REGISTRY.counter(
+    "sql_metrics_parse_failures_total", "Queries that neither sqlglot nor mo_sql_parsing parsed."
+)
+FALLBACK_PARSES = REGISTRY.counter(
+    "sql_metrics_fallback_parses_total", "Queries parsed with the mo_sql_parsing fallback."
+)
+DB_TIMEOUTS = REGISTRY.counter(
+    "sql_metrics_db_timeouts_total", "Query executions that timed out in the database."
+)
+
+# Counters of the events recorded with record_event
+EVENT_COUNTERS = {
+    "parse_failure": PARSE_FAILURES,
+    "fallback_parse": FALLBACK_PARSES,
+    "db_timeout": DB_TIMEOUTS,
+}
+
+
+class EvaluationTrace:
+    """Stage timings and events of a single evaluation.
+
+    Stages and events are collected while the trace is active and added to the registry
+    by :meth:`record` once the evaluation is complete, so that work done in process pool
+    workers can be carried back and recorded by the parent process.
+    """
+
+    def __init__(
+        self,
+        stages: Optional[Dict[str, float]] = None,
+        events: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Initialize the trace.
+
+        Args:
+            stages: Time already spent in each stage in seconds
+            events: Number of events already recorded, keyed by event name
+        """
+        self.stages: Dict[str, float] = dict(stages or {})
+        self.events: Dict[str, int] = dict(events or {})
+        # Time spent in nested stages, one entry per open stage
+        self._nested: List[float] = []
+
+    def timings_ms(self) -> Dict[str, float]:
+        """Get the time spent in each stage.
+
+        Returns:
+            Stage durations in milliseconds, keyed by stage name
+        """
+        return {name: seconds * 1000 for name, seconds in self.stages.items()}
+
+    def record(self, duration: float) -> None:
+        """Add the evaluation to the registry.
+
+        Args:
+            duration: Total duration of the evaluation in seconds
+        """
+        EVALUATIONS.inc()
+        EVALUATION_DURATION.observe(duration)
+        for name, seconds in self.stages.items():
+            STAGE_DURATION.observe(seconds, stage=name)
+        for name, count in self.events.items():
+            EVENT_COUNTERS[name].inc(count)
+
+
+_current_trace: ContextVar[Optional[EvaluationTrace]] = ContextVar(
+    "sql_metrics_trace", default=None
+)
+
+
+@contextmanager
+def trace_evaluation(trace: Optional[EvaluationTrace] = None) -> Iterator[EvaluationTrace]:
+    """Collect the stages and events of an evaluation.
+
+    The trace follows the evaluation into worker threads started with asyncio.to_thread
+    and into the tasks it creates, which copy the current context.
+
+    Args:
+        trace: Trace to continue, e.g. with the stages of a process pool worker
+
+    Yields:
+        Active trace
+    """
+    trace = trace or EvaluationTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage of the current evaluation.
+
+    Time spent in stages nested inside this one is only attributed to the nested stages.
+    Outside of an evaluation the duration is recorded in the registry right away.
+
+    Args:
+        name: Stage name
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace._nested.append(0.0)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        if trace is None:
+            STAGE_DURATION.observe(elapsed, stage=name)
+        else:
+            nested = trace._nested.pop()
+            trace.stages[name] = trace.stages.get(name, 0.0) + elapsed - nested
+            if trace._nested:
+                trace._nested[-1] += elapsed
+
+
+def record_event(name: str) -> None:
+    """Count an event of the current evaluation.
+
+    Outside of an evaluation, e.g. on the thread pools of the database executor, the
+    event is counted in the registry right away.
+
+    Args:
+        name: Event name, one of the keys of EVENT_COUNTERS
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        EVENT_COUNTERS[name].inc()
+    else:
+        trace.events[name] = trace.events.get(name, 0) + 1
+
+
+def render_metrics(cache_stats: Optional[Dict[str, Dict[str, Union[int, float]]]] = None) -> str:
+    """Render the registry and the cache counters in the Prometheus text format.
+
+    Args:
+        cache_stats: Cache statistics keyed by cache name, as returned by
+            SQLMetricsEvaluator.cache_stats
+
+    Returns:
+        Text exposition of the metrics
+    """
+    text = REGISTRY.render()
+    if not cache_stats:
+        return text
+
+    lines = []
+    for counter in ("hits", "misses", "evictions"):
+        name = f"sql_metrics_cache_{counter}_total"
+        lines.append(f"# HELP {name} Cache {counter} of the evaluator caches.")
+        lines.append(f"# TYPE {name} counter")
+        for cache, stats in sorted(cache_stats.items()):
+            if counter in stats:
+                labels = _format_labels(("cache",), (cache,))
+                lines.append(f"{name}{labels} {_format_value(stats[counter])}")
+    return text + "\n".join(lines) + "\n"
@@ -1,7 +1,7 @@
 """Data models for SQL metrics evaluation."""
 
 from enum import Enum
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -58,12 +58,22 @@ class SQLMetrics(BaseModel):
     execution_details: Optional[Dict[str, Union[str, bool, List[str]]]] = Field(
         default=None, description="Details about query execution"
     )
-    parsing_details: Optional[Dict[str, Union[str, bool, List[str]]]] = Field(
+    parsing_details: Optional[Dict[str, Any]] = Field(
         default=None, description="Details about query parsing"
     )
     error_messages: Optional[List[str]] = Field(
         default=None, description="Error messages encountered during evaluation"
     )
+    evaluation_time: float = Field(
+        default=0.0, description="Time taken to evaluate the query in milliseconds", ge=0.0
+    )
+    stage_timings: Optional[Dict[str, float]] = Field(
+        default=None,
+        description="Time spent in each evaluation stage in milliseconds, excluding nested stages",
+    )
+    profile: Optional[Dict[str, Any]] = Field(
+        default=None, description="Hot functions of a profiled evaluation"
+    )
 
 
 class EvaluationRequest(BaseModel):
@@ -0,0 +1,253 @@
+"""Compact, immutable representation of parsed SQL queries."""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, Tuple
+
+# Keys of the mapping view, in the order of the former parse result dictionary
+FIELDS = (
+    "success",
+    "error",
+    "tables",
+    "columns",
+    "joins",
+    "where_conditions",
+    "having_conditions",
+    "group_by",
+    "order_by",
+    "limit",
+    "aggregations",
+    "window_functions",
+    "ctes",
+    "references",
+    "fingerprint",
+    "query_type",
+    "parsed_tree",
+)
+
+
+def _intern(value: Any) -> Any:
+    """Intern a string, so that equal names share a single object across parsed queries.
+
+    Args:
+        value: Value to intern
+
+    Returns:
+        Interned string, or the value unchanged if it is not a string
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+def _strings(values: Iterable[Any]) -> Tuple[Any, ...]:
+    """Convert values into a tuple of interned strings.
+
+    Args:
+        values: Values to convert
+
+    Returns:
+        Tuple of the interned values
+    """
+    return tuple(_intern(value) for value in values)
+
+
+def _string_set(values: Iterable[Any]) -> FrozenSet[Any]:
+    """Convert values into a frozenset of interned strings.
+
+    Args:
+        values: Values to convert
+
+    Returns:
+        Frozenset of the interned values
+    """
+    return frozenset(_intern(value) for value in values)
+
+
+def _pairs(values: Iterable[Tuple[Any, Any]]) -> Tuple[Tuple[Any, Any], ...]:
+    """Convert pairs into a tuple of pairs of interned strings.
+
+    Args:
+        values: Pairs to convert
+
+    Returns:
+        Tuple of the interned pairs
+    """
+    return tuple((_intern(first), _intern(second)) for first, second in values)
+
+
+class ParsedQuery(Mapping):
+    """Immutable components of a parsed SQL query.
+
+    Components are stored in slots as frozensets and tuples of interned strings rather
+    than as a dictionary of mutable containers, and the parsed tree is only kept when
+    requested, so that large numbers of parsed queries can be cached or batched.
+
+    For backward compatibility the components can be read like the former parse result
+    dictionary, e.g. ``parsed["tables"]``, and :meth:`to_dict` returns that dictionary.
+    Joins, ORDER BY items and references are returned as new dictionaries on every
+    access, so modifying them does not change the parsed query.
+    """
+
+    __slots__ = (
+        "success",
+        "error",
+        "query_type",
+        "fingerprint",
+        "tables",
+        "columns",
+        "aggregations",
+        "joins",
+        "where_conditions",
+        "having_conditions",
+        "group_by",
+        "order_by",
+        "limit",
+        "window_functions",
+        "ctes",
+        "reference_tables",
+        "derived",
+        "output_aliases",
+        "reference_columns",
+        "reference_joins",
+        "parsed_tree",
+    )
+
+    def __init__(self, components: Dict[str, Any], keep_tree: bool = False) -> None:
+        """Initialize the parsed query from a parse result dictionary.
+
+        Args:
+            components: Parse result dictionary, as built by SQLParser
+            keep_tree: Whether to keep the parsed tree of the query
+        """
+        references = components.get("references") or {}
+        values = {
+            "success": components.get("success", False),
+            "error": components.get("error"),
+            "query_type": _intern(components.get("query_type")),
+            "fingerprint": components.get("fingerprint"),
+            "tables": _string_set(components.get("tables", ())),
+            "columns": _string_set(components.get("columns", ())),
+            "aggregations": _string_set(components.get("aggregations", ())),
+            "joins": tuple(
+                (_intern(join["type"]), _intern(join["table"]), join["condition"])
+                for join in components.get("joins", ())
+            ),
+            "where_conditions": _strings(components.get("where_conditions", ())),
+            "having_conditions": _strings(components.get("having_conditions", ())),
+            "group_by": _strings(components.get("group_by", ())),
+            "order_by": tuple(
+                (_intern(item["column"]), _intern(item["direction"]))
+                for item in components.get("order_by", ())
+            ),
+            "limit": components.get("limit"),
+            "window_functions": _strings(components.get("window_functions", ())),
+            "ctes": _strings(components.get("ctes", ())),
+            "reference_tables": _pairs(references.get("tables", {}).items()),
+            "derived": _string_set(references.get("derived", ())),
+            "output_aliases": _string_set(references.get("output_aliases", ())),
+            "reference_columns": frozenset(_pairs(references.get("columns", ()))),
+            "reference_joins": tuple(_pairs(join) for join in references.get("joins", ())),
+            "parsed_tree": components.get("parsed_tree") if keep_tree else None,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Prevent modification of the parsed query."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        """Prevent modification of the parsed query."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Get the state of the parsed query for pickling."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore the state of an unpickled parsed query."""
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    @property
+    def references(self) -> Dict[str, Any]:
+        """Tables, columns and join keys the query references, as checked against a schema."""
+        return {
+            "tables": dict(self.reference_tables),
+            "derived": self.derived,
+            "output_aliases": self.output_aliases,
+            "columns": self.reference_columns,
+            "joins": list(self.reference_joins),
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        """Get a component in the format of the former parse result dictionary.
+
+        Args:
+            key: Component name
+
+        Returns:
+            Component value
+
+        Raises:
+            KeyError: If the key is not a component name
+        """
+        if key == "joins":
+            return tuple(
+                {"type": join_type, "table": table, "condition": condition}
+                for join_type, table, condition in self.joins
+            )
+        if key == "order_by":
+            return tuple(
+                {"column": column, "direction": direction} for column, direction in self.order_by
+            )
+        if key == "references":
+            return self.references
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the component names."""
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        """Get the number of components."""
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        """Get a readable representation of the parsed query."""
+        return (
+            f"ParsedQuery(success={self.success!r}, query_type={self.query_type!r}, "
+            f"tables={sorted(self.tables)!r}, error={self.error!r})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the parsed query into the former parse result dictionary.
+
+        Returns:
+            Dictionary of mutable sets, lists and dictionaries
+        """
+        references = self.references
+        references["derived"] = set(self.derived)
+        references["output_aliases"] = set(self.output_aliases)
+        references["columns"] = set(self.reference_columns)
+        return {
+            "success": self.success,
+            "error": self.error,
+            "tables": set(self.tables),
+            "columns": set(self.columns),
+            "joins": list(self["joins"]),
+            "where_conditions": list(self.where_conditions),
+            "having_conditions": list(self.having_conditions),
+            "group_by": list(self.group_by),
+            "order_by": list(self["order_by"]),
+            "limit": self.limit,
+            "aggregations": set(self.aggregations),
+            "window_functions": list(self.window_functions),
+            "ctes": list(self.ctes),
+            "references": references,
+            "fingerprint": self.fingerprint,
+            "query_type": self.query_type,
+            "parsed_tree": self.parsed_tree,
+        }
+
@@ -2,24 +2,98 @@
 
 import logging
 import re
-from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import sqlglot
-import sqlparse
-from mo_sql_parsing import parse as mo_parse
-from mo_sql_parsing import format as mo_format
 from sqlglot import expressions as exp
 from sqlglot.errors import ParseError
+from sqlparse import lexer
+from sqlparse import tokens as T
+
+from sql_metrics_evaluator.src.cache import LRUCache
+from sql_metrics_evaluator.src.canonical import fingerprint
+from sql_metrics_evaluator.src.extraction import extract_components
+from sql_metrics_evaluator.src.instrumentation import record_event, stage
+from sql_metrics_evaluator.src.parsed_query import ParsedQuery
 
 logger = logging.getLogger(__name__)
 
+# Whitespace runs collapsed into a single space by normalize_query
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class AnalyzedQuery:
+    """A SQL query that is normalized and parsed at most once.
+
+    Instances are created with :meth:`SQLParser.analyze_query` and shared across every
+    metric of a single evaluation, so the same query string is never processed twice.
+    """
+
+    def __init__(self, query: str, parser: "SQLParser") -> None:
+        """Initialize the analyzed query.
+
+        Args:
+            query: Raw SQL query
+            parser: Parser used to normalize and parse the query on first access
+        """
+        self.query = query
+        self._parser = parser
+        self._normalized: Optional[str] = None
+        self._parsed: Optional[ParsedQuery] = None
+
+    @property
+    def normalized(self) -> str:
+        """Normalized form of the query, computed on first access."""
+        if self._normalized is None:
+            self._normalized = self._parser.normalize_query(self.query)
+        return self._normalized
+
+    @property
+    def parsed(self) -> ParsedQuery:
+        """Parsed query components, computed on first access."""
+        if self._parsed is None:
+            self._parsed = self._parser._parse(self.query, self.normalized)
+        return self._parsed
+
 
 class SQLParser:
     """Class for parsing and analyzing SQL queries."""
 
-    def __init__(self) -> None:
-        """Initialize the SQL parser."""
-        pass
+    def __init__(
+        self, dialect: Optional[str] = None, cache_size: int = 0, keep_tree: bool = False
+    ) -> None:
+        """Initialize the SQL parser.
+
+        Args:
+            dialect: sqlglot dialect used to read queries (None for the default dialect)
+            cache_size: Maximum number of normalized and parsed queries to cache each
+                (0 disables caching)
+            keep_tree: Whether parsed queries keep their parsed tree, which is otherwise
+                dropped once the components are extracted
+        """
+        self.dialect = dialect
+        self.keep_tree = keep_tree
+        self._normalize_cache: Optional[LRUCache] = None
+        self._parse_cache: Optional[LRUCache] = None
+        
+        if cache_size > 0:
+            self._normalize_cache = LRUCache(max_size=cache_size)
+            self._parse_cache = LRUCache(max_size=cache_size)
+
+    def cache_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get hit, miss and eviction statistics for the parser caches.
+
+        Returns:
+            Dictionary with statistics for the normalize and parse caches, empty if
+            caching is disabled
+        """
+        if self._normalize_cache is None or self._parse_cache is None:
+            return {}
+        
+        return {
+            "normalize": self._normalize_cache.stats(),
+            "parse": self._parse_cache.stats(),
+        }
 
     def normalize_query(self, query: str) -> str:
         """Normalize a SQL query by removing whitespace, comments, etc.
@@ -33,27 +107,121 @@ class SQLParser:
         if not query:
             return ""
 
-        # Remove comments
-        query = sqlparse.format(
-            query,
-            strip_comments=True,
-            reindent=True,
-            keyword_case="upper",
-            identifier_case="lower",
-            strip_whitespace=True,
-        )
+        if self._normalize_cache is None:
+            with stage("normalize"):
+                return self._normalize(query)
+        
+        key = (query, self.dialect)
+        normalized = self._normalize_cache.get(key)
+        if normalized is None:
+            with stage("normalize"):
+                normalized = self._normalize(query)
+            self._normalize_cache.put(key, normalized)
+        
+        return normalized
 
-        # Normalize whitespace
-        query = re.sub(r"\s+", " ", query).strip()
+    def _normalize(self, query: str) -> str:
+        """Normalize a non-empty SQL query without consulting the cache.
 
-        return query
+        Makes a single pass over the sqlparse token stream, producing the same output as
+        formatting with sqlparse.format (comments stripped, keywords upper case, unquoted
+        identifiers lower case) followed by collapsing whitespace, without grouping and
+        reindenting the statement.
 
-    def parse_query(self, query: str) -> Dict[str, Any]:
+        Args:
+            query: SQL query to normalize
+
+        Returns:
+            Normalized SQL query
+        """
+        parts: List[str] = []
+        pending_space = False
+        
+        for ttype, value in lexer.tokenize(query):
+            # Comments and whitespace separate tokens by at most one space
+            if ttype in T.Comment or ttype in T.Whitespace:
+                pending_space = True
+                continue
+            
+            if ttype in T.Punctuation and value in ",)":
+                # No space before commas and closing parentheses
+                pending_space = False
+            elif (ttype in T.Keyword.DML or ttype in T.Keyword.DDL) and parts and parts[-1] == "(":
+                # Subqueries are separated from the preceding token, e.g. "EXISTS (SELECT"
+                if len(parts) > 1 and parts[-2] != " ":
+                    parts.insert(-1, " ")
+            
+            # No space after opening parentheses
+            if pending_space and parts and parts[-1] != "(":
+                parts.append(" ")
+            
+            # Commas are followed by a single space
+            pending_space = ttype in T.Punctuation and value == ","
+            
+            if ttype in T.Keyword:
+                value = value.upper()
+            elif (ttype is T.Name or ttype is T.String.Symbol) and not value.startswith('"'):
+                value = value.lower()
+            parts.append(value)
+        
+        # Whitespace inside tokens, e.g. in "ORDER  BY" or string literals, is collapsed too
+        return WHITESPACE_PATTERN.sub(" ", "".join(parts)).strip()
+
+    def analyze_query(self, query: Union[str, AnalyzedQuery]) -> AnalyzedQuery:
+        """Wrap a SQL query so that it is normalized and parsed at most once.
+
+        Args:
+            query: SQL query, or an already analyzed query which is returned unchanged
+
+        Returns:
+            AnalyzedQuery for the given query
+        """
+        if isinstance(query, AnalyzedQuery):
+            return query
+        return AnalyzedQuery(query, self)
+
+    def parse_query(self, query: str) -> ParsedQuery:
         """Parse a SQL query and extract its components.
 
+        The result is immutable and, when caching is enabled, shared between callers. It
+        only holds the parsed tree if the parser was created with keep_tree.
+
         Args:
             query: SQL query to parse
 
+        Returns:
+            Parsed query components
+        """
+        return self.analyze_query(query).parsed
+
+    def _parse(self, query: str, normalized_query: str) -> ParsedQuery:
+        """Parse an already normalized SQL query, consulting the cache if enabled.
+
+        Args:
+            query: Original SQL query
+            normalized_query: Normalized form of the query
+
+        Returns:
+            Parsed query components
+        """
+        if self._parse_cache is None or not query:
+            return ParsedQuery(self._parse_uncached(query, normalized_query), self.keep_tree)
+        
+        key = (normalized_query, self.dialect)
+        result = self._parse_cache.get(key)
+        if result is None:
+            result = ParsedQuery(self._parse_uncached(query, normalized_query), self.keep_tree)
+            self._parse_cache.put(key, result)
+        
+        return result
+
+    def _parse_uncached(self, query: str, normalized_query: str) -> Dict[str, Any]:
+        """Parse an already normalized SQL query and extract its components.
+
+        Args:
+            query: Original SQL query
+            normalized_query: Normalized form of the query
+
         Returns:
             Dictionary containing parsed query components
         """
@@ -64,10 +232,15 @@ class SQLParser:
             "columns": set(),
             "joins": [],
             "where_conditions": [],
+            "having_conditions": [],
             "group_by": [],
             "order_by": [],
             "limit": None,
             "aggregations": set(),
+            "window_functions": [],
+            "ctes": [],
+            "references": self._empty_references(),
+            "fingerprint": None,
             "query_type": None,
             "parsed_tree": None,
         }
@@ -76,65 +249,60 @@ class SQLParser:
             result["error"] = "Empty query"
             return result
 
-        normalized_query = self.normalize_query(query)
-
         # Try parsing with sqlglot
         try:
-            parsed = sqlglot.parse_one(normalized_query)
-            result["parsed_tree"] = parsed
-            result["success"] = True
-            result["query_type"] = self._get_query_type(parsed)
-
-            # Extract tables
-            tables = self._extract_tables(parsed)
-            result["tables"] = tables
-
-            # Extract columns
-            columns = self._extract_columns(parsed)
-            result["columns"] = columns
-
-            # Extract joins
-            joins = self._extract_joins(parsed)
-            result["joins"] = joins
-
-            # Extract where conditions
-            where_conditions = self._extract_where_conditions(parsed)
-            result["where_conditions"] = where_conditions
-
-            # Extract group by
-            group_by = self._extract_group_by(parsed)
-            result["group_by"] = group_by
-
-            # Extract order by
-            order_by = self._extract_order_by(parsed)
-            result["order_by"] = order_by
+            with stage("parse"):
+                parsed = sqlglot.parse_one(normalized_query, read=self.dialect)
+                result["parsed_tree"] = parsed
+                result["success"] = True
+                result["query_type"] = self._get_query_type(parsed)
 
-            # Extract limit
-            limit = self._extract_limit(parsed)
-            result["limit"] = limit
+                # Extract every component in a single walk over the tree
+                result.update(extract_components(parsed))
 
-            # Extract aggregations
-            aggregations = self._extract_aggregations(parsed)
-            result["aggregations"] = aggregations
+            # Fingerprint the canonical form for static equivalence checks
+            with stage("canonicalize"):
+                result["fingerprint"] = fingerprint(parsed, self.dialect)
 
         except ParseError as e:
-            # If sqlglot fails, try mo_sql_parsing
+            # If sqlglot fails, try mo_sql_parsing, which is only loaded for this fallback
             try:
-                parsed = mo_parse(normalized_query)
-                result["parsed_tree"] = parsed
-                result["success"] = True
-                result["query_type"] = self._get_query_type_mo(parsed)
-                
-                # Extract basic components using mo_sql_parsing
-                self._extract_components_mo(parsed, result)
+                with stage("fallback_parse"):
+                    from mo_sql_parsing import parse as mo_parse
+                    
+                    parsed = mo_parse(normalized_query)
+                    result["parsed_tree"] = parsed
+                    result["success"] = True
+                    result["query_type"] = self._get_query_type_mo(parsed)
+                    
+                    # Extract basic components using mo_sql_parsing
+                    self._extract_components_mo(parsed, result)
+                record_event("fallback_parse")
                 
             except Exception as mo_e:
+                record_event("parse_failure")
                 result["error"] = f"Failed to parse query: {str(e)}. Mo_sql_parsing error: {str(mo_e)}"
         except Exception as e:
             result["error"] = f"Unexpected error parsing query: {str(e)}"
 
         return result
 
+    @staticmethod
+    def _empty_references() -> Dict[str, Any]:
+        """Create an empty set of schema references.
+
+        Returns:
+            Dictionary of table aliases, derived table names, output aliases, column
+            references and join keys
+        """
+        return {
+            "tables": {},
+            "derived": set(),
+            "output_aliases": set(),
+            "columns": set(),
+            "joins": [],
+        }
+
     def _get_query_type(self, parsed_tree: exp.Expression) -> str:
         """Get the type of SQL query from a sqlglot parsed tree.
 
@@ -179,258 +347,6 @@ class SQLParser:
         else:
             return "UNKNOWN"
 
-    def _extract_tables(self, parsed_tree: exp.Expression) -> Set[str]:
-        """Extract table names from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            Set of table names
-        """
-        tables = set()
-        
-        if isinstance(parsed_tree, exp.Select):
-            # Extract from tables
-            if parsed_tree.args.get("from"):
-                from_clause = parsed_tree.args["from"]
-                if isinstance(from_clause, exp.From):
-                    for expr in from_clause.expressions:
-                        if isinstance(expr, exp.Table):
-                            if expr.name:
-                                tables.add(expr.name)
-                        elif isinstance(expr, exp.Subquery):
-                            # Recursively extract tables from subqueries
-                            subquery_tables = self._extract_tables(expr.this)
-                            tables.update(subquery_tables)
-            
-            # Extract join tables
-            for join_type in ["join", "left_join", "right_join", "full_join"]:
-                if parsed_tree.args.get(join_type):
-                    join_clauses = parsed_tree.args[join_type]
-                    for join_clause in join_clauses:
-                        if isinstance(join_clause, exp.Join):
-                            if isinstance(join_clause.this, exp.Table):
-                                tables.add(join_clause.this.name)
-                            elif isinstance(join_clause.this, exp.Subquery):
-                                subquery_tables = self._extract_tables(join_clause.this.this)
-                                tables.update(subquery_tables)
-        
-        return tables
-
-    def _extract_columns(self, parsed_tree: exp.Expression) -> Set[str]:
-        """Extract column names from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            Set of column names
-        """
-        columns = set()
-        
-        if isinstance(parsed_tree, exp.Select):
-            # Extract columns from SELECT clause
-            for expr in parsed_tree.expressions:
-                if isinstance(expr, exp.Column):
-                    columns.add(expr.name)
-                elif isinstance(expr, exp.Alias) and isinstance(expr.this, exp.Column):
-                    columns.add(expr.this.name)
-            
-            # Extract columns from WHERE clause
-            if parsed_tree.args.get("where"):
-                where_clause = parsed_tree.args["where"]
-                self._extract_columns_from_expression(where_clause, columns)
-            
-            # Extract columns from GROUP BY clause
-            if parsed_tree.args.get("group"):
-                group_by = parsed_tree.args["group"]
-                for expr in group_by:
-                    if isinstance(expr, exp.Column):
-                        columns.add(expr.name)
-            
-            # Extract columns from ORDER BY clause
-            if parsed_tree.args.get("order"):
-                order_by = parsed_tree.args["order"]
-                for expr in order_by:
-                    if isinstance(expr, exp.Order) and isinstance(expr.this, exp.Column):
-                        columns.add(expr.this.name)
-        
-        return columns
-
-    def _extract_columns_from_expression(self, expr: exp.Expression, columns: Set[str]) -> None:
-        """Recursively extract column names from an expression.
-
-        Args:
-            expr: sqlglot expression
-            columns: Set to add column names to
-        """
-        if isinstance(expr, exp.Column):
-            columns.add(expr.name)
-        elif hasattr(expr, "this") and expr.this is not None:
-            self._extract_columns_from_expression(expr.this, columns)
-        
-        if hasattr(expr, "expressions"):
-            for sub_expr in expr.expressions:
-                self._extract_columns_from_expression(sub_expr, columns)
-
-    def _extract_joins(self, parsed_tree: exp.Expression) -> List[Dict[str, Any]]:
-        """Extract join information from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            List of join dictionaries
-        """
-        joins = []
-        
-        if isinstance(parsed_tree, exp.Select):
-            for join_type in ["join", "left_join", "right_join", "full_join"]:
-                if parsed_tree.args.get(join_type):
-                    join_clauses = parsed_tree.args[join_type]
-                    for join_clause in join_clauses:
-                        if isinstance(join_clause, exp.Join):
-                            join_info = {
-                                "type": join_type.upper().replace("_", " "),
-                                "table": None,
-                                "condition": None
-                            }
-                            
-                            if isinstance(join_clause.this, exp.Table):
-                                join_info["table"] = join_clause.this.name
-                            
-                            if join_clause.args.get("on"):
-                                on_clause = join_clause.args["on"]
-                                join_info["condition"] = str(on_clause)
-                            
-                            joins.append(join_info)
-        
-        return joins
-
-    def _extract_where_conditions(self, parsed_tree: exp.Expression) -> List[str]:
-        """Extract where conditions from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            List of where condition strings
-        """
-        conditions = []
-        
-        if isinstance(parsed_tree, exp.Select) and parsed_tree.args.get("where"):
-            where_clause = parsed_tree.args["where"]
-            self._extract_conditions(where_clause, conditions)
-        
-        return conditions
-
-    def _extract_conditions(self, expr: exp.Expression, conditions: List[str]) -> None:
-        """Recursively extract conditions from an expression.
-
-        Args:
-            expr: sqlglot expression
-            conditions: List to add condition strings to
-        """
-        if isinstance(expr, (exp.EQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.NEQ, exp.Like, exp.In)):
-            conditions.append(str(expr))
-        elif isinstance(expr, (exp.And, exp.Or)):
-            self._extract_conditions(expr.this, conditions)
-            self._extract_conditions(expr.expression, conditions)
-
-    def _extract_group_by(self, parsed_tree: exp.Expression) -> List[str]:
-        """Extract group by columns from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            List of group by column strings
-        """
-        group_by = []
-        
-        if isinstance(parsed_tree, exp.Select) and parsed_tree.args.get("group"):
-            group_clause = parsed_tree.args["group"]
-            for expr in group_clause:
-                group_by.append(str(expr))
-        
-        return group_by
-
-    def _extract_order_by(self, parsed_tree: exp.Expression) -> List[Dict[str, Any]]:
-        """Extract order by information from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            List of order by dictionaries
-        """
-        order_by = []
-        
-        if isinstance(parsed_tree, exp.Select) and parsed_tree.args.get("order"):
-            order_clause = parsed_tree.args["order"]
-            for expr in order_clause:
-                if isinstance(expr, exp.Order):
-                    order_info = {
-                        "column": str(expr.this),
-                        "direction": "DESC" if expr.args.get("desc") else "ASC"
-                    }
-                    order_by.append(order_info)
-        
-        return order_by
-
-    def _extract_limit(self, parsed_tree: exp.Expression) -> Optional[int]:
-        """Extract limit value from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            Limit value or None
-        """
-        if isinstance(parsed_tree, exp.Select) and parsed_tree.args.get("limit"):
-            limit_clause = parsed_tree.args["limit"]
-            if isinstance(limit_clause, exp.Limit) and isinstance(limit_clause.this, exp.Literal):
-                try:
-                    return int(limit_clause.this.this)
-                except (ValueError, TypeError):
-                    return None
-        
-        return None
-
-    def _extract_aggregations(self, parsed_tree: exp.Expression) -> Set[str]:
-        """Extract aggregation functions from a sqlglot parsed tree.
-
-        Args:
-            parsed_tree: sqlglot parsed expression
-
-        Returns:
-            Set of aggregation function strings
-        """
-        aggregations = set()
-        
-        if isinstance(parsed_tree, exp.Select):
-            for expr in parsed_tree.expressions:
-                self._extract_aggregations_from_expression(expr, aggregations)
-        
-        return aggregations
-
-    def _extract_aggregations_from_expression(self, expr: exp.Expression, aggregations: Set[str]) -> None:
-        """Recursively extract aggregation functions from an expression.
-
-        Args:
-            expr: sqlglot expression
-            aggregations: Set to add aggregation function strings to
-        """
-        if isinstance(expr, (exp.Count, exp.Sum, exp.Avg, exp.Min, exp.Max)):
-            aggregations.add(f"{expr.__class__.__name__.upper()}({str(expr.this)})")
-        elif hasattr(expr, "this") and expr.this is not None:
-            self._extract_aggregations_from_expression(expr.this, aggregations)
-        
-        if hasattr(expr, "expressions"):
-            for sub_expr in expr.expressions:
-                self._extract_aggregations_from_expression(sub_expr, aggregations)
-
     def _extract_components_mo(self, parsed_tree: Dict[str, Any], result: Dict[str, Any]) -> None:
         """Extract components from a mo_sql_parsing parsed tree.
 
@@ -520,12 +436,14 @@ class SQLParser:
             except (ValueError, TypeError):
                 result["limit"] = None
 
-    def compare_queries(self, query1: str, query2: str) -> Dict[str, Any]:
+    def compare_queries(
+        self, query1: Union[str, AnalyzedQuery], query2: Union[str, AnalyzedQuery]
+    ) -> Dict[str, Any]:
         """Compare two SQL queries for logical equivalence.
 
         Args:
-            query1: First SQL query
-            query2: Second SQL query
+            query1: First SQL query or analyzed query
+            query2: Second SQL query or analyzed query
 
         Returns:
             Dictionary with comparison results
@@ -541,15 +459,15 @@ class SQLParser:
             "order_by_match": False,
             "limit_match": False,
             "aggregation_match": False,
+            "canonical_match": False,
             "error": None
         }
         
-        # Normalize queries
-        normalized_query1 = self.normalize_query(query1)
-        normalized_query2 = self.normalize_query(query2)
+        query1 = self.analyze_query(query1)
+        query2 = self.analyze_query(query2)
         
         # Check for exact match after normalization
-        if normalized_query1 == normalized_query2:
+        if query1.normalized == query2.normalized:
             result["exact_match"] = True
             result["logical_equivalence"] = True
             # Set all other matches to True
@@ -559,8 +477,8 @@ class SQLParser:
             return result
         
         # Parse queries
-        parsed1 = self.parse_query(query1)
-        parsed2 = self.parse_query(query2)
+        parsed1 = query1.parsed
+        parsed2 = query2.parsed
         
         # Check for parsing errors
         if not parsed1["success"]:
@@ -576,6 +494,14 @@ class SQLParser:
             result["error"] = f"Query types don't match: {parsed1['query_type']} vs {parsed2['query_type']}"
             return result
         
+        # Queries with the same canonical form are logically equivalent
+        if parsed1["fingerprint"] is not None and parsed1["fingerprint"] == parsed2["fingerprint"]:
+            result["logical_equivalence"] = True
+            for key in result:
+                if key.endswith("_match") and key != "exact_match":
+                    result[key] = True
+            return result
+        
         # Compare tables
         result["table_match"] = parsed1["tables"] == parsed2["tables"]
         
@@ -675,30 +601,41 @@ class SQLParser:
         return result
 
     def try_logical_equivalence_with_execution(
-        self, query1: str, query2: str, executor: Any
+        self,
+        query1: Union[str, AnalyzedQuery],
+        query2: Union[str, AnalyzedQuery],
+        executor: Any,
+        execution_memo: Optional[Dict[str, Any]] = None,
     ) -> Tuple[bool, Dict[str, Any]]:
         """Try to determine logical equivalence by executing both queries.
 
         Args:
-            query1: First SQL query
-            query2: Second SQL query
+            query1: First SQL query or analyzed query
+            query2: Second SQL query or analyzed query
             executor: DatabaseExecutor instance
+            execution_memo: Execution outcomes keyed by SQL string, reused so that each
+                query is executed at most once per evaluation
 
         Returns:
             Tuple containing:
                 - Boolean indicating logical equivalence
                 - Dictionary with comparison details
         """
+        query1 = self.analyze_query(query1)
+        query2 = self.analyze_query(query2)
+        
         # First check static analysis
         static_comparison = self.compare_queries(query1, query2)
         
-        # If static analysis shows exact match, we're done
-        if static_comparison["exact_match"]:
+        # If static analysis shows an exact or canonical match, we're done
+        if static_comparison["exact_match"] or static_comparison["canonical_match"]:
             return True, static_comparison
         
         # If we have a database executor, try executing both queries
         if executor:
-            execution_comparison = executor.compare_query_results(query1, query2)
+            execution_comparison = executor.compare_query_results(
+                query1.query, query2.query, memo=execution_memo
+            )
             
             # Update the static comparison with execution results
             static_comparison["execution_comparison"] = execution_comparison[1]
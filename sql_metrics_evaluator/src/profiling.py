@@ -0,0 +1,145 @@
+"""Opt-in CPU profiling of individual evaluations."""
+
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of hot functions named in the log line of a profile
+LOGGED_FUNCTIONS = 5
+
+
+class RequestProfiler:
+    """Profiles explicitly requested and randomly sampled evaluations with cProfile.
+
+    cProfile only follows the thread that enables it and only one profile can be active
+    in a process at a time, so a call that arrives while another one is being profiled
+    runs without profiling instead of waiting.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        top_n: int = 20,
+        output_dir: Optional[str] = None,
+        sort_by: str = "cumulative",
+    ) -> None:
+        """Initialize the profiler.
+
+        Args:
+            sample_rate: Fraction of calls profiled without being requested
+            top_n: Number of hot functions included in a report
+            output_dir: Directory the raw profiles are saved to for pstats or snakeviz
+                (None keeps them in memory only)
+            sort_by: pstats sort key ordering the hot functions
+
+        Raises:
+            ValueError: If sample_rate is not between 0 and 1
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.output_dir = output_dir
+        self.sort_by = sort_by
+        self._lock = threading.Lock()
+
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def should_profile(self, requested: bool = False) -> bool:
+        """Decide whether to profile a call.
+
+        Args:
+            requested: Whether the caller asked for a profile
+
+        Returns:
+            True if the call was requested or sampled
+        """
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def run(
+        self, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Call a function under the profiler.
+
+        Args:
+            func: Function to profile
+            args: Positional arguments of the function
+            kwargs: Keyword arguments of the function
+
+        Returns:
+            Tuple containing:
+                - Return value of the function
+                - Profile report, or None if another call was being profiled
+        """
+        if not self._lock.acquire(blocking=False):
+            logger.debug("Another call is being profiled, running without profiling")
+            return func(*args, **kwargs), None
+
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Another profiling tool, e.g. a debugger, is already active
+                logger.warning(f"Could not start profiler: {str(e)}")
+                return func(*args, **kwargs), None
+
+            start_time = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+            duration_ms = (time.perf_counter() - start_time) * 1000
+        finally:
+            self._lock.release()
+
+        name = getattr(func, "__name__", "call").lstrip("_")
+        return result, self._report(profiler, name, duration_ms)
+
+    def _report(
+        self, profiler: cProfile.Profile, name: str, duration_ms: float
+    ) -> Dict[str, Any]:
+        """Summarize a profile as its hottest functions, saving it if configured.
+
+        Args:
+            profiler: Profiler that ran the call
+            name: Name of the profiled function
+            duration_ms: Wall-clock duration of the call in milliseconds
+
+        Returns:
+            Dictionary with the duration, the path of the saved profile and the hot
+            functions with their call count, own time and cumulative time
+        """
+        path = None
+        if self.output_dir:
+            stamp = time.strftime("%Y%m%dT%H%M%S")
+            path = os.path.join(self.output_dir, f"{name}-{stamp}-{uuid.uuid4().hex[:8]}.prof")
+            profiler.dump_stats(path)
+
+        stats = pstats.Stats(profiler).sort_stats(self.sort_by)
+        functions = []
+        for function in stats.fcn_list[: self.top_n]:
+            _, calls, own_time, cumulative_time, _ = stats.stats[function]
+            functions.append(
+                {
+                    "function": pstats.func_std_string(function),
+                    "calls": calls,
+                    "own_time_ms": own_time * 1000,
+                    "cumulative_time_ms": cumulative_time * 1000,
+                }
+            )
+
+        hottest = ", ".join(item["function"] for item in functions[:LOGGED_FUNCTIONS])
+        logger.info(f"Profiled {name} in {duration_ms:.1f}ms, hottest functions: {hottest}")
+
+        return {"duration_ms": duration_ms, "path": path, "functions": functions}
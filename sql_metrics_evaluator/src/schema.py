@@ -0,0 +1,648 @@
+"""Database schema model for SQL metrics evaluation."""
+
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+# sqlglot is only needed to parse DDL schema descriptions and is imported on first use
+if TYPE_CHECKING:
+    from sqlglot import exp
+
+# Bulk introspection query returning one row per column of every table and view, for
+# databases providing information_schema (PostgreSQL, MySQL, MariaDB, SQL Server)
+INFORMATION_SCHEMA_SQL = """
+SELECT
+    t.table_schema,
+    t.table_name,
+    t.table_type,
+    c.column_name,
+    c.data_type,
+    c.is_nullable
+FROM
+    information_schema.tables t
+    LEFT JOIN information_schema.columns c
+        ON c.table_schema = t.table_schema
+        AND c.table_name = t.table_name
+WHERE
+    t.table_schema NOT IN (
+        'pg_catalog', 'information_schema', 'mysql', 'performance_schema', 'sys'
+    )
+    AND t.table_type IN ('BASE TABLE', 'VIEW')
+ORDER BY
+    t.table_schema, t.table_name, c.ordinal_position
+"""
+
+# Bulk introspection query with the same columns for SQLite
+SQLITE_SCHEMA_SQL = """
+SELECT
+    NULL,
+    m.name,
+    CASE m.type WHEN 'view' THEN 'VIEW' ELSE 'BASE TABLE' END,
+    p.name,
+    p.type,
+    CASE p."notnull" WHEN 1 THEN 'NO' ELSE 'YES' END
+FROM
+    sqlite_master m
+    LEFT JOIN pragma_table_info(m.name) p
+WHERE
+    m.type IN ('table', 'view')
+    AND m.name NOT LIKE 'sqlite_%'
+ORDER BY
+    m.name, p.cid
+"""
+
+# Introspection queries keyed by dialect, defaulting to INFORMATION_SCHEMA_SQL
+SCHEMA_QUERIES = {
+    "sqlite": SQLITE_SCHEMA_SQL,
+}
+
+# Foreign key query returning one row per referencing column, as schema, table and column
+# of the referencing and of the referenced side
+INFORMATION_SCHEMA_FOREIGN_KEYS_SQL = """
+SELECT
+    kcu.table_schema,
+    kcu.table_name,
+    kcu.column_name,
+    ref.table_schema,
+    ref.table_name,
+    ref.column_name
+FROM
+    information_schema.referential_constraints rc
+    JOIN information_schema.key_column_usage kcu
+        ON kcu.constraint_schema = rc.constraint_schema
+        AND kcu.constraint_name = rc.constraint_name
+    JOIN information_schema.key_column_usage ref
+        ON ref.constraint_schema = rc.unique_constraint_schema
+        AND ref.constraint_name = rc.unique_constraint_name
+        AND ref.ordinal_position = kcu.position_in_unique_constraint
+"""
+
+# Foreign key query with the same columns for MySQL and MariaDB, whose unique constraint
+# names are only unique per table
+MYSQL_FOREIGN_KEYS_SQL = """
+SELECT
+    table_schema,
+    table_name,
+    column_name,
+    referenced_table_schema,
+    referenced_table_name,
+    referenced_column_name
+FROM
+    information_schema.key_column_usage
+WHERE
+    referenced_table_name IS NOT NULL
+"""
+
+# Foreign key query with the same columns for SQLite
+SQLITE_FOREIGN_KEYS_SQL = """
+SELECT
+    NULL,
+    m.name,
+    f."from",
+    NULL,
+    f."table",
+    f."to"
+FROM
+    sqlite_master m
+    JOIN pragma_foreign_key_list(m.name) f
+WHERE
+    m.type = 'table'
+"""
+
+# Foreign key queries keyed by dialect, defaulting to INFORMATION_SCHEMA_FOREIGN_KEYS_SQL
+FOREIGN_KEY_QUERIES = {
+    "mysql": MYSQL_FOREIGN_KEYS_SQL,
+    "mariadb": MYSQL_FOREIGN_KEYS_SQL,
+    "sqlite": SQLITE_FOREIGN_KEYS_SQL,
+}
+
+# Schema description lines, e.g. "Table: orders" and "Columns: id (int), total (decimal)",
+# and foreign keys written as "orders.customer_id -> customers.id"
+TABLE_LINE_PATTERN = re.compile(r"^(?:table|view)\s*(?:name)?\s*:\s*(\S+)", re.IGNORECASE)
+COLUMNS_LINE_PATTERN = re.compile(r"^columns\s*:\s*(.*)$", re.IGNORECASE)
+FOREIGN_KEY_PATTERN = re.compile(
+    r"([\w.\"`]+)\.([\w\"`]+)\s*(?:->|=>|references)\s*([\w.\"`]+)\.([\w\"`]+)", re.IGNORECASE
+)
+
+
+class ColumnInfo(BaseModel):
+    """Column of a table or view."""
+
+    model_config = ConfigDict(frozen=True)
+
+    name: str = Field(..., description="Column name")
+    data_type: Optional[str] = Field(default=None, description="Column data type")
+    is_nullable: bool = Field(default=True, description="Whether the column accepts NULL")
+
+
+class ForeignKeyInfo(BaseModel):
+    """Foreign key column referencing a column of another table."""
+
+    model_config = ConfigDict(frozen=True)
+
+    table: str = Field(..., description="Referencing table, optionally schema-qualified")
+    column: str = Field(..., description="Referencing column")
+    referenced_table: str = Field(..., description="Referenced table, optionally schema-qualified")
+    referenced_column: Optional[str] = Field(
+        default=None, description="Referenced column (None for the primary key)"
+    )
+
+
+class TableInfo(BaseModel):
+    """Table or view with its columns indexed by name."""
+
+    model_config = ConfigDict(frozen=True)
+
+    name: str = Field(..., description="Table name")
+    schema_name: Optional[str] = Field(default=None, description="Schema containing the table")
+    is_view: bool = Field(default=False, description="Whether the table is a view")
+    columns: List[ColumnInfo] = Field(default_factory=list, description="Columns in order")
+
+    _columns_by_name: Dict[str, ColumnInfo] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        """Index the columns by lower-case name."""
+        self._columns_by_name = {column.name.lower(): column for column in self.columns}
+
+    @property
+    def qualified_name(self) -> str:
+        """Table name prefixed with its schema, if any."""
+        if self.schema_name:
+            return f"{self.schema_name}.{self.name}"
+        return self.name
+
+    def get_column(self, name: str) -> Optional[ColumnInfo]:
+        """Look up a column by name, ignoring case and identifier quotes.
+
+        Args:
+            name: Column name
+
+        Returns:
+            Column, or None if the table has no such column
+        """
+        return self._columns_by_name.get(_normalize_identifier(name))
+
+
+class DatabaseSchema(BaseModel):
+    """Tables and views of a database, indexed by name."""
+
+    model_config = ConfigDict(frozen=True)
+
+    tables: List[TableInfo] = Field(default_factory=list, description="Tables and views")
+    foreign_keys: List[ForeignKeyInfo] = Field(
+        default_factory=list, description="Foreign keys between tables"
+    )
+
+    _tables_by_name: Dict[str, TableInfo] = PrivateAttr(default_factory=dict)
+    _join_keys: Set[Tuple[str, str, str, Optional[str]]] = PrivateAttr(default_factory=set)
+
+    def model_post_init(self, __context: Any) -> None:
+        """Index the tables by name and the foreign keys as a graph of join keys.
+
+        An unqualified name shared by several schemas refers to the first of them.
+        """
+        index: Dict[str, TableInfo] = {}
+        for table in self.tables:
+            index.setdefault(table.qualified_name.lower(), table)
+        for table in self.tables:
+            index.setdefault(table.name.lower(), table)
+        self._tables_by_name = index
+        
+        # Each foreign key allows joining in both directions
+        for foreign_key in self.foreign_keys:
+            table = self.get_table(foreign_key.table)
+            referenced_table = self.get_table(foreign_key.referenced_table)
+            if table is None or referenced_table is None:
+                continue
+            column = _normalize_identifier(foreign_key.column)
+            referenced_column = (
+                _normalize_identifier(foreign_key.referenced_column)
+                if foreign_key.referenced_column
+                else None
+            )
+            table_name = table.qualified_name.lower()
+            referenced_name = referenced_table.qualified_name.lower()
+            self._join_keys.add((table_name, column, referenced_name, referenced_column))
+            self._join_keys.add((referenced_name, referenced_column, table_name, column))
+
+    def get_table(self, name: str) -> Optional[TableInfo]:
+        """Look up a table or view by name, ignoring case and identifier quotes.
+
+        Args:
+            name: Table name, optionally qualified with its schema
+
+        Returns:
+            Table, or None if the schema has no such table
+        """
+        return self._tables_by_name.get(_normalize_identifier(name))
+
+    def has_table(self, name: str) -> bool:
+        """Check whether the schema defines a table or view.
+
+        Args:
+            name: Table name, optionally qualified with its schema
+
+        Returns:
+            True if the table exists
+        """
+        return self.get_table(name) is not None
+
+    def has_join_key(
+        self, table: TableInfo, column: str, other: TableInfo, other_column: str
+    ) -> bool:
+        """Check whether a foreign key links two table columns, in either direction.
+
+        Args:
+            table: First table
+            column: Column of the first table
+            other: Second table
+            other_column: Column of the second table
+
+        Returns:
+            True if a foreign key links the columns
+        """
+        table_name = table.qualified_name.lower()
+        other_name = other.qualified_name.lower()
+        column = _normalize_identifier(column)
+        other_column = _normalize_identifier(other_column)
+        
+        # A foreign key without a referenced column references the primary key
+        return any(
+            key in self._join_keys
+            for key in (
+                (table_name, column, other_name, other_column),
+                (table_name, column, other_name, None),
+                (table_name, None, other_name, other_column),
+            )
+        )
+
+    def check_references(self, references: Mapping[str, Any]) -> Dict[str, Any]:
+        """Check the tables, columns and join keys referenced by a query.
+
+        Every reference is looked up in the indexes, so the check scales with the size of
+        the query rather than the size of the schema. Columns of CTEs, subqueries and tables
+        without known columns, and joins when the schema declares no foreign keys, cannot
+        be checked and are skipped.
+
+        Args:
+            references: Query references extracted by the SQL parser
+
+        Returns:
+            Dictionary with the share of valid references as score, and the unknown
+            tables, unknown columns and joins not backed by a foreign key
+        """
+        derived = references.get("derived", ())
+        output_aliases = references.get("output_aliases", ())
+        
+        # Resolve table aliases
+        resolved: Dict[str, TableInfo] = {}
+        unknown_tables = []
+        for alias, name in references.get("tables", {}).items():
+            table = self.get_table(name)
+            if table is None:
+                unknown_tables.append(name)
+            else:
+                resolved[alias] = table
+        
+        # Check columns against the tables they may belong to
+        checked = len(references.get("tables", {}))
+        unknown_columns = []
+        for qualifier, column in references.get("columns", ()):
+            if qualifier is not None:
+                if qualifier not in resolved:
+                    # Columns of derived or unknown tables cannot be checked
+                    if qualifier in derived or qualifier in references.get("tables", {}):
+                        continue
+                    checked += 1
+                    unknown_columns.append(f"{qualifier}.{column}")
+                    continue
+                candidates = [resolved[qualifier]]
+            else:
+                if column.lower() in output_aliases:
+                    continue
+                candidates = list(resolved.values())
+            
+            if any(not table.columns or table.get_column(column) for table in candidates):
+                checked += 1
+            elif qualifier is None and (derived or unknown_tables or not candidates):
+                continue
+            else:
+                checked += 1
+                unknown_columns.append(f"{qualifier}.{column}" if qualifier else column)
+        
+        # Check that joins follow foreign keys
+        invalid_joins = []
+        if self.foreign_keys:
+            for (qualifier1, column1), (qualifier2, column2) in references.get("joins", ()):
+                table1 = resolved.get(qualifier1) if qualifier1 else None
+                table2 = resolved.get(qualifier2) if qualifier2 else None
+                if table1 is None or table2 is None or table1 is table2:
+                    continue
+                checked += 1
+                if not self.has_join_key(table1, column1, table2, column2):
+                    invalid_joins.append(f"{qualifier1}.{column1} = {qualifier2}.{column2}")
+        
+        invalid = len(unknown_tables) + len(unknown_columns) + len(invalid_joins)
+        return {
+            "score": 1.0 - invalid / checked if checked else 1.0,
+            "unknown_tables": sorted(unknown_tables),
+            "unknown_columns": sorted(unknown_columns),
+            "invalid_joins": invalid_joins,
+        }
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Sequence[Any]], foreign_key_rows: Iterable[Sequence[Any]] = ()
+    ) -> "DatabaseSchema":
+        """Build the schema from the rows of the bulk introspection queries.
+
+        Args:
+            rows: Rows of schema name, table name, table type, column name, data type and
+                nullability ('YES' or 'NO'), ordered by table and column position; tables
+                without columns have NULL column values
+            foreign_key_rows: Rows of schema, table and column of a referencing column and
+                schema, table and column it references
+
+        Returns:
+            Database schema
+        """
+        tables: Dict[Any, Dict[str, Any]] = {}
+        for table_schema, table_name, table_type, column_name, data_type, is_nullable in rows:
+            table = tables.setdefault(
+                (table_schema, table_name),
+                {
+                    "name": table_name,
+                    "schema_name": table_schema,
+                    "is_view": table_type == "VIEW",
+                    "columns": [],
+                },
+            )
+            if column_name is not None:
+                table["columns"].append(
+                    ColumnInfo(
+                        name=column_name,
+                        data_type=data_type or None,
+                        is_nullable=str(is_nullable).upper() != "NO",
+                    )
+                )
+
+        foreign_keys = [
+            ForeignKeyInfo(
+                table=f"{table_schema}.{table_name}" if table_schema else table_name,
+                column=column_name,
+                referenced_table=(
+                    f"{referenced_schema}.{referenced_table}"
+                    if referenced_schema
+                    else referenced_table
+                ),
+                referenced_column=referenced_column or None,
+            )
+            for (
+                table_schema,
+                table_name,
+                column_name,
+                referenced_schema,
+                referenced_table,
+                referenced_column,
+            ) in foreign_key_rows
+        ]
+
+        return cls(
+            tables=[TableInfo(**table) for table in tables.values()], foreign_keys=foreign_keys
+        )
+
+    def to_info(self) -> Dict[str, Any]:
+        """Convert the schema into the dictionary returned by get_schema_info.
+
+        Returns:
+            Dictionary with lists of tables and views and an empty error
+        """
+        schema_info: Dict[str, Any] = {"tables": [], "views": [], "error": None}
+        for table in self.tables:
+            schema_info["views" if table.is_view else "tables"].append(
+                {
+                    "name": table.name,
+                    "schema": table.schema_name,
+                    "columns": [
+                        {
+                            "column_name": column.name,
+                            "data_type": column.data_type,
+                            "is_nullable": "YES" if column.is_nullable else "NO",
+                        }
+                        for column in table.columns
+                    ],
+                }
+            )
+        return schema_info
+
+
+def parse_schema_text(text: str) -> DatabaseSchema:
+    """Parse a schema description into a database schema.
+
+    Accepts CREATE TABLE and CREATE VIEW statements, or descriptions made of "Table: name"
+    lines followed by "Columns: name (type), ..." lines and foreign keys written as
+    "table.column -> table.column".
+
+    Args:
+        text: Schema description
+
+    Returns:
+        Database schema, without tables if the description could not be understood
+    """
+    if re.search(r"\bCREATE\s+(?:TABLE|VIEW)\b", text, re.IGNORECASE):
+        from sqlglot.errors import SqlglotError
+        
+        try:
+            return _parse_schema_ddl(text)
+        except SqlglotError:
+            pass
+
+    tables: Dict[str, Dict[str, Any]] = {}
+    foreign_keys = []
+    current: Optional[Dict[str, Any]] = None
+    for line in text.splitlines():
+        line = line.strip().rstrip(";")
+        table_match = TABLE_LINE_PATTERN.match(line)
+        columns_match = COLUMNS_LINE_PATTERN.match(line)
+        if table_match:
+            name = table_match.group(1).strip('"`')
+            current = tables.setdefault(
+                name.lower(),
+                {"name": name, "is_view": line.lower().startswith("view"), "columns": []},
+            )
+        elif columns_match and current is not None:
+            current["columns"].extend(_parse_column_list(columns_match.group(1)))
+        else:
+            for table, column, referenced_table, referenced_column in (
+                FOREIGN_KEY_PATTERN.findall(line)
+            ):
+                foreign_keys.append(
+                    ForeignKeyInfo(
+                        table=table.strip('"`'),
+                        column=column.strip('"`'),
+                        referenced_table=referenced_table.strip('"`'),
+                        referenced_column=referenced_column.strip('"`'),
+                    )
+                )
+
+    return DatabaseSchema(
+        tables=[TableInfo(**table) for table in tables.values()], foreign_keys=foreign_keys
+    )
+
+
+def _parse_schema_ddl(text: str) -> DatabaseSchema:
+    """Parse CREATE TABLE and CREATE VIEW statements into a database schema.
+
+    Args:
+        text: DDL statements
+
+    Returns:
+        Database schema
+    """
+    import sqlglot
+    from sqlglot import exp
+    
+    tables = []
+    foreign_keys = []
+    for statement in sqlglot.parse(text):
+        kind = statement.args.get("kind") if isinstance(statement, exp.Create) else None
+        if kind not in ("TABLE", "VIEW"):
+            continue
+        
+        target = statement.this
+        table = target.this if isinstance(target, exp.Schema) else target
+        if not isinstance(table, exp.Table):
+            continue
+        name = f"{table.db}.{table.name}" if table.db else table.name
+        
+        columns = []
+        if isinstance(target, exp.Schema):
+            for definition in target.expressions:
+                if isinstance(definition, exp.ColumnDef):
+                    data_type = definition.args.get("kind")
+                    columns.append(
+                        ColumnInfo(
+                            name=definition.name,
+                            data_type=data_type.sql() if data_type is not None else None,
+                            is_nullable=not any(
+                                isinstance(constraint.args.get("kind"), exp.NotNullColumnConstraint)
+                                for constraint in definition.args.get("constraints") or []
+                            ),
+                        )
+                    )
+                    
+                    # Inline REFERENCES constraints
+                    for reference in definition.find_all(exp.Reference):
+                        foreign_keys.extend(_reference_keys(name, [definition.name], reference))
+                elif isinstance(definition, exp.ForeignKey):
+                    reference = definition.args.get("reference")
+                    if reference is not None:
+                        referencing = [column.name for column in definition.expressions]
+                        foreign_keys.extend(_reference_keys(name, referencing, reference))
+        
+        tables.append(
+            TableInfo(
+                name=table.name,
+                schema_name=table.db or None,
+                is_view=kind == "VIEW",
+                columns=columns,
+            )
+        )
+
+    return DatabaseSchema(tables=tables, foreign_keys=foreign_keys)
+
+
+def _reference_keys(
+    table: str, columns: List[str], reference: "exp.Reference"
+) -> List[ForeignKeyInfo]:
+    """Convert a REFERENCES clause into foreign keys.
+
+    Args:
+        table: Referencing table
+        columns: Referencing columns
+        reference: Parsed REFERENCES clause
+
+    Returns:
+        One foreign key per referencing column
+    """
+    from sqlglot import exp
+    
+    target = reference.this
+    referenced = target.this if isinstance(target, exp.Schema) else target
+    if not isinstance(referenced, exp.Table):
+        return []
+    referenced_table = f"{referenced.db}.{referenced.name}" if referenced.db else referenced.name
+    referenced_columns: List[Optional[str]] = (
+        [column.name for column in target.expressions] if isinstance(target, exp.Schema) else []
+    )
+    referenced_columns += [None] * (len(columns) - len(referenced_columns))
+    
+    return [
+        ForeignKeyInfo(
+            table=table,
+            column=column,
+            referenced_table=referenced_table,
+            referenced_column=referenced_column,
+        )
+        for column, referenced_column in zip(columns, referenced_columns)
+    ]
+
+
+def _parse_column_list(text: str) -> List[ColumnInfo]:
+    """Parse a comma-separated list of columns such as "id (int), total decimal(10, 2)".
+
+    Args:
+        text: Column list
+
+    Returns:
+        Columns in order
+    """
+    # Split on commas outside parentheses
+    items = []
+    depth = 0
+    current = []
+    for character in text:
+        if character == "," and depth == 0:
+            items.append("".join(current))
+            current = []
+            continue
+        depth += {"(": 1, ")": -1}.get(character, 0)
+        current.append(character)
+    items.append("".join(current))
+    
+    columns = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        name, _, data_type = item.partition(" ")
+        name, _, parenthesized_type = name.partition("(")
+        data_type = (data_type or f"({parenthesized_type}").strip()
+        if data_type.startswith("(") and data_type.endswith(")"):
+            data_type = data_type[1:-1].strip()
+        columns.append(ColumnInfo(name=name.strip('"`'), data_type=data_type or None))
+    return columns
+
+
+def _normalize_identifier(name: str) -> str:
+    """Normalize a possibly quoted and qualified identifier for lookups.
+
+    Args:
+        name: Identifier
+
+    Returns:
+        Lower-case identifier without quotes
+    """
+    return ".".join(part.strip('"`[] ') for part in name.lower().split("."))
@@ -0,0 +1,120 @@
+"""Tests for the vectorized metric aggregation."""
+
+import statistics
+import unittest
+from typing import Any, Dict, List
+
+import numpy
+
+from sql_metrics_evaluator.src import aggregation
+from sql_metrics_evaluator.src.aggregation import MetricTable
+from sql_metrics_evaluator.src.models import SQLMetrics
+
+
+class TestMetricTable(unittest.TestCase):
+    """Test cases for the metric table."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.latencies = {
+            ("base", "simple"): [120.0, 80.0, 100.0],
+            ("base", "complex"): [300.0, 500.0],
+            ("tuned", "simple"): [50.0, 70.0, 60.0, 40.0],
+        }
+        self.records = [
+            {"model": model, "complexity": complexity, "inference_latency": latency}
+            for (model, complexity), latencies in self.latencies.items()
+            for latency in latencies
+        ]
+
+    def find(self, rows: List[Dict[str, Any]], **fields: Any) -> Dict[str, Any]:
+        """Find the single row holding the given fields."""
+        matches = [row for row in rows if all(row.get(k) == v for k, v in fields.items())]
+        self.assertEqual(len(matches), 1)
+        return matches[0]
+
+    def test_grouped_statistics(self) -> None:
+        """Test that statistics of each group match the statistics module."""
+        table = MetricTable()
+        table.extend(self.records)
+
+        rows = table.aggregate(by=("model", "complexity"), metrics=["inference_latency"])
+
+        self.assertEqual(len(rows), 3)
+        for (model, complexity), latencies in self.latencies.items():
+            row = self.find(rows, model=model, complexity=complexity)
+            self.assertEqual(row["count"], len(latencies))
+            self.assertAlmostEqual(row["mean"], statistics.mean(latencies))
+            self.assertAlmostEqual(row["std"], statistics.pstdev(latencies))
+            self.assertAlmostEqual(row["median"], statistics.median(latencies))
+            self.assertEqual((row["min"], row["max"]), (min(latencies), max(latencies)))
+
+    def test_percentiles_interpolate_linearly(self) -> None:
+        """Test that percentiles match numpy's default linear interpolation."""
+        table = MetricTable()
+        values = [float(value) for value in range(1, 12)]
+        for value in values:
+            table.add({"inference_latency": value}, model="base")
+
+        row = table.aggregate(percentiles=[10, 95], metrics=["inference_latency"])[0]
+
+        self.assertAlmostEqual(row["p10"], numpy.percentile(values, 10))
+        self.assertAlmostEqual(row["p95"], numpy.percentile(values, 95))
+
+    def test_missing_values(self) -> None:
+        """Test that missing values are left out and groups without values report None."""
+        table = MetricTable()
+        table.add({"execution_accuracy": None, "inference_latency": 10.0}, model="base")
+        table.add(SQLMetrics(execution_accuracy=1.0, inference_latency=30.0), model="tuned")
+        table.add({"inference_latency": 20.0}, model="base")
+
+        rows = table.aggregate()
+
+        execution = self.find(rows, model="base", metric="execution_accuracy")
+        self.assertEqual(execution["count"], 0)
+        self.assertIsNone(execution["mean"])
+        self.assertIsNone(execution["median"])
+        latency = self.find(rows, model="base", metric="inference_latency")
+        self.assertEqual((latency["count"], latency["median"]), (2, 15.0))
+
+    def test_overall_group(self) -> None:
+        """Test that grouping by no tag aggregates every evaluation together."""
+        table = MetricTable()
+        table.extend(self.records)
+
+        row = table.aggregate(by=(), metrics=["inference_latency"])[0]
+
+        latencies = [latency for values in self.latencies.values() for latency in values]
+        self.assertEqual(set(row) & {"model", "complexity"}, set())
+        self.assertAlmostEqual(row["mean"], statistics.mean(latencies))
+
+    def test_many_groups(self) -> None:
+        """Test that the sort fallback for many groups gives the same statistics."""
+        table = MetricTable(tags=("query_id",), capacity=1)
+        table.extend(
+            {"query_id": index % 7, "inference_latency": float(index * 37 % 11)}
+            for index in range(100)
+        )
+        expected = table.aggregate(by=("query_id",), metrics=["inference_latency"])
+
+        original = aggregation.SEGMENT_SORT_MAX_GROUPS
+        aggregation.SEGMENT_SORT_MAX_GROUPS = 2
+        self.addCleanup(setattr, aggregation, "SEGMENT_SORT_MAX_GROUPS", original)
+
+        self.assertEqual(table.aggregate(by=("query_id",), metrics=["inference_latency"]), expected)
+        self.assertEqual(len(table), 100)
+
+    def test_unknown_tag_or_metric(self) -> None:
+        """Test that grouping by an unknown tag or metric is rejected."""
+        table = MetricTable()
+        table.extend(self.records)
+
+        with self.assertRaises(ValueError):
+            table.aggregate(by=("dataset",))
+        with self.assertRaises(ValueError):
+            table.aggregate(metrics=["bleu"])
+        self.assertEqual(MetricTable().aggregate(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
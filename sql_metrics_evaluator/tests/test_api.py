@@ -0,0 +1,160 @@
+"""Tests for the REST API."""
+
+import json
+import os
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from sql_metrics_evaluator.src.api import app
+
+
+class TestBatchStreamEndpoint(unittest.TestCase):
+    """Test cases for the streaming batch evaluation endpoint."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        # Entering the client runs the lifespan, which creates the evaluator
+        self.client = TestClient(app)
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+        self.reference = "SELECT name FROM users WHERE age > 18"
+        self.generated = [self.reference, "SELECT email FROM users", "SELECT 1"]
+
+    def stream(self, body: str, ordered: bool = True) -> list:
+        """Post a newline-delimited JSON body and decode the streamed lines."""
+        response = self.client.post(
+            "/evaluate/batch/stream",
+            params={"ordered": ordered},
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_streams_responses_and_summary(self) -> None:
+        """Test that one response per request is streamed in order, then a summary."""
+        lines = [
+            json.dumps({"generated_query": query, "reference_query": self.reference})
+            for query in self.generated
+        ]
+        body = "\n".join(lines[:2] + ["not json", ""] + lines[2:])
+
+        results = self.stream(body)
+
+        self.assertEqual(
+            [result["generated_query"] for result in results[:-1]], self.generated
+        )
+        self.assertEqual(results[0]["metrics"]["exact_match_accuracy"], 1.0)
+        summary = results[-1]["summary"]
+        self.assertEqual(summary["total"], 3)
+        self.assertEqual(summary["invalid"], 1)
+        self.assertEqual(summary["failed"], 0)
+
+    def test_completion_order(self) -> None:
+        """Test that completion-order mode still returns every response."""
+        body = "\n".join(
+            json.dumps({"generated_query": query, "reference_query": self.reference})
+            for query in self.generated
+        )
+
+        results = self.stream(body, ordered=False)
+
+        self.assertCountEqual(
+            [result["generated_query"] for result in results[:-1]], self.generated
+        )
+        self.assertEqual(results[-1]["summary"]["total"], 3)
+
+
+class TestHealthEndpoint(unittest.TestCase):
+    """Test cases for the health check endpoint."""
+
+    def test_health(self) -> None:
+        """Test that the health check reports pool statistics."""
+        with TestClient(app) as client:
+            response = client.get("/health")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ok")
+        self.assertIsInstance(response.json()["pool"], dict)
+
+    def test_schema_without_database(self) -> None:
+        """Test that the schema endpoint reports a missing database."""
+        with TestClient(app) as client:
+            response = client.get("/schema")
+
+        self.assertEqual(response.status_code, 503)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """Test cases for the Prometheus metrics endpoint and the stage timings."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.client = TestClient(app)
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+        self.request = {
+            "generated_query": "SELECT name FROM users",
+            "reference_query": "SELECT name FROM users WHERE age > 18",
+        }
+
+    def test_timings_only_on_request(self) -> None:
+        """Test that stage timings are only returned when requested."""
+        default = self.client.post("/evaluate", json=self.request)
+        requested = self.client.post("/evaluate", params={"timings": True}, json=self.request)
+
+        self.assertIsNone(default.json()["metrics"]["stage_timings"])
+        self.assertIn("static_analysis", requested.json()["metrics"]["stage_timings"])
+
+    def test_metrics_exposition(self) -> None:
+        """Test that evaluations are exposed in the Prometheus text format."""
+        self.client.post("/evaluate", json=self.request)
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        )
+        self.assertIn(
+            'sql_metrics_stage_duration_seconds_count{stage="static_analysis"}', response.text
+        )
+        self.assertIn("# TYPE sql_metrics_parse_failures_total counter", response.text)
+        self.assertIn("# TYPE sql_metrics_db_timeouts_total counter", response.text)
+
+
+class TestProfilingEndpoints(unittest.TestCase):
+    """Test cases for profiling requests through the API."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        environment = mock.patch.dict(os.environ, {"PROFILING_ENABLED": "true"})
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.client = TestClient(app)
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+        self.request = {
+            "generated_query": "SELECT name FROM users",
+            "reference_query": "SELECT name FROM users WHERE age > 18",
+        }
+
+    def test_profile_header(self) -> None:
+        """Test that the X-Profile header returns the hot functions of the evaluation."""
+        default = self.client.post("/evaluate", json=self.request)
+        profiled = self.client.post("/evaluate", headers={"X-Profile": "1"}, json=self.request)
+
+        self.assertIsNone(default.json()["metrics"]["profile"])
+        self.assertTrue(profiled.json()["metrics"]["profile"]["functions"])
+
+    def test_profile_batch(self) -> None:
+        """Test that profile=true profiles a whole batch."""
+        response = self.client.post(
+            "/evaluate/batch", params={"profile": True}, json={"requests": [self.request] * 2}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["responses"]), 2)
+        self.assertTrue(response.json()["profile"]["functions"])
@@ -0,0 +1,116 @@
+"""Tests for query canonicalization."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import sqlglot
+
+from sql_metrics_evaluator.src.canonical import canonicalize, fingerprint
+from sql_metrics_evaluator.src.comparison import ResultSet
+from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
+from sql_metrics_evaluator.src.parser import SQLParser
+
+
+class TestCanonicalize(unittest.TestCase):
+    """Test cases for canonical forms and fingerprints."""
+
+    def fingerprint(self, query: str) -> str:
+        """Fingerprint a query."""
+        return fingerprint(sqlglot.parse_one(query))
+
+    def test_equivalent_spellings(self) -> None:
+        """Test that aliases, qualification and operand order do not change the form."""
+        pairs = [
+            (
+                "SELECT p.name FROM products p WHERE p.price > 10 AND p.stock = 5",
+                "SELECT name FROM products WHERE 5 = stock AND 10 < price",
+            ),
+            (
+                "SELECT c.name AS n, COUNT(*) AS cnt FROM customers c "
+                "JOIN orders o ON c.id = o.customer_id GROUP BY c.name ORDER BY cnt DESC",
+                "SELECT customers.name, COUNT(*) FROM customers JOIN orders "
+                "ON orders.customer_id = customers.id GROUP BY customers.name "
+                "ORDER BY COUNT(*) DESC",
+            ),
+            (
+                "SELECT e.name FROM emp e JOIN emp m ON e.manager_id = m.id",
+                "SELECT a.name FROM emp a JOIN emp b ON a.manager_id = b.id",
+            ),
+        ]
+        for query1, query2 in pairs:
+            self.assertEqual(self.fingerprint(query1), self.fingerprint(query2))
+
+    def test_different_queries(self) -> None:
+        """Test that queries with different semantics keep different forms."""
+        pairs = [
+            ("SELECT a FROM t WHERE x = 1 AND y = 2", "SELECT a FROM t WHERE x = 2 AND y = 1"),
+            ("SELECT a FROM t WHERE x < 1", "SELECT a FROM t WHERE x > 1"),
+            ("SELECT a FROM t ORDER BY a", "SELECT a FROM t ORDER BY a DESC"),
+            ("SELECT a FROM t", "SELECT a FROM u"),
+        ]
+        for query1, query2 in pairs:
+            self.assertNotEqual(self.fingerprint(query1), self.fingerprint(query2))
+
+    def test_input_unchanged(self) -> None:
+        """Test that canonicalization works on a copy of the parsed tree."""
+        tree = sqlglot.parse_one("SELECT p.name AS n FROM products p")
+
+        canonicalize(tree)
+
+        self.assertEqual(tree.sql(), "SELECT p.name AS n FROM products AS p")
+
+
+class TestCanonicalEquivalence(unittest.TestCase):
+    """Test cases for canonical matches during evaluation."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.generated = "SELECT p.name FROM products p WHERE p.price > 10"
+        self.reference = "SELECT name FROM products WHERE price > 10"
+
+    def test_compare_queries(self) -> None:
+        """Test that a canonical match is reported as logically equivalent."""
+        comparison = SQLParser(cache_size=8).compare_queries(self.generated, self.reference)
+
+        self.assertTrue(comparison["canonical_match"])
+        self.assertTrue(comparison["logical_equivalence"])
+        self.assertFalse(comparison["exact_match"])
+
+    def test_generated_query_executed(self) -> None:
+        """Test that a canonical match still executes the generated query."""
+        evaluator = SQLMetricsEvaluator(db_connection_string="sqlite://")
+        with mock.patch.object(
+            evaluator.db_executor,
+            "fetch_result_set",
+            return_value=(True, ResultSet(["name"], [("pen",)]), 1.0),
+        ) as fetch_result_set:
+            metrics = evaluator.evaluate(self.generated, self.reference)
+
+        executed = {call.args[0] for call in fetch_result_set.call_args_list}
+        self.assertEqual(executed, {self.generated, self.reference})
+        self.assertEqual(metrics.logical_form_accuracy, 1.0)
+        self.assertEqual(metrics.execution_accuracy, 1.0)
+        evaluator.db_executor.close()
+
+    def test_literal_whitespace_executed(self) -> None:
+        """Test that queries only differing by whitespace inside a literal are both run."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "data.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE t (name TEXT)")
+            connection.execute("INSERT INTO t VALUES ('a b')")
+        evaluator = SQLMetricsEvaluator(db_connection_string=f"sqlite:///{path}")
+
+        metrics = evaluator.evaluate(
+            "SELECT name FROM t WHERE name = 'a  b'", "SELECT name FROM t WHERE name = 'a b'"
+        )
+
+        comparison = metrics.execution_details["details"]
+        self.assertTrue(comparison["both_succeeded"])
+        self.assertFalse(comparison["result_match"])
+        self.assertEqual(metrics.execution_accuracy, 0.0)
+        evaluator.db_executor.close()
@@ -0,0 +1,158 @@
+"""Tests for the bulk evaluation command line interface."""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from typing import Any, Dict, List
+
+from sql_metrics_evaluator.src.cli import build_parser, main, run
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+class TestBulkEvaluation(unittest.TestCase):
+    """Test cases for streaming evaluation of JSONL corpora."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.reference = "SELECT name FROM users WHERE age > 18"
+        self.records = [
+            {
+                "model": model,
+                "query_id": index,
+                "generated": generated,
+                "reference": self.reference,
+                "complexity": "simple",
+                "latency": 100.0 * (index + 1),
+            }
+            for model, generated in [
+                ("base", "SELECT email FROM users"),
+                ("tuned", self.reference),
+            ]
+            for index in range(3)
+        ]
+
+    def write_input(self, records: List[Any], name: str = "input.jsonl") -> str:
+        """Write records as JSONL lines, passing strings through unchanged."""
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            for record in records:
+                f.write((record if isinstance(record, str) else json.dumps(record)) + "\n")
+        return path
+
+    def read_output(self, name: str) -> List[Dict[str, Any]]:
+        """Read a JSONL output file."""
+        with open(os.path.join(self.directory, name)) as f:
+            return [json.loads(line) for line in f]
+
+    def run_cli(self, *arguments: str) -> Dict[str, Any]:
+        """Run the CLI on the fixture records and return the run summary."""
+        args = build_parser().parse_args(
+            [
+                self.write_input(self.records),
+                "--output",
+                os.path.join(self.directory, "results.jsonl"),
+                "--aggregates",
+                os.path.join(self.directory, "aggregates.jsonl"),
+                *arguments,
+            ]
+        )
+        return run(args)
+
+    def test_results_and_aggregates(self) -> None:
+        """Test that every record is evaluated and averaged per model and complexity."""
+        summary = self.run_cli("--chunk-size", "2")
+
+        results = self.read_output("results.jsonl")
+        self.assertEqual(summary["total"], 6)
+        self.assertEqual([result["query_id"] for result in results], ["0", "1", "2"] * 2)
+
+        aggregates = {
+            (row["model"], row["complexity"]): row for row in self.read_output("aggregates.jsonl")
+        }
+        self.assertEqual(
+            set(aggregates),
+            {("base", "all"), ("base", "simple"), ("tuned", "all"), ("tuned", "simple")},
+        )
+        self.assertEqual(aggregates[("tuned", "all")]["exact_match_accuracy_mean"], 1.0)
+        self.assertEqual(aggregates[("base", "all")]["exact_match_accuracy_mean"], 0.0)
+        self.assertEqual(aggregates[("base", "simple")]["inference_latency_mean"], 200.0)
+
+    def test_parallel_workers_keep_input_order(self) -> None:
+        """Test that results of a process pool run match a sequential run in order."""
+        self.run_cli("--chunk-size", "1")
+        sequential = self.read_output("results.jsonl")
+        self.run_cli("--chunk-size", "1", "--workers", "2")
+        parallel = self.read_output("results.jsonl")
+
+        for expected, actual in zip(sequential, parallel):
+            expected.pop("evaluation_time")
+            actual.pop("evaluation_time")
+        self.assertEqual(parallel, sequential)
+
+    def test_memoized_rerun(self) -> None:
+        """Test that a rerun with a memo file reproduces the results of the first run."""
+        memo = os.path.join(self.directory, "memo.sqlite")
+        self.run_cli("--memo", memo, "--workers", "2", "--chunk-size", "2")
+        first = self.read_output("results.jsonl")
+        self.run_cli("--memo", memo)
+        rerun = self.read_output("results.jsonl")
+
+        for expected, actual in zip(first, rerun):
+            expected.pop("evaluation_time")
+            actual.pop("evaluation_time")
+        self.assertEqual(rerun, first)
+        self.assertTrue(os.path.exists(memo))
+
+    def test_invalid_records(self) -> None:
+        """Test that invalid lines are skipped and incomplete records are reported."""
+        path = self.write_input(
+            ['{"model": "base"', "[1, 2]", {"model": "base", "query_id": 1, "generated": "x"}]
+        )
+        args = build_parser().parse_args([path, "--output", path + ".out"])
+
+        summary = run(args)
+
+        self.assertEqual((summary["total"], summary["failed"], summary["invalid"]), (1, 1, 2))
+        with open(path + ".out") as f:
+            self.assertIn("missing", json.loads(f.readline())["error"])
+
+    def test_main_prints_summary(self) -> None:
+        """Test that the entry point prints the overall aggregates of each model."""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main([self.write_input(self.records)])
+
+        self.assertIn("Evaluated 6 records", output.getvalue())
+        self.assertIn("tuned", output.getvalue())
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_round_trip(self) -> None:
+        """Test that Parquet input is streamed and Parquet results are written."""
+        import pyarrow
+        import pyarrow.parquet
+
+        path = os.path.join(self.directory, "input.parquet")
+        records = [{**record, "query_id": str(record["query_id"])} for record in self.records]
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(records), path)
+        output = os.path.join(self.directory, "results.parquet")
+
+        summary = run(build_parser().parse_args([path, "--output", output]))
+
+        self.assertEqual(summary["total"], 6)
+        self.assertEqual(pyarrow.parquet.read_table(output).num_rows, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Tests for result set comparison."""
+
+import unittest
+from unittest import mock
+
+from sql_metrics_evaluator.src.comparison import (
+    ResultSet,
+    ResultSetBuilder,
+    compare_result_sets,
+)
+from sql_metrics_evaluator.src.database import DatabaseExecutor
+
+
+class TestCompareResultSets(unittest.TestCase):
+    """Test cases for comparing result sets."""
+
+    def test_aliased_columns_match(self) -> None:
+        """Test that columns are compared by position rather than by name."""
+        match, details = compare_result_sets(
+            ResultSet(["total"], [(1,), (2,)]), ResultSet(["count"], [(2,), (1,)])
+        )
+
+        self.assertTrue(match)
+        self.assertEqual(details["row_count"], 2)
+
+    def test_reordered_columns_match(self) -> None:
+        """Test that the same columns selected in a different order still match."""
+        match, details = compare_result_sets(
+            ResultSet(["id", "name"], [(1, "a"), (2, "b")]),
+            ResultSet(["name", "id"], [("b", 2), ("a", 1)]),
+        )
+
+        self.assertTrue(match)
+        self.assertTrue(details["columns_reordered"])
+
+    def test_duplicates_compared_as_multiset(self) -> None:
+        """Test that duplicate rows must occur the same number of times."""
+        match, _ = compare_result_sets(
+            ResultSet(["id"], [(1,), (1,), (2,)]), ResultSet(["id"], [(1,), (2,), (2,)])
+        )
+
+        self.assertFalse(match)
+
+    def test_shape_mismatch_exits_early(self) -> None:
+        """Test that column and row count mismatches are reported."""
+        match, details = compare_result_sets(
+            ResultSet(["id"], [(1,)]), ResultSet(["id", "name"], [(1, "a")])
+        )
+        self.assertFalse(match)
+        self.assertFalse(details["column_count_match"])
+
+        match, details = compare_result_sets(
+            ResultSet(["id"], [(1,)]), ResultSet(["id"], [(1,), (2,)])
+        )
+        self.assertFalse(match)
+        self.assertFalse(details["row_count_match"])
+        self.assertEqual(details["row_count2"], 2)
+
+    def test_ordered_comparison(self) -> None:
+        """Test that ordered comparison also requires the same row order."""
+        result1 = ResultSet(["id"], [(1,), (2,)])
+        result2 = ResultSet(["id"], [(2,), (1,)])
+
+        self.assertTrue(compare_result_sets(result1, result2)[0])
+        self.assertFalse(compare_result_sets(result1, result2, ordered=True)[0])
+
+    def test_unhashable_values(self) -> None:
+        """Test that rows with unhashable values can still be compared."""
+        match, _ = compare_result_sets(
+            ResultSet(["tags"], [(["a", "b"],), ({"k": 1},)]),
+            ResultSet(["tags"], [({"k": 1},), (["a", "b"],)]),
+        )
+
+        self.assertTrue(match)
+
+
+class TestSpilledResultSets(unittest.TestCase):
+    """Test cases for result sets spilled to disk."""
+
+    def build(self, rows: list, memory_budget_bytes: int = 1024) -> ResultSet:
+        """Build a result set from rows fetched in chunks of 100."""
+        builder = ResultSetBuilder(["id", "name"], memory_budget_bytes)
+        for start in range(0, len(rows), 100):
+            builder.add_rows(rows[start:start + 100])
+        return builder.build()
+
+    def test_rows_spill_over_budget(self) -> None:
+        """Test that rows are moved to disk once the memory budget is exceeded."""
+        rows = [(index, f"user{index}") for index in range(2500)]
+        result = self.build(rows)
+
+        self.assertTrue(result.spilled)
+        self.assertEqual(result.rows, [])
+        self.assertEqual(result.row_count, 2500)
+        self.assertGreater(result.byte_count, 1024)
+        self.assertEqual(list(result.iter_rows()), rows)
+        self.assertFalse(self.build(rows[:1], memory_budget_bytes=None).spilled)
+        result.close()
+
+    def test_spilled_comparison(self) -> None:
+        """Test that spilled results are compared through hash partitions."""
+        rows = [(index % 700, f"user{index % 700}") for index in range(2500)]
+        result1 = self.build(rows)
+        result2 = self.build(list(reversed(rows)), memory_budget_bytes=None)
+        changed = self.build(rows[:-1] + [(0, "user0")])
+
+        self.assertTrue(compare_result_sets(result1, result2, memory_budget_bytes=1024)[0])
+        self.assertFalse(compare_result_sets(result1, changed, memory_budget_bytes=1024)[0])
+        self.assertFalse(compare_result_sets(result1, result2, ordered=True)[0])
+
+    def test_spilled_reordered_columns(self) -> None:
+        """Test that reordered columns are matched for spilled results."""
+        rows = [(index, f"user{index}") for index in range(2500)]
+        result1 = self.build(rows)
+        result2 = ResultSet(["name", "id"], [(name, index) for index, name in rows])
+
+        match, details = compare_result_sets(result1, result2, memory_budget_bytes=1024)
+
+        self.assertTrue(match)
+        self.assertTrue(details["columns_reordered"])
+
+
+class TestExecutorComparison(unittest.TestCase):
+    """Test cases for comparing query results through the database executor."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.executor = DatabaseExecutor("sqlite://")
+        self.results = {
+            "SELECT id AS user_id FROM users": ResultSet(["user_id"], [(1,), (2,)]),
+            "SELECT id FROM users ORDER BY id DESC": ResultSet(["id"], [(2,), (1,)]),
+        }
+
+    def tearDown(self) -> None:
+        """Tear down test fixtures."""
+        self.executor.close()
+
+    def compare(self, ordered: bool = False) -> tuple:
+        """Compare the two test queries with mocked execution."""
+        with mock.patch.object(
+            self.executor,
+            "fetch_result_set",
+            side_effect=lambda query, **kwargs: (True, self.results[query], 1.0),
+        ):
+            return self.executor.compare_query_results(*self.results, ordered=ordered)
+
+    def test_aliased_query_results_match(self) -> None:
+        """Test that an aliased query matches the reference query results."""
+        match, comparison = self.compare()
+
+        self.assertTrue(match)
+        self.assertTrue(comparison["result_match"])
+        self.assertEqual(comparison["row_count"], 2)
+        self.assertEqual(comparison["query1_rows"], 2)
+        self.assertFalse(comparison["query1_spilled"])
+
+    def test_ordered_query_results(self) -> None:
+        """Test that ordered comparison detects a different row order."""
+        match, comparison = self.compare(ordered=True)
+
+        self.assertFalse(match)
+        self.assertTrue(comparison["ordered"])
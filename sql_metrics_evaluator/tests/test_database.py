@@ -0,0 +1,338 @@
+"""Tests for the database executor."""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from typing import Any, Optional
+from unittest import mock
+
+from sqlalchemy.exc import DBAPIError
+
+from sql_metrics_evaluator.src.comparison import ResultSet
+from sql_metrics_evaluator.src.database import (
+    QUERY_CANCELLED_MESSAGE,
+    DatabaseExecutor,
+    ExecutionOutcome,
+    QueryHandle,
+)
+
+
+class TestReferenceCache(unittest.TestCase):
+    """Test cases for the reference result cache."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.executor = DatabaseExecutor(
+            "sqlite://", reference_cache_size=8, database_version="v1"
+        )
+        self.reference = "SELECT id FROM users"
+
+    def test_reference_results_reused(self) -> None:
+        """Test that a reference query is executed once across comparisons."""
+        with mock.patch.object(
+            self.executor, "fetch_result_set", return_value=(True, ResultSet(["id"], [(1,)]), 1.0)
+        ) as fetch_result_set:
+            self.executor.compare_query_results("SELECT users.id FROM users", self.reference)
+            match, comparison = self.executor.compare_query_results(
+                "SELECT id FROM users u", "SELECT id FROM users;\n"
+            )
+
+        self.assertTrue(match)
+        self.assertEqual(fetch_result_set.call_count, 3)
+        self.assertEqual(self.executor.cache_stats()["reference_results"]["hits"], 1)
+
+    def test_literal_whitespace_in_key(self) -> None:
+        """Test that references only differing inside a string literal are cached apart."""
+        with mock.patch.object(
+            self.executor, "fetch_result_set", return_value=(True, ResultSet(["id"], [(1,)]), 1.0)
+        ) as fetch_result_set:
+            self.executor.execute_reference_query("SELECT id FROM users WHERE name = 'a b'")
+            self.executor.execute_reference_query("SELECT id FROM users WHERE name = 'a  b'")
+
+        self.assertEqual(fetch_result_set.call_count, 2)
+
+    def test_invalidation(self) -> None:
+        """Test that invalidating or changing the version drops cached results."""
+        with mock.patch.object(
+            self.executor, "fetch_result_set", return_value=(True, ResultSet(["id"], [(1,)]), 1.0)
+        ) as fetch_result_set:
+            self.executor.execute_reference_query(self.reference)
+            self.executor.invalidate_reference_cache(database_version="v2")
+            self.executor.execute_reference_query(self.reference)
+            self.executor.execute_reference_query(self.reference)
+
+        self.assertEqual(fetch_result_set.call_count, 2)
+        self.assertEqual(self.executor.get_database_version(), "v2")
+
+    def test_failures_not_cached(self) -> None:
+        """Test that failed reference executions are retried."""
+        with mock.patch.object(
+            self.executor, "fetch_result_set", return_value=(False, "SQL error", 1.0)
+        ) as fetch_result_set:
+            self.executor.execute_reference_query(self.reference)
+            self.executor.execute_reference_query(self.reference)
+
+        self.assertEqual(fetch_result_set.call_count, 2)
+
+    def test_unknown_version_not_cached(self) -> None:
+        """Test that results are not cached while the database version is unknown."""
+        executor = DatabaseExecutor("sqlite://", reference_cache_size=8)
+        with mock.patch.object(
+            executor, "fetch_result_set", return_value=(True, ResultSet(["id"], [(1,)]), 1.0)
+        ) as fetch_result_set:
+            executor.execute_reference_query(self.reference)
+            executor.execute_reference_query(self.reference)
+
+        self.assertEqual(fetch_result_set.call_count, 2)
+        self.assertEqual(executor.cache_stats()["reference_results"]["size"], 0)
+
+    def test_detected_version_refreshed(self) -> None:
+        """Test that a detected version is detected again once its TTL has passed."""
+        executor = DatabaseExecutor(
+            "sqlite://", reference_cache_size=8, database_version_ttl=60.0
+        )
+        with mock.patch.object(
+            executor, "_detect_database_version", side_effect=["10", "12"]
+        ) as detect_database_version:
+            self.assertEqual(executor.get_database_version(), "10")
+            self.assertEqual(executor.get_database_version(), "10")
+            executor.database_version_ttl = 0.0
+            self.assertEqual(executor.get_database_version(), "12")
+
+        self.assertEqual(detect_database_version.call_count, 2)
+
+
+class TestConcurrentComparison(unittest.TestCase):
+    """Test cases for concurrent query comparison."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.executor = DatabaseExecutor("sqlite://", cancel_on_failure=True)
+
+    def tearDown(self) -> None:
+        """Tear down test fixtures."""
+        self.executor.close()
+
+    @staticmethod
+    def fake_fetch_result_set(
+        query: str, timeout_ms: Optional[int] = None, handle: Optional[QueryHandle] = None
+    ) -> ExecutionOutcome:
+        """Fail "bad" queries immediately and run other queries until cancelled."""
+        if query == "bad":
+            return False, "SQL error", 1.0
+        
+        deadline = time.time() + 0.3
+        while time.time() < deadline:
+            if handle is not None and handle.cancelled:
+                return False, QUERY_CANCELLED_MESSAGE, 1.0
+            time.sleep(0.01)
+        return True, ResultSet(["id"], [(1,)]), 300.0
+
+    def test_queries_run_concurrently(self) -> None:
+        """Test that both queries run at the same time."""
+        start_time = time.time()
+        with mock.patch.object(
+            self.executor, "fetch_result_set", side_effect=self.fake_fetch_result_set
+        ):
+            match, _ = self.executor.compare_query_results("SELECT 1", "SELECT 2")
+
+        self.assertTrue(match)
+        self.assertLess(time.time() - start_time, 0.55)
+
+    def test_cancel_on_failure(self) -> None:
+        """Test that the other query is cancelled once one query fails."""
+        for query1, query2 in [("bad", "SELECT 1"), ("SELECT 1", "bad")]:
+            with mock.patch.object(
+                self.executor, "fetch_result_set", side_effect=self.fake_fetch_result_set
+            ):
+                match, comparison = self.executor.compare_query_results(query1, query2)
+
+            self.assertFalse(match)
+            self.assertFalse(comparison["query1_success"])
+            self.assertFalse(comparison["query2_success"])
+
+    def test_async_cancel_on_failure(self) -> None:
+        """Test that the pending async query is cancelled once the other one fails."""
+        async def fake_afetch_result_set(query: str, **kwargs: Any) -> ExecutionOutcome:
+            if query == "bad":
+                return False, "SQL error", 1.0
+            await asyncio.sleep(5)
+            return True, ResultSet(["id"], []), 5000.0
+
+        start_time = time.time()
+        with mock.patch.object(
+            self.executor, "afetch_result_set", side_effect=fake_afetch_result_set
+        ):
+            match, comparison = asyncio.run(
+                self.executor.acompare_query_results("bad", "SELECT 1")
+            )
+
+        self.assertFalse(match)
+        self.assertFalse(comparison["query2_success"])
+        self.assertLess(time.time() - start_time, 1.0)
+
+
+class TestInDatabaseComparison(unittest.TestCase):
+    """Test cases for comparing query results inside the database."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.executor = DatabaseExecutor("sqlite://", in_database_comparison=True)
+        self.probe_row = (2, 2, 0, 0)
+        self.columns = {"SELECT id, name FROM users": ["id", "name"]}
+        self.queries = []
+        self.timeouts = []
+
+    def tearDown(self) -> None:
+        """Tear down test fixtures."""
+        self.executor.close()
+
+    def fake_fetch_result_set(self, query: str, **kwargs: Any) -> ExecutionOutcome:
+        """Answer the comparison probe, column name queries and plain queries."""
+        self.queries.append(query)
+        self.timeouts.append(kwargs.get("timeout_ms"))
+        if "EXCEPT ALL" in query:
+            if self.probe_row is None:
+                return False, "SQL error", 1.0
+            return True, ResultSet(["a", "b", "c", "d"], [self.probe_row]), 1.0
+        if "LIMIT 0" in query:
+            for subquery, columns in self.columns.items():
+                if subquery in query:
+                    return True, ResultSet(columns, []), 1.0
+            return True, ResultSet(["id", "name"], []), 1.0
+        return True, ResultSet(["id", "name"], [(1, "a"), (2, "b")]), 1.0
+
+    def compare(
+        self,
+        query1: str = "SELECT id, name FROM users",
+        ordered: bool = False,
+        timeout_ms: Optional[int] = None,
+    ) -> tuple:
+        """Compare a query with the reference query as if on PostgreSQL."""
+        dialect = self.executor.engine.dialect
+        with mock.patch.object(dialect, "name", "postgresql"), mock.patch.object(
+            dialect, "server_version_info", (16, 2)
+        ), mock.patch.object(
+            self.executor, "fetch_result_set", side_effect=self.fake_fetch_result_set
+        ):
+            return self.executor.compare_query_results(
+                query1, "SELECT u.id, u.name FROM users u;", ordered=ordered, timeout_ms=timeout_ms
+            )
+
+    def test_match_transfers_counts_only(self) -> None:
+        """Test that matching results are decided by a single statement."""
+        match, comparison = self.compare()
+
+        self.assertTrue(match)
+        self.assertTrue(comparison["in_database"])
+        self.assertEqual(comparison["row_count"], 2)
+        self.assertEqual(len(self.queries), 1)
+        self.assertIn("(SELECT u.id, u.name FROM users u)", self.queries[0])
+
+    def test_mismatch(self) -> None:
+        """Test that differing rows are reported without fetching the results."""
+        self.probe_row = (2, 2, 1, 1)
+
+        match, comparison = self.compare()
+
+        self.assertFalse(match)
+        self.assertEqual(comparison["rows_only_in_query1"], 1)
+        self.assertTrue(all("EXCEPT ALL" in query or "LIMIT 0" in query for query in self.queries))
+
+    def test_probes_share_timeout(self) -> None:
+        """Test that the column name probes run within the execution timeout."""
+        self.probe_row = (2, 2, 1, 1)
+
+        self.compare(timeout_ms=250)
+
+        self.assertEqual(len(self.queries), 3)
+        self.assertEqual(self.timeouts, [250, 250, 250])
+
+    def test_fallbacks(self) -> None:
+        """Test that results are compared client-side when the probe cannot decide."""
+        cases = [
+            # Same columns selected in a different order
+            ((2, 2, 2, 2), {"SELECT id, name FROM users": ["name", "id"]}, {}),
+            # The probe failed, e.g. because of different column types
+            (None, self.columns, {}),
+            # Ordered comparison needs the rows
+            ((2, 2, 0, 0), self.columns, {"ordered": True}),
+            # Not a single SELECT statement
+            ((2, 2, 0, 0), self.columns, {"query1": "SELECT 1; SELECT 2"}),
+        ]
+        for probe_row, columns, kwargs in cases:
+            self.probe_row, self.columns, self.queries = probe_row, columns, []
+
+            _, comparison = self.compare(**kwargs)
+
+            self.assertNotIn("in_database", comparison)
+
+    def test_unsupported_dialect(self) -> None:
+        """Test that dialects without EXCEPT ALL compare results client-side."""
+        with mock.patch.object(
+            self.executor, "fetch_result_set", side_effect=self.fake_fetch_result_set
+        ):
+            match, comparison = self.executor.compare_query_results("SELECT 1", "SELECT 2")
+
+        self.assertTrue(match)
+        self.assertNotIn("in_database", comparison)
+        self.assertFalse(any("EXCEPT ALL" in query for query in self.queries))
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test cases for the pooled connections of the database executor."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("CREATE TABLE users (id INTEGER, name TEXT)")
+            connection.executemany(
+                "INSERT INTO users VALUES (?, ?)", [(index, f"user{index}") for index in range(50)]
+            )
+        self.executor = DatabaseExecutor(f"sqlite:///{self.path}", pool_size=2, max_overflow=1)
+
+    def tearDown(self) -> None:
+        """Tear down test fixtures."""
+        self.executor.close()
+        os.remove(self.path)
+
+    def test_pool_reused_and_reported(self) -> None:
+        """Test that connections are reused across queries and counted."""
+        for _ in range(3):
+            success, rows, _ = self.executor.execute_query("SELECT COUNT(*) AS total FROM users")
+            self.assertTrue(success, rows)
+            self.assertEqual(rows, [{"total": 50}])
+
+        stats = self.executor.pool_stats()["sync"]
+        self.assertEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["checked_out"], 0)
+
+    def test_compare_on_database(self) -> None:
+        """Test that aliased queries compare equal on a real database."""
+        match, comparison = self.executor.compare_query_results(
+            "SELECT u.id AS user_id, u.name FROM users u", "SELECT id, name FROM users"
+        )
+
+        self.assertTrue(match, comparison)
+        self.assertEqual(comparison["row_count"], 50)
+
+    def test_retry_on_invalidated_connection(self) -> None:
+        """Test that a query failing on a stale connection is retried once."""
+        error = DBAPIError("SELECT 1", {}, Exception("server closed the connection"))
+        error.connection_invalidated = True
+        result = self.executor._run_query("SELECT 1", None, 1000, None)
+        with mock.patch.object(
+            self.executor, "_run_query", side_effect=[error, result]
+        ) as patched:
+            success, _, _ = self.executor.fetch_result_set("SELECT 1")
+
+        self.assertTrue(success)
+        self.assertEqual(patched.call_count, 2)
+        self.assertEqual(self.executor.pool_stats()["sync"]["retries"], 1)
@@ -1,10 +1,14 @@
 """Tests for the SQL metrics evaluator."""
 
+import asyncio
 import unittest
 from typing import Dict, Any
+from unittest import mock
 
+from sql_metrics_evaluator.src.comparison import ResultSet
+from sql_metrics_evaluator.src.database import DatabaseExecutor
 from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
-from sql_metrics_evaluator.src.models import QueryComplexity
+from sql_metrics_evaluator.src.models import EvaluationRequest, QueryComplexity
 
 
 class TestSQLMetricsEvaluator(unittest.TestCase):
@@ -143,8 +147,23 @@ class TestSQLMetricsEvaluator(unittest.TestCase):
             query_complexity=QueryComplexity.COMPLEX
         )
         
-        # Should have lower complexity handling score
-        self.assertLess(metrics_incorrect.complexity_handling, 0.8)
+        # Only the aggregations differ, which weigh 0.1 for complex queries
+        self.assertAlmostEqual(metrics_incorrect.complexity_handling, 0.9)
+
+    def test_complexity_weights(self) -> None:
+        """Test that a missing WHERE condition costs its weight at each complexity level."""
+        expected = {
+            QueryComplexity.SIMPLE: 0.8,
+            QueryComplexity.MEDIUM: 0.8,
+            QueryComplexity.COMPLEX: 0.85,
+        }
+        for complexity, score in expected.items():
+            metrics = self.evaluator.evaluate(
+                generated_query="SELECT name, age FROM users",
+                reference_query=self.simple_reference,
+                query_complexity=complexity
+            )
+            self.assertAlmostEqual(metrics.complexity_handling, score)
 
     def test_zero_shot_performance(self) -> None:
         """Test zero-shot performance calculation."""
@@ -181,10 +200,167 @@ class TestSQLMetricsEvaluator(unittest.TestCase):
             database_schema=schema
         )
         
-        # Should have lower zero-shot performance
-        self.assertIsNotNone(metrics.zero_shot_performance)
-        if metrics.zero_shot_performance is not None:
-            self.assertLess(metrics.zero_shot_performance, 0.8)
+        # Partial credit only counts tables and columns, which the incorrect query all reuses
+        self.assertEqual(metrics.logical_form_accuracy, 0.0)
+        self.assertEqual(metrics.zero_shot_performance, 1.0)
+        
+        # Half of the reference columns from another table
+        metrics = self.evaluator.evaluate(
+            generated_query="SELECT name, email FROM customers",
+            reference_query="SELECT name, age FROM orders",
+            database_schema=schema
+        )
+        self.assertAlmostEqual(metrics.zero_shot_performance, 0.25)
+
+    def test_queries_parsed_once_per_evaluation(self) -> None:
+        """Test that each query is normalized and parsed only once per evaluation."""
+        parser = self.evaluator.parser
+        with mock.patch.object(
+            parser, "normalize_query", wraps=parser.normalize_query
+        ) as normalize, mock.patch.object(parser, "_parse", wraps=parser._parse) as parse:
+            self.evaluator.evaluate(
+                generated_query=self.complex_incorrect,
+                reference_query=self.complex_reference,
+                query_complexity=QueryComplexity.COMPLEX,
+                database_schema="Table: customers",
+            )
+        
+        self.assertEqual(normalize.call_count, 2)
+        self.assertEqual(parse.call_count, 2)
+
+    def test_ordered_comparison_reuses_parse(self) -> None:
+        """Test that ordered comparison reads ORDER BY from the reference parsed once."""
+        evaluator = SQLMetricsEvaluator(
+            db_connection_string="sqlite://", parser_cache_size=0, ordered_comparison=True
+        )
+        parser = evaluator.parser
+        with mock.patch.object(parser, "_parse", wraps=parser._parse) as parse, mock.patch.object(
+            evaluator.db_executor,
+            "fetch_result_set",
+            return_value=(True, ResultSet(["name"], [("a",)]), 1.0),
+        ), mock.patch.object(
+            evaluator.db_executor,
+            "compare_query_results",
+            wraps=evaluator.db_executor.compare_query_results,
+        ) as compare_query_results:
+            evaluator.evaluate(self.simple_logical_equivalent, self.simple_reference)
+            evaluator.evaluate(self.simple_reference, self.simple_logical_equivalent)
+        
+        self.assertEqual(parse.call_count, 4)
+        self.assertEqual(
+            [call.kwargs["ordered"] for call in compare_query_results.call_args_list],
+            [False, True],
+        )
+        evaluator.db_executor.close()
+
+
+    def test_queries_executed_once_per_evaluation(self) -> None:
+        """Test that each distinct query is executed only once per evaluation."""
+        self.evaluator.db_executor = DatabaseExecutor("sqlite://")
+        with mock.patch.object(
+            self.evaluator.db_executor,
+            "fetch_result_set",
+            return_value=(True, ResultSet(["name"], [("a",)]), 1.0),
+        ) as fetch_result_set:
+            metrics = self.evaluator.evaluate(
+                generated_query=self.simple_incorrect,
+                reference_query=self.simple_reference,
+                query_complexity=QueryComplexity.SIMPLE,
+                database_schema="Table: users",
+            )
+        
+        self.assertEqual(metrics.execution_accuracy, 1.0)
+        self.assertEqual(fetch_result_set.call_count, 2)
+
+    def test_parallel_batch_matches_sequential(self) -> None:
+        """Test that a parallel batch returns the sequential results in request order."""
+        requests = [
+            EvaluationRequest(
+                generated_query=generated,
+                reference_query=self.complex_reference,
+                query_complexity=QueryComplexity.COMPLEX,
+            )
+            for generated in [
+                self.complex_logical_equivalent,
+                self.complex_incorrect,
+                self.simple_reference,
+                "SELEC broken",
+            ]
+        ]
+        
+        sequential = self.evaluator.evaluate_batch(requests)
+        parallel = self.evaluator.evaluate_batch(requests, max_workers=2)
+        
+        self.assertEqual(
+            [response.generated_query for response in parallel],
+            [request.generated_query for request in requests],
+        )
+        for expected, actual in zip(sequential, parallel):
+            self.assertEqual(
+                expected.metrics.model_dump(exclude={"evaluation_time", "stage_timings"}),
+                actual.metrics.model_dump(exclude={"evaluation_time", "stage_timings"}),
+            )
+
+    def test_batch_isolates_failures(self) -> None:
+        """Test that one failing item does not fail the whole batch."""
+        requests = [
+            EvaluationRequest(generated_query=query, reference_query=self.simple_reference)
+            for query in [self.simple_exact_match, self.simple_incorrect]
+        ]
+        evaluate = self.evaluator.evaluate
+        
+        def failing_evaluate(generated_query: str, **kwargs: Any) -> Any:
+            if generated_query == self.simple_incorrect:
+                raise ValueError("boom")
+            return evaluate(generated_query=generated_query, **kwargs)
+        
+        with mock.patch.object(self.evaluator, "evaluate", side_effect=failing_evaluate):
+            responses = self.evaluator.evaluate_batch(requests)
+        
+        self.assertEqual(responses[0].metrics.exact_match_accuracy, 1.0)
+        self.assertEqual(responses[1].metrics.error_messages, ["Error evaluating query: boom"])
+
+    def test_aevaluate_matches_evaluate(self) -> None:
+        """Test that the async API returns the same metrics as the sync API."""
+        for generated in [self.complex_logical_equivalent, self.complex_incorrect]:
+            expected = self.evaluator.evaluate(
+                generated_query=generated,
+                reference_query=self.complex_reference,
+                query_complexity=QueryComplexity.COMPLEX,
+            )
+            actual = asyncio.run(
+                self.evaluator.aevaluate(
+                    generated_query=generated,
+                    reference_query=self.complex_reference,
+                    query_complexity=QueryComplexity.COMPLEX,
+                )
+            )
+            self.assertEqual(
+                expected.model_dump(exclude={"evaluation_time", "stage_timings"}),
+                actual.model_dump(exclude={"evaluation_time", "stage_timings"}),
+            )
+
+    def test_aevaluate_batch_uses_async_execution(self) -> None:
+        """Test that the async batch API executes queries through the async executor."""
+        self.evaluator.db_executor = DatabaseExecutor("sqlite://")
+        requests = [
+            EvaluationRequest(generated_query=query, reference_query=self.simple_reference)
+            for query in [self.simple_exact_match, self.simple_incorrect]
+        ]
+        
+        with mock.patch.object(
+            self.evaluator.db_executor,
+            "afetch_result_set",
+            new=mock.AsyncMock(return_value=(True, ResultSet(["name"], [("a",)]), 1.0)),
+        ) as afetch_result_set:
+            responses = asyncio.run(self.evaluator.aevaluate_batch(requests, max_concurrency=1))
+        
+        self.assertEqual(
+            [response.generated_query for response in responses],
+            [request.generated_query for request in requests],
+        )
+        self.assertEqual(responses[1].metrics.execution_accuracy, 1.0)
+        self.assertEqual(afetch_result_set.await_count, 3)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""Import-time budget tests."""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+# Repository root, added to the path of the interpreters started by the tests
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Budget for the cumulative import time of the package, in milliseconds
+IMPORT_TIME_BUDGET_MS = 500
+
+# Modules only loaded once an evaluator is created or a query falls back to mo_sql_parsing
+DEFERRED_MODULES = ["sqlglot", "sqlparse", "mo_sql_parsing", "sqlalchemy"]
+
+# Line of the -X importtime report: self time | cumulative time | module
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$")
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter that can import the package.
+
+    Args:
+        code: Python code to run
+        options: Interpreter options
+
+    Returns:
+        Completed process, with captured output
+    """
+    env = {**os.environ, "PYTHONPATH": REPOSITORY_ROOT}
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+
+class TestImportTime(unittest.TestCase):
+    """Test cases for the import time of the package."""
+
+    def test_import_budget(self) -> None:
+        """Test that importing the package stays under the import-time budget."""
+        process = run_python("import sql_metrics_evaluator.src", "-X", "importtime")
+
+        cumulative = {}
+        for line in process.stderr.splitlines():
+            match = IMPORT_TIME_PATTERN.match(line)
+            if match:
+                cumulative[match.group(2)] = int(match.group(1)) / 1000
+
+        self.assertLess(cumulative["sql_metrics_evaluator.src"], IMPORT_TIME_BUDGET_MS)
+
+    def test_heavy_modules_deferred(self) -> None:
+        """Test that the parsers and SQLAlchemy are not loaded by importing the API."""
+        process = run_python(
+            "import json, sys\n"
+            "import sql_metrics_evaluator.src.api\n"
+            "print(json.dumps(sorted(sys.modules)))"
+        )
+        loaded = set(json.loads(process.stdout))
+
+        self.assertEqual([module for module in DEFERRED_MODULES if module in loaded], [])
+
+    def test_mo_sql_parsing_loaded_on_fallback(self) -> None:
+        """Test that mo_sql_parsing is only loaded once sqlglot fails to parse a query."""
+        process = run_python(
+            "import json, sys\n"
+            "from sql_metrics_evaluator.src.parser import SQLParser\n"
+            "parser = SQLParser()\n"
+            "parser.parse_query('SELECT a FROM t')\n"
+            "loaded = 'mo_sql_parsing' in sys.modules\n"
+            "parser.parse_query('SELECT a FROM t WHERE (')\n"
+            "print(json.dumps([loaded, 'mo_sql_parsing' in sys.modules]))"
+        )
+
+        self.assertEqual(json.loads(process.stdout), [False, True])
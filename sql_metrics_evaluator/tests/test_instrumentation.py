@@ -0,0 +1,161 @@
+"""Tests for the per-stage timings and the Prometheus metrics."""
+
+import asyncio
+import unittest
+
+from sql_metrics_evaluator.src import instrumentation
+from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
+from sql_metrics_evaluator.src.instrumentation import (
+    Counter,
+    EvaluationTrace,
+    Histogram,
+    MetricsRegistry,
+    record_event,
+    render_metrics,
+    stage,
+    trace_evaluation,
+)
+from sql_metrics_evaluator.src.models import EvaluationRequest
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for the counters, histograms and their text exposition."""
+
+    def test_counter_render(self) -> None:
+        """Test that labeled counter series are rendered with escaped labels."""
+        counter = Counter("requests_total", "Requests.", ("path",))
+        counter.inc(path="/a")
+        counter.inc(2, path='/"b"')
+
+        self.assertEqual(
+            counter.render(),
+            [
+                "# HELP requests_total Requests.",
+                "# TYPE requests_total counter",
+                'requests_total{path="/\\"b\\""} 2',
+                'requests_total{path="/a"} 1',
+            ],
+        )
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        """Test that bucket counts are cumulative and end with the +Inf bucket."""
+        histogram = Histogram("duration_seconds", "Durations.", buckets=(0.1, 1.0))
+        for value in [0.05, 0.5, 0.5, 20.0]:
+            histogram.observe(value)
+
+        self.assertEqual(
+            histogram.render()[2:],
+            [
+                'duration_seconds_bucket{le="0.1"} 1',
+                'duration_seconds_bucket{le="1"} 3',
+                'duration_seconds_bucket{le="+Inf"} 4',
+                "duration_seconds_sum 21.05",
+                "duration_seconds_count 4",
+            ],
+        )
+
+    def test_registry_renders_unlabeled_counters_at_zero(self) -> None:
+        """Test that counters without observations are still exposed."""
+        registry = MetricsRegistry()
+        registry.counter("failures_total", "Failures.")
+
+        self.assertTrue(registry.render().endswith("failures_total 0\n"))
+
+    def test_cache_counters(self) -> None:
+        """Test that cache statistics are exposed as labeled counters."""
+        text = render_metrics({"parse": {"hits": 3, "misses": 1, "size": 1}})
+
+        self.assertIn('sql_metrics_cache_hits_total{cache="parse"} 3', text)
+        self.assertIn('sql_metrics_cache_misses_total{cache="parse"} 1', text)
+        self.assertNotIn("size", text)
+
+
+class TestEvaluationTrace(unittest.TestCase):
+    """Test cases for the stage timings of an evaluation."""
+
+    def test_nested_stages_are_exclusive(self) -> None:
+        """Test that time spent in a nested stage is not attributed to the outer stage."""
+        with trace_evaluation() as trace:
+            with stage("outer"):
+                with stage("inner"):
+                    sum(range(100000))
+
+        self.assertEqual(set(trace.stages), {"outer", "inner"})
+        self.assertLess(trace.stages["outer"], trace.stages["inner"])
+
+    def test_events_are_recorded_with_the_evaluation(self) -> None:
+        """Test that events are only added to the registry once the trace is recorded."""
+        before = instrumentation.FALLBACK_PARSES.value()
+
+        with trace_evaluation() as trace:
+            record_event("fallback_parse")
+        self.assertEqual(instrumentation.FALLBACK_PARSES.value(), before)
+
+        trace.record(0.01)
+        self.assertEqual(instrumentation.FALLBACK_PARSES.value(), before + 1)
+
+    def test_trace_is_shared_with_worker_threads(self) -> None:
+        """Test that stages timed in asyncio.to_thread belong to the calling evaluation."""
+
+        def work() -> None:
+            with stage("threaded"):
+                pass
+
+        async def evaluate() -> EvaluationTrace:
+            with trace_evaluation() as trace:
+                await asyncio.to_thread(work)
+            return trace
+
+        self.assertIn("threaded", asyncio.run(evaluate()).stages)
+
+
+class TestEvaluatorInstrumentation(unittest.TestCase):
+    """Test cases for the timings and counters recorded by the evaluator."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.evaluator = SQLMetricsEvaluator()
+        self.reference = "SELECT name FROM users WHERE age > 18"
+
+    def test_evaluate_reports_stage_timings(self) -> None:
+        """Test that evaluate reports the time spent in each stage."""
+        before = instrumentation.EVALUATIONS.value()
+
+        metrics = self.evaluator.evaluate("SELECT name FROM users", self.reference)
+
+        self.assertTrue(
+            {"normalize", "parse", "canonicalize", "static_analysis"}
+            <= set(metrics.stage_timings)
+        )
+        self.assertTrue(all(value >= 0 for value in metrics.stage_timings.values()))
+        self.assertLessEqual(sum(metrics.stage_timings.values()), metrics.evaluation_time)
+        self.assertEqual(instrumentation.EVALUATIONS.value(), before + 1)
+
+    def test_parse_failures_are_counted(self) -> None:
+        """Test that queries neither parser reads are counted as parse failures."""
+        failures = instrumentation.PARSE_FAILURES.value()
+
+        metrics = self.evaluator.evaluate("SELEC broken (", self.reference)
+
+        self.assertEqual(instrumentation.PARSE_FAILURES.value(), failures + 1)
+        self.assertIn("fallback_parse", metrics.stage_timings)
+
+    def test_parallel_batch_reports_worker_timings(self) -> None:
+        """Test that the stage timings of process pool workers reach the parent process."""
+        requests = [
+            EvaluationRequest(generated_query=query, reference_query=self.reference)
+            for query in ["SELECT name FROM users", "SELECT email FROM users"]
+        ]
+        count = instrumentation.STAGE_DURATION.count(stage="static_analysis")
+
+        responses = self.evaluator.evaluate_batch(requests, max_workers=2)
+
+        for response in responses:
+            self.assertIn("parse", response.metrics.stage_timings)
+        self.assertEqual(
+            instrumentation.STAGE_DURATION.count(stage="static_analysis"), count + 2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
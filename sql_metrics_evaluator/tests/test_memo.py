@@ -0,0 +1,210 @@
+"""Tests for memoization of whole evaluation results."""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sql_metrics_evaluator.src.cache import SQLiteCache
+from sql_metrics_evaluator.src.evaluator import TRANSIENT_ERROR_PATTERN, SQLMetricsEvaluator
+from sql_metrics_evaluator.src.models import EvaluationRequest
+
+
+class TestSQLiteCache(unittest.TestCase):
+    """Test cases for the SQLite cache."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "memo.sqlite")
+
+    def test_entries_shared_across_instances(self) -> None:
+        """Test that entries stored by one instance are found by a later one."""
+        SQLiteCache(self.path).put("key", "value")
+
+        cache = SQLiteCache(self.path)
+
+        self.assertEqual(cache.get("key"), "value")
+        self.assertIsNone(cache.get("other"))
+        self.assertIn("key", cache)
+        self.assertEqual(
+            {name: cache.stats()[name] for name in ("hits", "misses", "size")},
+            {"hits": 1, "misses": 1, "size": 1},
+        )
+
+    def test_invalidation(self) -> None:
+        """Test that invalidating removes a single entry or every entry."""
+        cache = SQLiteCache(self.path)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.put("b", "3")
+
+        cache.invalidate("a")
+        self.assertEqual((len(cache), cache.get("b")), (1, "3"))
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_evicted(self) -> None:
+        """Test that the least recently used entries are evicted once the cache is full."""
+        cache = SQLiteCache(self.path, max_size=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        cache.put("a", "4")
+
+        self.assertNotIn("b", cache)
+        self.assertEqual((cache.get("a"), cache.get("c")), ("4", "3"))
+        self.assertEqual(
+            {name: cache.stats()[name] for name in ("evictions", "size", "max_size")},
+            {"evictions": 1, "size": 2, "max_size": 2},
+        )
+        self.assertEqual(len(SQLiteCache(self.path, max_size=2)), 2)
+
+
+class TestEvaluatorMemo(unittest.TestCase):
+    """Test cases for memoized evaluations."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.generated = "SELECT name FROM users"
+        self.reference = "SELECT name FROM users WHERE age > 18"
+
+    def test_memoized_result_reused(self) -> None:
+        """Test that repeated inputs, up to normalization, skip the evaluation."""
+        evaluator = SQLMetricsEvaluator(memo_size=16)
+        first = evaluator.evaluate(self.generated, self.reference, "simple", inference_latency=5)
+
+        with mock.patch.object(evaluator, "_evaluate_static") as evaluate_static:
+            second = evaluator.evaluate(
+                "select  name\nFROM users -- same query", self.reference, "simple", 7
+            )
+
+        evaluate_static.assert_not_called()
+        self.assertEqual(second.inference_latency, 7)
+        self.assertIn("memo", second.stage_timings)
+        excluded = {"inference_latency", "evaluation_time", "stage_timings"}
+        self.assertEqual(second.model_dump(exclude=excluded), first.model_dump(exclude=excluded))
+        self.assertEqual(evaluator.cache_stats()["memo"]["hits"], 1)
+
+    def test_inputs_and_settings_in_key(self) -> None:
+        """Test that another complexity, schema or evaluator setting is evaluated again."""
+        evaluator = SQLMetricsEvaluator(memo_size=16)
+        evaluator.evaluate(self.generated, self.reference, "simple")
+        evaluator.evaluate(self.generated, self.reference, "complex")
+        evaluator.evaluate(self.generated, self.reference, "simple", database_schema="users(name)")
+
+        self.assertEqual(evaluator.cache_stats()["memo"]["hits"], 0)
+        self.assertNotEqual(
+            list(evaluator._memo_keys(self.generated, self.reference, "simple", None, None)),
+            list(
+                SQLMetricsEvaluator(ordered_comparison=True)._memo_keys(
+                    self.generated, self.reference, "simple", None, None
+                )
+            ),
+        )
+
+    def test_disk_memo_survives_restart(self) -> None:
+        """Test that results memoized on disk are reused by a new evaluator."""
+        path = os.path.join(self.directory, "memo.sqlite")
+        SQLMetricsEvaluator(memo_path=path).evaluate(self.generated, self.reference)
+
+        evaluator = SQLMetricsEvaluator(memo_path=path)
+        with mock.patch.object(evaluator, "_evaluate_static") as evaluate_static:
+            metrics = evaluator.evaluate(self.generated, self.reference)
+
+        evaluate_static.assert_not_called()
+        self.assertEqual(metrics.logical_form_accuracy, 0.0)
+
+    def test_timeouts_not_memoized(self) -> None:
+        """Test that results of queries that timed out are evaluated again."""
+        evaluator = SQLMetricsEvaluator(
+            db_connection_string=f"sqlite:///{self.directory}/data.db",
+            database_version="v1",
+            memo_size=16,
+        )
+        comparison = {
+            "query1_success": False,
+            "query2_success": True,
+            "both_succeeded": False,
+            "error": "Query 1 failed: Query execution timed out after 5000ms",
+        }
+        with mock.patch.object(
+            evaluator.db_executor, "compare_query_results", return_value=(False, comparison)
+        ) as compare_query_results:
+            evaluator.evaluate(self.generated, self.reference)
+            evaluator.evaluate(self.generated, self.reference)
+
+        self.assertEqual(compare_query_results.call_count, 2)
+        self.assertEqual(len(evaluator._memo), 0)
+        evaluator.db_executor.close()
+
+    def test_transient_errors(self) -> None:
+        """Test that only timeouts and connection failures count as transient errors."""
+        transient = [
+            "Query execution timed out after 5000ms",
+            'connection to server at "db" failed: Connection refused',
+            "server closed the connection unexpectedly",
+            "(2013, 'Lost connection to MySQL server during query')",
+        ]
+        persistent = [
+            'password authentication failed for user "eval"',
+            "no such column: disconnected_at",
+            "relation \"connections\" does not exist",
+        ]
+
+        for error in transient:
+            self.assertIsNotNone(TRANSIENT_ERROR_PATTERN.search(error), error)
+        for error in persistent:
+            self.assertIsNone(TRANSIENT_ERROR_PATTERN.search(error), error)
+
+    def test_executed_queries_keyed_by_exact_text(self) -> None:
+        """Test that executed evaluations are only shared by identical queries."""
+        evaluator = SQLMetricsEvaluator(
+            db_connection_string=f"sqlite:///{self.directory}/data.db",
+            database_version="v1",
+            memo_size=16,
+        )
+        evaluator.evaluate("SELECT 'a  b' AS value", "SELECT 'a b' AS value")
+        metrics = evaluator.evaluate("SELECT 'a b' AS value", "SELECT 'a b' AS value")
+
+        self.assertEqual(metrics.execution_accuracy, 1.0)
+        self.assertEqual(evaluator.cache_stats()["memo"]["hits"], 0)
+        self.assertEqual(len(evaluator._memo), 2)
+
+        # Other databases have no version unless one is set
+        evaluator.db_executor.invalidate_reference_cache()
+        self.assertEqual(
+            list(evaluator._memo_keys(self.generated, self.reference, "simple", None, None)), []
+        )
+        evaluator.db_executor.close()
+
+    def test_async_and_batch_evaluations(self) -> None:
+        """Test that async and process pool evaluations share the memo."""
+        evaluator = SQLMetricsEvaluator(memo_size=16)
+        asyncio.run(evaluator.aevaluate(self.generated, self.reference))
+        requests = [
+            EvaluationRequest(generated_query=generated, reference_query=self.reference)
+            for generated in (self.generated, self.reference)
+        ]
+
+        responses = evaluator.evaluate_batch(requests, max_workers=2)
+        repeated = evaluator.evaluate_batch(requests, max_workers=2)
+
+        self.assertEqual(
+            [response.metrics.exact_match_accuracy for response in repeated], [0.0, 1.0]
+        )
+        self.assertEqual(
+            [response.metrics.parsing_details for response in repeated],
+            [response.metrics.parsing_details for response in responses],
+        )
+        self.assertEqual(evaluator.cache_stats()["memo"]["hits"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+"""Tests for the SQL parser."""
+
+import pickle
+import re
+import sys
+import unittest
+
+import sqlglot
+import sqlparse
+
+from sql_metrics_evaluator.src.cache import LRUCache
+from sql_metrics_evaluator.src.parsed_query import ParsedQuery
+from sql_metrics_evaluator.src.parser import SQLParser
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test cases for the LRU cache."""
+
+    def test_eviction_and_stats(self) -> None:
+        """Test that the least recently used entry is evicted and counted."""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+
+        cache.put("c", 3)
+
+        self.assertNotIn("b", cache)
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["size"], 2)
+
+
+class TestSQLParserCache(unittest.TestCase):
+    """Test cases for the SQL parser cache."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.parser = SQLParser(cache_size=16)
+        self.query = "SELECT name FROM users WHERE age > 18"
+
+    def test_cache_hits(self) -> None:
+        """Test that repeated queries are served from the cache."""
+        first = self.parser.parse_query(self.query)
+        second = self.parser.parse_query(self.query)
+
+        self.assertIs(first, second)
+        stats = self.parser.cache_stats()
+        self.assertEqual(stats["parse"]["hits"], 1)
+        self.assertEqual(stats["parse"]["misses"], 1)
+        self.assertEqual(stats["normalize"]["hits"], 1)
+
+    def test_cached_results_are_immutable(self) -> None:
+        """Test that a shared cache entry cannot be modified by a caller."""
+        parsed = self.parser.parse_query(self.query)
+
+        with self.assertRaises(TypeError):
+            parsed["tables"] = set()  # type: ignore[index]
+        with self.assertRaises(AttributeError):
+            parsed["columns"].add("email")
+        self.assertIsNone(parsed["parsed_tree"])
+
+    def test_cache_disabled_by_default(self) -> None:
+        """Test that parsing without a cache returns equal, separate results."""
+        parser = SQLParser()
+        parsed = parser.parse_query(self.query)
+
+        self.assertEqual(parser.cache_stats(), {})
+        self.assertIsNone(parsed["parsed_tree"])
+        self.assertEqual(parsed, parser.parse_query(self.query))
+        self.assertIsNot(parsed, parser.parse_query(self.query))
+
+
+class TestNormalizeQuery(unittest.TestCase):
+    """Test cases for query normalization."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.parser = SQLParser()
+
+    def test_matches_sqlparse_format(self) -> None:
+        """Test that the tokenizer pass matches the sqlparse.format pipeline."""
+        queries = [
+            "select a,b from T1 t join t2 on t.id=t2.id -- note\n where y = 'AbC' order by a",
+            'SELECT  count( * ) , Sum(x) FROM  "MyTable" /* c */ WHERE a IN (1,2, 3)',
+            "select * from a where exists(select 1 from b where b.id=a.id)",
+            "SELECT a::int, `Col` FROM t WHERE d >= CURRENT_DATE - INTERVAL '1  year';",
+            "select a\n,\nb from t group\nby 1,2",
+        ]
+        for query in queries:
+            expected = re.sub(
+                r"\s+",
+                " ",
+                sqlparse.format(
+                    query,
+                    strip_comments=True,
+                    reindent=True,
+                    keyword_case="upper",
+                    identifier_case="lower",
+                    strip_whitespace=True,
+                ),
+            ).strip()
+
+            self.assertEqual(self.parser.normalize_query(query), expected)
+
+    def test_normalized_form(self) -> None:
+        """Test comments, keyword and identifier case, and whitespace handling."""
+        self.assertEqual(
+            self.parser.normalize_query('select A , "B" from T /* c */ where x in ( 1,2 )'),
+            'SELECT a, "B" FROM t WHERE x IN (1, 2)',
+        )
+
+
+class TestComponentExtraction(unittest.TestCase):
+    """Test cases for single-pass component extraction."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.parser = SQLParser()
+
+    def test_nested_scopes(self) -> None:
+        """Test that CTEs and subqueries are walked like the outer query."""
+        parsed = self.parser.parse_query(
+            "WITH recent AS (SELECT customer_id FROM orders WHERE total > 10) "
+            "SELECT c.name FROM customers c JOIN recent r ON c.id = r.customer_id "
+            "WHERE c.id IN (SELECT customer_id FROM payments WHERE amount < 5) LIMIT 3"
+        )
+
+        self.assertEqual(parsed["tables"], {"orders", "customers", "payments"})
+        self.assertEqual(parsed["columns"], {"customer_id", "total", "name", "id", "amount"})
+        self.assertEqual(parsed["ctes"], ("recent",))
+        self.assertEqual(
+            parsed["joins"],
+            ({"type": "JOIN", "table": "recent", "condition": "c.id = r.customer_id"},),
+        )
+        self.assertEqual(
+            parsed["where_conditions"],
+            (
+                "c.id IN (SELECT customer_id FROM payments WHERE amount < 5)",
+                "amount < 5",
+                "total > 10",
+            ),
+        )
+        self.assertEqual(parsed["limit"], 3)
+        self.assertEqual(parsed["references"]["derived"], {"recent", "r"})
+
+    def test_having_and_window_functions(self) -> None:
+        """Test that HAVING conditions and window functions are extracted."""
+        parsed = self.parser.parse_query(
+            "SELECT dept, SUM(salary), RANK() OVER (ORDER BY SUM(salary) DESC) FROM emp "
+            "GROUP BY dept HAVING COUNT(*) > 2 ORDER BY dept"
+        )
+
+        self.assertEqual(parsed["having_conditions"], ("COUNT(*) > 2",))
+        self.assertEqual(parsed["group_by"], ("dept",))
+        self.assertEqual(parsed["order_by"], ({"column": "dept", "direction": "ASC"},))
+        self.assertEqual(parsed["aggregations"], {"SUM(salary)", "COUNT(*)"})
+        self.assertEqual(
+            parsed["window_functions"], ("RANK() OVER (ORDER BY SUM(salary) DESC)",)
+        )
+
+    def test_deeply_nested_query(self) -> None:
+        """Test that deeply nested queries do not hit the recursion limit."""
+        query = "SELECT a FROM t WHERE " + " AND ".join(f"c{i} = {i}" for i in range(2000))
+
+        parsed = self.parser.parse_query(query)
+
+        self.assertTrue(parsed["success"])
+        self.assertEqual(len(parsed["where_conditions"]), 2000)
+
+
+class TestParsedQuery(unittest.TestCase):
+    """Test cases for the compact parsed query representation."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.query = (
+            "SELECT c.name, COUNT(*) FROM customers c JOIN orders o ON c.id = o.customer_id "
+            "GROUP BY c.name ORDER BY c.name DESC"
+        )
+
+    def test_compact_and_immutable(self) -> None:
+        """Test that components are stored in slots as immutable, interned values."""
+        parsed = SQLParser().parse_query(self.query)
+
+        self.assertIsInstance(parsed, ParsedQuery)
+        self.assertFalse(hasattr(parsed, "__dict__"))
+        self.assertEqual(parsed.tables, frozenset({"customers", "orders"}))
+        self.assertIs(next(iter(parsed.tables & {"orders"})), sys.intern("orders"))
+        self.assertEqual(parsed.joins, (("JOIN", "orders", "c.id = o.customer_id"),))
+        with self.assertRaises(AttributeError):
+            parsed.tables = frozenset()  # type: ignore[misc]
+
+    def test_tree_kept_on_request(self) -> None:
+        """Test that the parsed tree is only kept when requested."""
+        parsed = SQLParser(cache_size=8, keep_tree=True).parse_query(self.query)
+
+        self.assertEqual(parsed["parsed_tree"].sql(), sqlglot.parse_one(self.query).sql())
+
+    def test_dict_view(self) -> None:
+        """Test that the dict view matches the former parse result dictionary."""
+        parsed = SQLParser().parse_query(self.query)
+        result = parsed.to_dict()
+
+        self.assertEqual(set(result), set(parsed.keys()))
+        self.assertEqual(result["columns"], {"name", "id", "customer_id"})
+        self.assertEqual(result["order_by"], [{"column": "c.name", "direction": "DESC"}])
+        self.assertEqual(result["references"]["tables"], {"c": "customers", "o": "orders"})
+        self.assertEqual(
+            result["references"]["joins"], [(("c", "id"), ("o", "customer_id"))]
+        )
+        result["tables"].add("products")
+        self.assertNotIn("products", parsed["tables"])
+
+    def test_pickle(self) -> None:
+        """Test that parsed queries survive pickling, e.g. to process pool workers."""
+        parsed = SQLParser().parse_query(self.query)
+
+        self.assertEqual(pickle.loads(pickle.dumps(parsed)), parsed)
@@ -0,0 +1,91 @@
+"""Tests for the per-request profiling hook."""
+
+import asyncio
+import os
+import pstats
+import tempfile
+import unittest
+
+from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
+from sql_metrics_evaluator.src.profiling import RequestProfiler
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """Test cases for the request profiler."""
+
+    def test_report_lists_hot_functions(self) -> None:
+        """Test that a profiled call reports its result and its hottest functions."""
+        profiler = RequestProfiler(top_n=3)
+
+        result, report = profiler.run(sorted, range(1000), reverse=True)
+
+        self.assertEqual(result[0], 999)
+        self.assertLessEqual(len(report["functions"]), 3)
+        self.assertIsNone(report["path"])
+        self.assertTrue(any("sorted" in item["function"] for item in report["functions"]))
+
+    def test_nested_call_is_not_profiled(self) -> None:
+        """Test that a call made while another one is profiled runs without profiling."""
+        profiler = RequestProfiler()
+
+        (_, inner_report), outer_report = profiler.run(profiler.run, len, "query")
+
+        self.assertIsNone(inner_report)
+        self.assertIsNotNone(outer_report)
+
+    def test_profile_saved_to_directory(self) -> None:
+        """Test that raw profiles are saved for pstats when a directory is configured."""
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = RequestProfiler(output_dir=directory)
+
+            _, report = profiler.run(sum, range(10))
+
+            self.assertEqual(os.path.dirname(report["path"]), directory)
+            self.assertGreater(pstats.Stats(report["path"]).total_calls, 0)
+
+    def test_sampling(self) -> None:
+        """Test that requested calls are always profiled and others by sample rate."""
+        self.assertTrue(RequestProfiler().should_profile(requested=True))
+        self.assertFalse(RequestProfiler(sample_rate=0.0).should_profile())
+        self.assertTrue(RequestProfiler(sample_rate=1.0).should_profile())
+        with self.assertRaises(ValueError):
+            RequestProfiler(sample_rate=1.5)
+
+
+class TestEvaluatorProfiling(unittest.TestCase):
+    """Test cases for profiling evaluations."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.generated = "SELECT name FROM users"
+        self.reference = "SELECT name FROM users WHERE age > 18"
+
+    def test_evaluate_with_profile(self) -> None:
+        """Test that a requested profile is attached to the metrics."""
+        evaluator = SQLMetricsEvaluator(profiling=True)
+
+        metrics = evaluator.evaluate(self.generated, self.reference, profile=True)
+
+        self.assertGreater(metrics.profile["duration_ms"], 0)
+        self.assertTrue(
+            any("_evaluate_static" in item["function"] for item in metrics.profile["functions"])
+        )
+
+    def test_profiling_disabled_by_default(self) -> None:
+        """Test that profiles are only taken when profiling is enabled."""
+        metrics = SQLMetricsEvaluator().evaluate(self.generated, self.reference, profile=True)
+
+        self.assertIsNone(metrics.profile)
+
+    def test_sampled_async_evaluation(self) -> None:
+        """Test that sampled async evaluations are profiled in a worker thread."""
+        evaluator = SQLMetricsEvaluator(profiling=True, profile_sample_rate=1.0)
+
+        metrics = asyncio.run(evaluator.aevaluate(self.generated, self.reference))
+
+        self.assertIsNotNone(metrics.profile)
+        self.assertEqual(metrics.logical_form_accuracy, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
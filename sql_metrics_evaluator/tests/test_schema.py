@@ -0,0 +1,196 @@
+"""Tests for the database schema model and introspection."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from sql_metrics_evaluator.src.database import DatabaseExecutor
+from sql_metrics_evaluator.src.evaluator import SQLMetricsEvaluator
+from sql_metrics_evaluator.src.parser import SQLParser
+from sql_metrics_evaluator.src.schema import DatabaseSchema, parse_schema_text
+
+
+class TestDatabaseSchema(unittest.TestCase):
+    """Test cases for the indexed schema model."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.schema = DatabaseSchema.from_rows(
+            [
+                ("public", "users", "BASE TABLE", "id", "integer", "NO"),
+                ("public", "users", "BASE TABLE", "name", "text", "YES"),
+                ("sales", "users", "BASE TABLE", "region", "text", "YES"),
+                ("public", "empty", "VIEW", None, None, None),
+            ]
+        )
+
+    def test_lookups(self) -> None:
+        """Test that tables and columns are found by name, case and quotes ignored."""
+        users = self.schema.get_table('"Users"')
+
+        self.assertIsNotNone(users)
+        self.assertEqual(users.qualified_name, "public.users")
+        self.assertFalse(users.get_column("ID").is_nullable)
+        self.assertIsNone(users.get_column("region"))
+        self.assertIsNotNone(self.schema.get_table("sales.users").get_column("region"))
+        self.assertFalse(self.schema.has_table("orders"))
+
+    def test_info_format(self) -> None:
+        """Test conversion into the get_schema_info dictionary."""
+        info = self.schema.to_info()
+
+        self.assertEqual(len(info["tables"]), 2)
+        self.assertEqual(info["views"], [{"name": "empty", "schema": "public", "columns": []}])
+        self.assertEqual(info["tables"][0]["columns"][1]["is_nullable"], "YES")
+
+
+class TestSchemaIntrospection(unittest.TestCase):
+    """Test cases for cached schema introspection."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("CREATE TABLE users (id INTEGER NOT NULL, name TEXT)")
+            connection.execute("CREATE VIEW adults AS SELECT id FROM users")
+            connection.execute(
+                "CREATE TABLE orders (id INTEGER, user_id INTEGER REFERENCES users (id))"
+            )
+        self.executor = DatabaseExecutor(f"sqlite:///{self.path}", schema_ttl=60)
+
+    def tearDown(self) -> None:
+        """Tear down test fixtures."""
+        self.executor.close()
+        os.remove(self.path)
+
+    def test_single_cached_query(self) -> None:
+        """Test that the schema is introspected once and reused until refreshed."""
+        with mock.patch.object(
+            self.executor, "_introspect_schema", wraps=self.executor._introspect_schema
+        ) as introspect:
+            schema = self.executor.get_schema()
+            self.assertIs(self.executor.get_schema(), schema)
+            self.assertEqual(introspect.call_count, 1)
+
+            self.executor.refresh_schema()
+            self.assertEqual(introspect.call_count, 2)
+
+        columns = schema.get_table("users").columns
+        self.assertEqual([column.name for column in columns], ["id", "name"])
+        self.assertTrue(schema.get_table("adults").is_view)
+        self.assertEqual(self.executor.get_schema_info()["views"][0]["name"], "adults")
+        self.assertTrue(
+            schema.has_join_key(
+                schema.get_table("users"), "id", schema.get_table("orders"), "user_id"
+            )
+        )
+
+    def test_failure_cached(self) -> None:
+        """Test that a failed introspection is not retried until refreshed."""
+        evaluator = SQLMetricsEvaluator()
+        evaluator.db_executor = self.executor
+        with mock.patch.object(
+            self.executor, "_introspect_schema", side_effect=RuntimeError("permission denied")
+        ) as introspect:
+            self.assertIsNone(evaluator._introspected_schema(None))
+            self.assertIsNone(evaluator._introspected_schema(None))
+            with self.assertRaisesRegex(RuntimeError, "permission denied"):
+                self.executor.get_schema()
+            self.assertEqual(introspect.call_count, 1)
+
+        self.assertIsNotNone(self.executor.refresh_schema().get_table("users"))
+
+    def test_zero_shot_uses_introspected_schema(self) -> None:
+        """Test that zero-shot evaluation falls back to the introspected schema."""
+        evaluator = SQLMetricsEvaluator()
+        evaluator.db_executor = self.executor
+        schema = evaluator._introspected_schema(None)
+
+        self.assertIs(schema, self.executor.get_schema())
+        self.assertIsNone(evaluator._introspected_schema("Table: users"))
+
+
+class TestSchemaText(unittest.TestCase):
+    """Test cases for schema descriptions and reference checks."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.description = """
+        Table: customers
+        Columns: id (int), name (varchar(100)), email (varchar)
+
+        Table: orders
+        Columns: id (int), customer_id (int), total decimal(10, 2)
+
+        Foreign Keys:
+        orders.customer_id -> customers.id
+        """
+        self.parser = SQLParser()
+
+    def check(self, schema: DatabaseSchema, query: str) -> dict:
+        """Check the references of a query against a schema."""
+        return schema.check_references(self.parser.parse_query(query)["references"])
+
+    def test_parse_formats(self) -> None:
+        """Test that line-based descriptions and DDL produce the same index."""
+        ddl = """
+        CREATE TABLE customers (id INT PRIMARY KEY, name VARCHAR(100) NOT NULL, email TEXT);
+        CREATE TABLE orders (
+            id INT, customer_id INT REFERENCES customers (id), total DECIMAL(10, 2)
+        );
+        """
+        for schema in (parse_schema_text(self.description), parse_schema_text(ddl)):
+            orders = schema.get_table("orders")
+
+            self.assertEqual(
+                [column.name for column in orders.columns], ["id", "customer_id", "total"]
+            )
+            self.assertEqual(orders.get_column("total").data_type.lower(), "decimal(10, 2)")
+            self.assertTrue(
+                schema.has_join_key(orders, "customer_id", schema.get_table("customers"), "id")
+            )
+
+        self.assertFalse(parse_schema_text("no schema here").tables)
+
+    def test_check_references(self) -> None:
+        """Test that unknown tables, columns and joins outside foreign keys are reported."""
+        schema = parse_schema_text(self.description)
+
+        valid = self.check(
+            schema,
+            "SELECT c.name, SUM(o.total) AS spent FROM customers c "
+            "JOIN orders o ON c.id = o.customer_id GROUP BY c.name ORDER BY spent",
+        )
+        self.assertEqual(valid["score"], 1.0)
+
+        invalid = self.check(
+            schema,
+            "SELECT c.nam FROM customers c JOIN orders o ON o.id = c.id "
+            "JOIN refunds r ON r.id = o.id",
+        )
+        self.assertEqual(invalid["unknown_tables"], ["refunds"])
+        self.assertEqual(invalid["unknown_columns"], ["c.nam"])
+        self.assertEqual(invalid["invalid_joins"], ["o.id = c.id"])
+        self.assertLess(invalid["score"], 1.0)
+
+        derived = self.check(
+            schema, "WITH recent AS (SELECT id FROM orders) SELECT r.id, x FROM recent r"
+        )
+        self.assertEqual(derived["score"], 1.0)
+
+    def test_zero_shot_schema_cache(self) -> None:
+        """Test that schema descriptions are parsed once and checked without a database."""
+        evaluator = SQLMetricsEvaluator()
+        for generated in ("SELECT email FROM customers", "SELECT phone FROM customers"):
+            metrics = evaluator.evaluate(
+                generated_query=generated,
+                reference_query="SELECT name FROM customers",
+                database_schema=self.description,
+            )
+
+        self.assertEqual(metrics.parsing_details["schema_check"]["unknown_columns"], ["phone"])
+        self.assertEqual(evaluator.cache_stats()["schema"]["hits"], 1)
+        self.assertEqual(evaluator.cache_stats()["schema"]["misses"], 1)